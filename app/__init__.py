@@ -1,23 +1,33 @@
 # backend/app/__init__.py
+import math
+
 from flask import Flask, jsonify
 from flask_cors import CORS
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from .config import config_map
-from .extensions import init_extensions
+from .extensions import init_extensions, jwt
 from .api import register_blueprints
-from .utils.datetime_provider import BJJSONProvider
+from .cli import register_commands
+from .utils import metrics
+from .utils.datetime_provider import make_json_provider
 from .exceptions.exceptions import CustomAPIException  # 你的自定义异常:contentReference[oaicite:0]{index=0}
 
 
 def handle_custom_api_exception(e: CustomAPIException):
     """
     全局处理 CustomAPIException，统一返回格式
+    限流 / 过载异常（TooManyRequestsException）额外带 Retry-After 头
     """
+    headers = {}
+    retry_after = getattr(e, "retry_after", None)
+    if retry_after is not None:
+        headers["Retry-After"] = str(max(1, math.ceil(retry_after)))
     return jsonify({
         "code": getattr(e, "code", 1),
         "message": getattr(e, "message", str(e)),
         "data": None,
-    }), getattr(e, "status_code", 400)
+    }), getattr(e, "status_code", 400), headers
 
 
 def create_app(config_name: str = "dev") -> Flask:
@@ -45,12 +55,28 @@ def create_app(config_name: str = "dev") -> Flask:
     cfg_cls = config_map.get(config_name, config_map["dev"])
     app.config.from_object(cfg_cls)
 
-    # ⭐ 替换默认 JSON Provider —— datetime 自动转北京时间字符串
-    app.json = BJJSONProvider(app)
+    # 反向代理后面：只信任配置的跳数追加的 X-Forwarded-*，request.remote_addr 即真实客户端 IP
+    if app.config.get("PROXY_FIX_X_FOR") or app.config.get("PROXY_FIX_X_PROTO"):
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=int(app.config.get("PROXY_FIX_X_FOR", 0)),
+            x_proto=int(app.config.get("PROXY_FIX_X_PROTO", 0)),
+        )
+
+    # ⭐ 替换默认 JSON Provider —— datetime 自动转北京时间字符串（默认用 orjson 实现）
+    app.json = make_json_provider(app)
+
+    # 请求级性能埋点（/metrics、Server-Timing、慢请求日志），最先注册以覆盖其他钩子的耗时
+    metrics.init_app(app)
 
     # 初始化扩展 & 注册蓝图
     init_extensions(app)
     register_blueprints(app)
+    register_commands(app)
+
+    # JWT 吊销检查（logout / 禁用用户 / refresh 轮换）
+    from .services.token_service import register_jwt_callbacks
+    register_jwt_callbacks(jwt)
 
     # ⭐ 在工厂函数里注册全局异常处理
     app.register_error_handler(CustomAPIException, handle_custom_api_exception)
@@ -1,10 +1,23 @@
-from . import user, document, menu, auth, kb_routes, onlyoffice,onlyoffice_local_router
+from importlib import import_module
 
+# (模块, url_prefix)：按名字登记，注册时才导入对应蓝图模块
+BLUEPRINTS = (
+    ("user", "/api/users"),
+    ("document", "/api/file"),
+    ("menu", "/api/menus"),   # ⭐ 新增菜单 API
+    ("auth", "/api/auth"),   # ★ 新增
+    ("kb_routes", "/api/kb"),   # ★ 新增
+    ("onlyoffice", "/api/onlyoffice"),
+    ("role", "/api/roles"),
+)
 
-def register_blueprints(app):
-    app.register_blueprint(user.bp, url_prefix="/api/users")
-    app.register_blueprint(document.bp, url_prefix="/api/file")
-    app.register_blueprint(menu.bp, url_prefix="/api/menus")   # ⭐ 新增菜单 API
-    app.register_blueprint(auth.bp, url_prefix="/api/auth")   # ★ 新增
-    app.register_blueprint(kb_routes.bp, url_prefix="/api/kb")   # ★ 新增
-    app.register_blueprint(onlyoffice.bp, url_prefix="/api/onlyoffice")
+
+def register_blueprints(app, only=None):
+    """
+    only: 可选，只注册这些模块的蓝图（脚本 / 单独测某个模块时用，不导入其他蓝图及其依赖）
+    """
+    for module_name, url_prefix in BLUEPRINTS:
+        if only is not None and module_name not in only:
+            continue
+        module = import_module(f"{__name__}.{module_name}")
+        app.register_blueprint(module.bp, url_prefix=url_prefix)
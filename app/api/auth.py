@@ -3,17 +3,41 @@ from flask import Blueprint, request, make_response, current_app
 from flask_jwt_extended import (
     create_access_token, create_refresh_token,
     set_access_cookies, set_refresh_cookies,
-    jwt_required, get_jwt_identity, get_jwt, unset_jwt_cookies
+    jwt_required, get_jwt_identity, get_jwt, unset_jwt_cookies,
+    verify_jwt_in_request, decode_token,
 )
 
 from app.extensions import db  # 你在 extensions.py 里定义的 db、jwt
 from app.models.user import User
+from app.services import user_cache_service, token_service, login_throttle_service
 from app.models.result import ResponseTemplate
+from app.utils.rate_limit import client_ip
 from app.exceptions.exceptions import CustomAPIException
 
 bp = Blueprint("auth", __name__)
 
 
+def _create_tokens(identity: str, username: str) -> tuple[str, str]:
+    """签发新的 access / refresh token"""
+    access_token = create_access_token(
+        identity=identity,
+        additional_claims={"username": username},
+        expires_delta=current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES"),
+    )
+    refresh_token = create_refresh_token(
+        identity=identity,
+        additional_claims={"username": username},
+        expires_delta=current_app.config.get("JWT_REFRESH_TOKEN_EXPIRES"),
+    )
+    return access_token, refresh_token
+
+
+def _set_token_cookies(resp, access_token: str, refresh_token: str) -> None:
+    """写入 HttpOnly Cookie"""
+    set_access_cookies(resp, access_token)
+    set_refresh_cookies(resp, refresh_token)
+
+
 # ========== 用户注册（可选） ==========
 
 @bp.route("/register", methods=["POST"])
@@ -57,25 +81,33 @@ def login():
     password = data.get("password") or ""
 
     if not username or not password:
-        return ResponseTemplate.error("username and password required", code=400)
+        return ResponseTemplate.error("username and password required", status_code=400)
+
+    # 先查限流再做哈希，暴力破解请求不消耗哈希算力
+    ip = client_ip()
+    login_throttle_service.check_login_allowed(username, ip)
 
     user = User.query.filter_by(username=username).first()
     if not user or not user.check_password(password):
-        return ResponseTemplate.error("Invalid username or password", code=401)
+        login_throttle_service.record_login_failure(username, ip)
+        return ResponseTemplate.error("Invalid username or password", status_code=401)
+
+    login_throttle_service.reset_login_failures(username)
 
     if getattr(user, "status", "active") != "active":
-        return ResponseTemplate.error("账号被禁用，请联系管理员", code=403)
+        return ResponseTemplate.error("账号被禁用，请联系管理员", status_code=403)
+
+    # 哈希参数调整过：趁有明文密码时透明地重新哈希
+    if user.password_needs_rehash():
+        try:
+            user.set_password(password)
+            db.session.commit()
+            user_cache_service.invalidate_user(user.id)
+        except Exception:
+            db.session.rollback()
+            current_app.logger.warning("rehash password failed", exc_info=True)
     # identity 建议只放 id，其余信息放到 claims 里
-    access_token = create_access_token(
-        identity=str(user.id),
-        additional_claims={"username": user.username},
-        expires_delta=current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES"),
-    )
-    refresh_token = create_refresh_token(
-        identity=str(user.id),
-        additional_claims={"username": user.username},
-        expires_delta=current_app.config.get("JWT_REFRESH_TOKEN_EXPIRES"),
-    )
+    access_token, refresh_token = _create_tokens(str(user.id), user.username)
 
     resp = make_response(
         ResponseTemplate.success(
@@ -87,8 +119,7 @@ def login():
         )
     )
     # 写入 HttpOnly Cookie
-    set_access_cookies(resp, access_token)
-    set_refresh_cookies(resp, refresh_token)
+    _set_token_cookies(resp, access_token, refresh_token)
     return resp, 200
 
 
@@ -100,21 +131,17 @@ def refresh_token():
     """
     刷新 Access Token：
     - 自动从 refresh_token_cookie 读 refresh token
-    - 校验成功后发新的 access token，并写回 cookie
+    - 校验成功后吊销旧的 refresh token，发新的 access + refresh token（轮换），并写回 cookie
     """
     ident = get_jwt_identity()  # 字符串 id
-    claims = get_jwt()          # 里有 username 等
+    claims = get_jwt()          # 里有 username、jti、exp 等
 
-    new_access = create_access_token(
-        identity=ident,
-        additional_claims={"username": claims.get("username")},
-        expires_delta=current_app.config.get("JWT_ACCESS_TOKEN_EXPIRES"),
-    )
+    token_service.revoke_token(claims.get("jti"), claims.get("exp"))
 
     resp = make_response(
         ResponseTemplate.success(message="Access token refreshed")
     )
-    set_access_cookies(resp, new_access)
+    _set_token_cookies(resp, *_create_tokens(ident, claims.get("username")))
     return resp, 200
 
 
@@ -128,12 +155,12 @@ def me():
     - 优先从 cookie 检测 JWT（flask-jwt-extended 默认行为）
     """
     identity = get_jwt_identity()  # 字符串 id
-    user = User.query.get(int(identity)) if identity else None
-    if not user:
+    profile = user_cache_service.get_user_profile(identity) if identity else None
+    if not profile:
         raise CustomAPIException("用户不存在", 404)
 
     return ResponseTemplate.success(
-        data=user.to_dict(),
+        data=profile,
         message="User details retrieved successfully",
     )
 
@@ -170,11 +197,17 @@ def update_password():
         user.set_password(new_password)
         db.session.add(user)
         db.session.commit()
-        return ResponseTemplate.success(message="Password updated successfully")
     except Exception as e:
         db.session.rollback()
         raise CustomAPIException(f"Failed to update password: {e}", 500)
 
+    user_cache_service.invalidate_user(user.id)
+    # 其他设备上的旧 token 全部失效，当前会话换发新 token
+    token_service.revoke_user_tokens(user.id)
+    resp = make_response(ResponseTemplate.success(message="Password updated successfully"))
+    _set_token_cookies(resp, *_create_tokens(str(user.id), user.username))
+    return resp, 200
+
 
 # ========== 退出登录 ==========
 
@@ -182,9 +215,27 @@ def update_password():
 def logout():
     """
     退出登录：
+    - 吊销当前 access / refresh token（即使 cookie 被拷走也不能再用）
     - 清空 access / refresh cookie
     - 前端自己丢弃本地保存的 access_token（如果有）
     """
+    try:
+        if verify_jwt_in_request(optional=True):
+            claims = get_jwt()
+            token_service.revoke_token(claims.get("jti"), claims.get("exp"))
+    except Exception:
+        pass
+
+    refresh_cookie = request.cookies.get(
+        current_app.config.get("JWT_REFRESH_COOKIE_NAME", "refresh_token_cookie")
+    )
+    if refresh_cookie:
+        try:
+            claims = decode_token(refresh_cookie)
+            token_service.revoke_token(claims.get("jti"), claims.get("exp"))
+        except Exception:
+            pass
+
     resp = make_response(ResponseTemplate.success(message="Logged out"))
     unset_jwt_cookies(resp)
     return resp, 200
@@ -1,12 +1,14 @@
 # app/api/file.py
 from flask import Blueprint, request, jsonify
 
-from ..services import document_service
+from ..services import document_service, preview_service
+from ..utils.rate_limit import rate_limit
 
 bp = Blueprint("file", __name__)
 
 
 @bp.route("/upload/prepare", methods=["POST"])
+@rate_limit("file.upload_prepare")
 def prepare_upload():
     """
     获取 MinIO 预签名上传 URL
@@ -44,6 +46,7 @@ def confirm_upload():
 
 
 @bp.route("/<int:document_id>/download-url", methods=["GET"])
+@rate_limit("file.download_url")
 def get_download_url(document_id):
     """
     生成下载 URL（预签名）
@@ -69,6 +72,7 @@ def delete_document(document_id):
 
 
 @bp.route("/update/prepare", methods=["POST"])
+@rate_limit("file.upload_prepare")
 def prepare_update_upload():
     """
     更新文件时，获取新的上传 URL
@@ -85,3 +89,12 @@ def prepare_update_upload():
         return result
     except Exception as e:
         return jsonify({"error": str(e)}), 400
+
+
+@bp.route("/<int:document_id>/thumbnail", methods=["GET"])
+def get_thumbnail(document_id):
+    """
+    缩略图（派生文件缓存在 MinIO，按源文件版本惰性重新生成）
+    GET /api/file/<document_id>/thumbnail?size=256&v=<version>
+    """
+    return preview_service.get_thumbnail(document_id)
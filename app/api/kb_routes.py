@@ -1,9 +1,12 @@
 # app/routes/kb_routes.py
 from flask import Blueprint
-from app.services import kb_service
+from flask_jwt_extended import jwt_required
+from app.services import activity_service, kb_service, kb_export_service, kb_folder_service, kb_import_service
+from app.services.permission_service import admin_required
+from app.utils.db_routing import read_replica
 
 bp = Blueprint("kb", __name__)
-# 目录树
+# 目录树（带缓存，读主库）
 @bp.route("/folders/tree", methods=["GET"])
 def get_folder_tree():
     return kb_service.get_folder_tree()
@@ -16,15 +19,17 @@ def create_folder():
 
 # 指定目录下的文件
 @bp.route("/files", methods=["GET"])
+@read_replica
 def list_files_by_folder():
     return kb_service.list_files_by_folder()
 
 # 搜索文件（文件名 + 标签）
 @bp.route("/search", methods=["GET"])
+@read_replica
 def search_files():
     return kb_service.search_files()
 
-# 标签列表
+# 标签列表（带缓存，读主库）
 @bp.route("/tags", methods=["GET"])
 def list_tags():
     return kb_service.list_tags()
@@ -56,8 +61,44 @@ def rename_folder(folder_id):
     return kb_service.rename_folder(folder_id)
 
 
+# 移动目录（整棵子树）
+@bp.route("/folders/<int:folder_id>/move", methods=["POST"])
+def move_folder(folder_id):
+    return kb_folder_service.move_folder(folder_id)
+
+
+# 同级拖动排序
+@bp.route("/folders/<int:folder_id>/reorder", methods=["POST"])
+def reorder_folder(folder_id):
+    return kb_folder_service.reorder_folder(folder_id)
+
+
 @bp.route("/folders/<int:folder_id>", methods=["DELETE"])
 def delete_folder(folder_id):
     return kb_service.delete_folder(folder_id)
 
 
+# 最近动态（全局 / 目录 / 用户）
+@bp.route("/activity", methods=["GET"])
+def list_activity():
+    return activity_service.list_activity()
+
+
+# 导出搜索结果（xlsx / csv）
+@bp.route("/export", methods=["GET", "POST"])
+def export_files():
+    return kb_export_service.export_files()
+
+
+# 查询导出任务
+@bp.route("/export/<job_id>", methods=["GET"])
+def get_export_job(job_id):
+    return kb_export_service.get_export_job(job_id)
+
+
+# 从清单批量导入（csv / xlsx），仅管理员
+@bp.route("/import", methods=["POST"])
+@jwt_required()
+@admin_required
+def import_files():
+    return kb_import_service.import_files()
@@ -1,61 +1,54 @@
 # backend/app/api/menu.py
 from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
 from ..extensions import db
 from ..models import Menu
+from ..services import menu_service, user_cache_service
+from ..services.permission_service import admin_required
 
 bp = Blueprint("menu", __name__)
 
 
-# 工具：构建树形结构
-def build_menu_tree(items: list[Menu]) -> list[dict]:
+@bp.route("/tree", methods=["GET"])
+@jwt_required()
+@admin_required
+def get_menu_tree():
     """
-    把扁平的 Menu 列表转成树形结构：
-    [
-      { id, name, path, children: [...] },
-      ...
-    ]
+    完整菜单树（后台菜单 / 角色授权管理用，仅管理员）。
+    前端侧边栏 / 顶部导航用 /my-tree（按当前用户角色裁剪）。
+    树在进程内缓存（预序列化 + ETag），菜单变更时失效。
     """
-    # 先按 id 建个字典
-    item_dict: dict[int, dict] = {}
-    roots: list[dict] = []
-
-    for m in items:
-        item_dict[m.id] = m.to_dict(include_children=False)
-        item_dict[m.id]["children"] = []
-
-    # 建树
-    for m in items:
-        node = item_dict[m.id]
-        if m.parent_id and m.parent_id in item_dict:
-            item_dict[m.parent_id]["children"].append(node)
-        else:
-            roots.append(node)
+    snap = menu_service.get_snapshot()
+    return menu_service.json_response(snap.tree_json, snap.tree_etag)
 
-    return roots
 
-
-@bp.route("/tree", methods=["GET"])
-def get_menu_tree():
+@bp.route("/my-tree", methods=["GET"])
+@jwt_required()
+def get_my_menu_tree():
     """
-    获取树形菜单，用于前端侧边栏/顶部导航。
-    前端直接拿这个 JSON 构建菜单即可。
+    当前登录用户可见的菜单树（按角色权限裁剪）。
+    角色 -> 菜单位图预先算好并缓存，请求期间不查库。
     """
-    # 这里暂时不分页，全部取出
-    menus = Menu.query.order_by(Menu.id.asc()).all()
-    tree = build_menu_tree(menus)
-    return jsonify(tree)
+    profile = user_cache_service.get_user_profile(get_jwt_identity())
+    if not profile:
+        return jsonify({"error": "user not found"}), 404
+    return menu_service.user_tree_response(profile.get("role_ids"))
 
 
 @bp.route("/", methods=["GET"])
+@jwt_required()
+@admin_required
 def list_menus():
     """
-    扁平列表，后台菜单管理页面用。
+    扁平列表，后台菜单管理页面用（仅管理员）。
     """
-    menus = Menu.query.order_by(Menu.id.asc()).all()
-    return jsonify([m.to_dict(include_children=False) for m in menus])
+    snap = menu_service.get_snapshot()
+    return menu_service.json_response(snap.flat_json, snap.flat_etag)
 
 
 @bp.route("/", methods=["POST"])
+@jwt_required()
+@admin_required
 def create_menu():
     """
     创建菜单：
@@ -89,11 +82,14 @@ def create_menu():
 
     db.session.add(menu)
     db.session.commit()
+    menu_service.invalidate_menu_cache()
 
     return jsonify(menu.to_dict(include_children=False)), 201
 
 
 @bp.route("/<int:menu_id>", methods=["PUT"])
+@jwt_required()
+@admin_required
 def update_menu(menu_id: int):
     """
     更新菜单：
@@ -124,10 +120,13 @@ def update_menu(menu_id: int):
         menu.updated_by = data["updated_by"]
 
     db.session.commit()
+    menu_service.invalidate_menu_cache()
     return jsonify(menu.to_dict(include_children=False))
 
 
 @bp.route("/<int:menu_id>", methods=["DELETE"])
+@jwt_required()
+@admin_required
 def delete_menu(menu_id: int):
     """
     删除菜单项（会把它从树中移除）
@@ -136,4 +135,5 @@ def delete_menu(menu_id: int):
     menu = Menu.query.get_or_404(menu_id)
     db.session.delete(menu)
     db.session.commit()
+    menu_service.invalidate_menu_cache()
     return jsonify({"message": "menu deleted"})
@@ -3,7 +3,9 @@ from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required
 
 from app.services import onlyoffice_service
+from app.services.permission_service import admin_required
 from app.exceptions.exceptions import CustomAPIException
+from app.utils.rate_limit import client_ip, concurrency_limit, rate_limit
 
 bp = Blueprint("onlyoffice", __name__)
 
@@ -22,6 +24,8 @@ def get_editor_config():
 
 
 @bp.route("/download/<int:document_id>", methods=["GET"])
+@rate_limit("onlyoffice.download", key=lambda document_id: f"{client_ip()}:{document_id}")
+@concurrency_limit("proxy_stream")
 def download_proxy(document_id):
     """
     【新增】OnlyOffice 专用的代理下载接口
@@ -41,15 +45,21 @@ def callback(document_id):
 
 
 @bp.route("/status", methods=["POST"])
+@jwt_required()
 def online_status():
-    try:
-        return onlyoffice_service.online_status()
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
+    return onlyoffice_service.online_status()
 
+
+# 强制保存 / 断开编辑者会影响所有正在编辑的人，仅管理员
 @bp.route("/force-save", methods=["POST"])
+@jwt_required()
+@admin_required
 def force_save():
-    try:
-        return onlyoffice_service.force_save()
-    except Exception as e:
-        return jsonify({"error": str(e)}), 400
\ No newline at end of file
+    return onlyoffice_service.force_save()
+
+
+@bp.route("/drop", methods=["POST"])
+@jwt_required()
+@admin_required
+def drop_users():
+    return onlyoffice_service.drop_users()
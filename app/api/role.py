@@ -0,0 +1,177 @@
+# backend/app/api/role.py
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from ..extensions import db
+from ..models import Menu, Role, UserRole, RoleMenu, User
+from ..services import menu_service, user_cache_service
+from ..services.permission_service import admin_required
+
+bp = Blueprint("role", __name__)
+
+
+def _int_ids(value):
+    """请求里的 id 数组 -> 去重后的 int 列表；不是数组或含非整数时返回 None"""
+    if not isinstance(value, list):
+        return None
+    ids = set()
+    for item in value:
+        if isinstance(item, bool):
+            return None
+        if isinstance(item, int):
+            ids.add(item)
+        elif isinstance(item, str) and item.strip().isdigit():
+            ids.add(int(item))
+        else:
+            return None
+    return sorted(ids)
+
+
+def _missing_ids(column, ids: list[int]) -> list[int]:
+    if not ids:
+        return []
+    found = {i for (i,) in db.session.query(column).filter(column.in_(ids))}
+    return [i for i in ids if i not in found]
+
+
+def _menu_ids_from_body(data: dict):
+    """返回 (menu_ids, 错误响应)"""
+    menu_ids = _int_ids(data.get("menu_ids") or [])
+    if menu_ids is None:
+        return None, (jsonify({"error": "menu_ids must be a list of integers"}), 400)
+    missing = _missing_ids(Menu.id, menu_ids)
+    if missing:
+        return None, (jsonify({"error": f"menu not found: {missing}"}), 400)
+    return menu_ids, None
+
+
+def _menu_ids_by_role() -> dict[int, list[int]]:
+    result: dict[int, list[int]] = {}
+    for role_id, menu_id in db.session.query(RoleMenu.role_id, RoleMenu.menu_id):
+        result.setdefault(role_id, []).append(menu_id)
+    return result
+
+
+def _replace_role_menus(role_id: int, menu_ids: list[int]) -> None:
+    RoleMenu.query.filter_by(role_id=role_id).delete(synchronize_session=False)
+    if menu_ids:
+        db.session.execute(
+            RoleMenu.__table__.insert(),
+            [{"role_id": role_id, "menu_id": mid} for mid in menu_ids],
+        )
+
+
+@bp.route("/", methods=["GET"])
+@jwt_required()
+@admin_required
+def list_roles():
+    """
+    角色列表（带每个角色可见的菜单 id）
+    """
+    menu_ids = _menu_ids_by_role()
+    roles = Role.query.order_by(Role.id.asc()).all()
+    data = []
+    for r in roles:
+        item = r.to_dict()
+        item["menu_ids"] = menu_ids.get(r.id, [])
+        data.append(item)
+    return jsonify(data)
+
+
+@bp.route("/", methods=["POST"])
+@jwt_required()
+@admin_required
+def create_role():
+    """
+    创建角色：
+    {
+      "code": "kb_editor",
+      "name": "知识库编辑",
+      "menu_ids": [1, 2, 3]     # 可选
+    }
+    """
+    data = request.get_json(silent=True) or {}
+    code = data.get("code")
+    name = data.get("name")
+    if not code or not name:
+        return jsonify({"error": "code, name required"}), 400
+
+    if Role.query.filter_by(code=code).first():
+        return jsonify({"error": "role code already exists"}), 400
+    menu_ids, error = _menu_ids_from_body(data)
+    if error:
+        return error
+
+    role = Role(code=code, name=name)
+    db.session.add(role)
+    db.session.flush()
+    _replace_role_menus(role.id, menu_ids)
+    db.session.commit()
+    menu_service.invalidate_menu_cache()
+
+    return jsonify(role.to_dict()), 201
+
+
+@bp.route("/<int:role_id>/menus", methods=["PUT"])
+@jwt_required()
+@admin_required
+def update_role_menus(role_id: int):
+    """
+    设置角色可见的菜单（整体替换）：
+    { "menu_ids": [1, 2, 3] }
+    """
+    Role.query.get_or_404(role_id)
+    data = request.get_json(silent=True) or {}
+    menu_ids, error = _menu_ids_from_body(data)
+    if error:
+        return error
+
+    _replace_role_menus(role_id, menu_ids)
+    db.session.commit()
+    menu_service.invalidate_menu_cache()
+    return jsonify({"id": role_id, "menu_ids": menu_ids})
+
+
+@bp.route("/<int:role_id>", methods=["DELETE"])
+@jwt_required()
+@admin_required
+def delete_role(role_id: int):
+    role = Role.query.get_or_404(role_id)
+    user_ids = [uid for (uid,) in db.session.query(UserRole.user_id).filter_by(role_id=role_id)]
+
+    RoleMenu.query.filter_by(role_id=role_id).delete(synchronize_session=False)
+    UserRole.query.filter_by(role_id=role_id).delete(synchronize_session=False)
+    db.session.delete(role)
+    db.session.commit()
+
+    menu_service.invalidate_menu_cache()
+    for uid in user_ids:
+        user_cache_service.invalidate_user(uid)
+    return jsonify({"message": "role deleted"})
+
+
+@bp.route("/users/<int:user_id>", methods=["PUT"])
+@jwt_required()
+@admin_required
+def update_user_roles(user_id: int):
+    """
+    设置用户的角色（整体替换）：
+    { "role_ids": [1, 2] }
+    """
+    User.query.get_or_404(user_id)
+    data = request.get_json(silent=True) or {}
+    role_ids = _int_ids(data.get("role_ids") or [])
+    if role_ids is None:
+        return jsonify({"error": "role_ids must be a list of integers"}), 400
+    missing = _missing_ids(Role.id, role_ids)
+    if missing:
+        return jsonify({"error": f"role not found: {missing}"}), 400
+
+    UserRole.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+    if role_ids:
+        db.session.execute(
+            UserRole.__table__.insert(),
+            [{"user_id": user_id, "role_id": rid} for rid in role_ids],
+        )
+    db.session.commit()
+    user_cache_service.invalidate_user(user_id)
+    return jsonify({"id": user_id, "role_ids": role_ids})
@@ -1,7 +1,11 @@
 # backend/app/api/user.py
 from flask import Blueprint, request, jsonify
+from sqlalchemy import func, or_
+
 from ..extensions import db
 from ..models import User
+from ..models.result import ResponsePageTemplate
+from ..services import user_cache_service, token_service
 
 bp = Blueprint("user", __name__)
 
@@ -42,18 +46,74 @@ def create_user():
     return jsonify(user.to_dict()), 201
 
 
+LIST_COLUMNS = (
+    User.id,
+    User.username,
+    User.email,
+    User.user_fullname,
+    User.status,
+    User.created_at,
+)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
 @bp.route("/", methods=["GET"])
 def list_users():
     """
-    ?status=active/disabled 可选
+    用户列表（keyset 分页，按 id 倒序）：
+      status=active/disabled   可选
+      q=xxx                    可选，用户名 / 姓名 / 邮箱前缀匹配（走索引）
+      cursor=<上一页的 nextCursor>  可选，不传表示第一页
+      page_size=20             可选，最大 200
+      page=1                   可选，仅用于回显 currentPage
     """
     status = request.args.get("status")
-    query = User.query
-    if status:
-        query = query.filter_by(status=status)
+    q_str = (request.args.get("q") or "").strip()
+    cursor = request.args.get("cursor", type=int)
+    page = request.args.get("page", 1, type=int)
+    page_size = min(max(request.args.get("page_size", 20, type=int), 1), 200)
 
-    users = query.order_by(User.id.desc()).all()
-    return jsonify([u.to_dict() for u in users])
+    query = db.session.query(*LIST_COLUMNS)
+    if status:
+        query = query.filter(User.status == status)
+    if q_str:
+        prefix = _escape_like(q_str) + "%"
+        query = query.filter(or_(
+            User.username.like(prefix, escape="\\"),
+            User.user_fullname.like(prefix, escape="\\"),
+            User.email.like(prefix, escape="\\"),
+        ))
+
+    total = query.with_entities(func.count(User.id)).scalar() or 0
+
+    if cursor:
+        query = query.filter(User.id < cursor)
+    rows = query.order_by(User.id.desc()).limit(page_size + 1).all()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    data = [
+        {
+            "id": r.id,
+            "username": r.username,
+            "email": r.email,
+            "user_fullname": r.user_fullname,
+            "status": r.status,
+            "created_at": r.created_at.isoformat() if r.created_at else None,
+        }
+        for r in rows
+    ]
+
+    return ResponsePageTemplate.success(
+        data=data,
+        total_pages=(total + page_size - 1) // page_size,
+        current_page=page,
+        total=total,
+        next_cursor=str(rows[-1].id) if has_more and rows else None,
+    )
 
 
 @bp.route("/<int:user_id>", methods=["GET"])
@@ -84,12 +144,18 @@ def update_user(user_id: int):
         user.email = email
     if fullname is not None:
         user.user_fullname = fullname
+    revoke_tokens = False
     if status in ("active", "disabled"):
+        revoke_tokens = status == "disabled" and user.status != "disabled"
         user.status = status
     if password:
         user.set_password(password)
+        revoke_tokens = True
 
     db.session.commit()
+    user_cache_service.invalidate_user(user.id)
+    if revoke_tokens:
+        token_service.revoke_user_tokens(user.id)
     return jsonify(user.to_dict())
 
 
@@ -101,4 +167,6 @@ def delete_user(user_id: int):
     user = User.query.get_or_404(user_id)
     user.status = "disabled"
     db.session.commit()
+    user_cache_service.invalidate_user(user.id)
+    token_service.revoke_user_tokens(user.id)
     return jsonify({"message": "user disabled"})
@@ -0,0 +1,63 @@
+# app/cli.py
+"""
+运维命令，用法：
+    flask --app manage.py kb-import manifest.xlsx --root-folder-id 1
+    flask --app manage.py kb-recompute-stats [--dry-run]
+    flask --app manage.py kb-purge [--days 30] [--dry-run]
+"""
+import json
+
+import click
+from flask import current_app
+
+
+@click.command("kb-import")
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.option("--root-folder-id", type=int, default=None, help="导入到哪个目录下，默认按路径建顶级目录")
+@click.option("--bucket", default=None, help="MinIO bucket，默认 MINIO_BUCKET")
+@click.option("--chunk-size", type=int, default=None, help="每批插入行数，默认 KB_IMPORT_CHUNK_SIZE")
+def kb_import_command(manifest, root_folder_id, bucket, chunk_size):
+    """从清单（csv / xlsx）批量登记 MinIO 中已有的文件到知识库"""
+    from app.services import kb_import_service
+
+    df = kb_import_service.read_manifest(manifest, manifest)
+    click.echo(f"读取清单 {manifest}：{len(df)} 行")
+    stats = kb_import_service.import_manifest(
+        df,
+        root_folder_id=root_folder_id,
+        bucket=bucket,
+        chunk_size=chunk_size or int(current_app.config.get("KB_IMPORT_CHUNK_SIZE", 2000)),
+    )
+    click.echo(json.dumps(stats, ensure_ascii=False, indent=2))
+
+
+@click.command("kb-recompute-stats")
+@click.option("--dry-run", is_flag=True, help="只统计有偏差的目录数，不写库")
+def kb_recompute_stats_command(dry_run):
+    """重新汇总所有目录的文件数 / 总大小 / 最近文件时间（修正增量统计的偏差）"""
+    from app.services import kb_stats_service
+
+    result = kb_stats_service.recompute_all(dry_run=dry_run)
+    click.echo(json.dumps(result, ensure_ascii=False))
+
+
+@click.command("kb-purge")
+@click.option("--days", type=int, default=None, help="软删除超过多少天的数据会被清理，默认 KB_RECYCLE_RETENTION_DAYS")
+@click.option("--batch-size", type=int, default=1000, help="每批删除行数")
+@click.option("--dry-run", is_flag=True, help="只统计，不删除")
+def kb_purge_command(days, batch_size, dry_run):
+    """清理回收站：物理删除软删除已过保留期的知识库文件 / 目录"""
+    from app.services import kb_recycle_service
+
+    result = kb_recycle_service.purge_deleted(
+        retention_days=days if days is not None else int(current_app.config.get("KB_RECYCLE_RETENTION_DAYS", 30)),
+        batch_size=batch_size,
+        dry_run=dry_run,
+    )
+    click.echo(json.dumps(result, ensure_ascii=False))
+
+
+def register_commands(app):
+    app.cli.add_command(kb_import_command)
+    app.cli.add_command(kb_recompute_stats_command)
+    app.cli.add_command(kb_purge_command)
@@ -5,6 +5,14 @@ class CustomAPIException(Exception):
         self.status_code = status_code
         self.code = code
 
+
+class TooManyRequestsException(CustomAPIException):
+    """限流 / 过载（429 / 503），全局异常处理会带上 Retry-After 响应头"""
+
+    def __init__(self, message="请求过于频繁，请稍后再试", retry_after=1, status_code=429, code=1):
+        super().__init__(message, status_code, code)
+        self.retry_after = retry_after
+
 from flask_jwt_extended import JWTManager
 
 jwt = JWTManager()
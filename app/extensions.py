@@ -3,7 +3,12 @@ from flask_sqlalchemy import SQLAlchemy
 from redis import Redis
 from flask_jwt_extended import JWTManager
 
-db = SQLAlchemy()
+from app.utils import db_routing, redis_pool
+
+# 只读接口里的查询可以路由到从库（没配从库时等同默认 Session）
+db = SQLAlchemy(session_options={"class_": db_routing.RoutingSession})
+# BIGINT 主键：SQLite 只有 INTEGER PRIMARY KEY 才自增，用 SQLite 跑本地导入 / 基准时退化成 INTEGER
+BigIntPK = db.BigInteger().with_variant(db.Integer(), "sqlite")
 redis_client: Redis | None = None
 jwt = JWTManager()   # ⭐ 新增
 
@@ -13,14 +18,53 @@ def init_extensions(app):
 
     # 初始化数据库
     db.init_app(app)
+    db_routing.init_app(app)
 
     # 初始化 JWT
     jwt.init_app(app)   # ⭐ 新增，必须有！
 
     # 初始化 Redis
-    redis_client = Redis(
-        host=app.config.get("REDIS_HOST"),
-        port=app.config.get("REDIS_PORT"),
-        db=app.config.get("REDIS_DB"),
-        decode_responses=True,
-    )
+    # 有上限的连接池 + 超时 / 重试 / 熔断；这里不连接 Redis，Redis 挂了也能正常启动
+    redis_client = redis_pool.create_client(app.config)
+
+
+def get_redis() -> Redis | None:
+    """
+    运行时获取 Redis 客户端。
+    注意不要 `from app.extensions import redis_client`，那样拿到的是导入时的 None。
+    Redis 熔断期间也返回 None，调用方按“没有 Redis”降级。
+    """
+    if redis_client is None or not redis_pool.breaker.allow():
+        return None
+    return redis_client
+
+
+def reset_after_fork(app) -> None:
+    """
+    gunicorn preload_app 时在 master 里建好的连接不能被多个 worker 共用，
+    worker fork 出来后（post_fork）调用：丢掉继承来的 DB / Redis / MinIO 连接，用到时重新建立
+    """
+    from app.utils import minio_storage
+
+    with app.app_context():
+        # close=False：不去关父进程还在用的 socket，只是让本进程不再使用它们（主库 + 从库）
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    if redis_client is not None:
+        redis_client.connection_pool.reset()
+    redis_pool.breaker.reset()
+    minio_storage.reset_minio_client()
+
+
+def shutdown_extensions(app) -> None:
+    """worker 退出时调用：等后台任务跑完，再关闭连接池"""
+    from app.utils import minio_storage, password_hasher, task_pool
+
+    task_pool.shutdown_all(wait=True)
+    password_hasher.shutdown()
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+    if redis_client is not None:
+        redis_client.connection_pool.disconnect()
+    minio_storage.reset_minio_client()
@@ -5,6 +5,7 @@ from .user import User
 from .document import Document
 from .kb_models import KbFolder,KbFile,KbTag,KbFileTag
 from .menu import Menu
+from .role import Role, UserRole, RoleMenu
 
 
 __all__ = [
@@ -15,4 +16,8 @@ __all__ = [
     "KbFile",
     "KbTag",
     "KbFileTag",
+    "Menu",
+    "Role",
+    "UserRole",
+    "RoleMenu",
 ]
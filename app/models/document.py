@@ -2,7 +2,7 @@
 from datetime import datetime
 from enum import Enum
 
-from ..extensions import db
+from ..extensions import db, BigIntPK
 
 
 class FileType(str, Enum):
@@ -28,9 +28,13 @@ class DocumentStatus(str, Enum):
 
 class Document(db.Model):
     __tablename__ = "t_documents"
+    __table_args__ = (
+        # 按 object key 反查（清单导入去重）：bucket = ? AND object_key IN (...)
+        db.Index("ix_t_documents_bucket_object_key", "bucket", "object_key"),
+    )
 
     # 主键
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(BigIntPK, primary_key=True)
 
 
     # 原始文件名
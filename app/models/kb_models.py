@@ -1,16 +1,27 @@
 
 # app/models/kb_models.py
-from ..extensions import db
+from ..extensions import db, BigIntPK
 
 class KbFolder(db.Model):
     __tablename__ = "t_kb_folder"
+    __table_args__ = (
+        # 目录树：is_deleted = 0 ORDER BY sort_order, id
+        db.Index("ix_t_kb_folder_deleted_sort", "is_deleted", "sort_order", "id"),
+        # 同级排序 / 子树递归：parent_id = ? AND is_deleted = 0 ORDER BY sort_order, id
+        db.Index("ix_t_kb_folder_parent_deleted_sort", "parent_id", "is_deleted", "sort_order", "id"),
+    )
 
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(BigIntPK, primary_key=True)
     parent_id = db.Column(db.BigInteger, db.ForeignKey("t_kb_folder.id"), nullable=True)
     name = db.Column(db.String(255), nullable=False)
     sort_order = db.Column(db.Integer, nullable=False, default=0)
     is_deleted = db.Column(db.Boolean, nullable=False, default=False)
 
+    # 统计（含所有子孙目录），由 kb_stats_service 增量维护
+    file_count = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+    total_bytes = db.Column(db.BigInteger, nullable=False, default=0, server_default="0")
+    last_file_at = db.Column(db.DateTime, nullable=True)
+
     created_at = db.Column(db.DateTime, server_default=db.func.now())
     updated_at = db.Column(
         db.DateTime,
@@ -23,8 +34,19 @@ class KbFolder(db.Model):
 
 class KbFile(db.Model):
     __tablename__ = "t_kb_file"
+    __table_args__ = (
+        # 目录文件列表：folder_id = ? AND is_deleted = 0 ORDER BY <sort_field>, id
+        db.Index("ix_t_kb_file_folder_deleted_updated", "folder_id", "is_deleted", "updated_at", "id"),
+        db.Index("ix_t_kb_file_folder_deleted_name", "folder_id", "is_deleted", "name", "id"),
+        db.Index("ix_t_kb_file_folder_deleted_type", "folder_id", "is_deleted", "file_type", "id"),
+        # 全局搜索 / 导出：is_deleted = 0 ORDER BY updated_at DESC, id DESC
+        # 回收站清理：is_deleted = 1 AND updated_at < ? 也走这个
+        db.Index("ix_t_kb_file_deleted_updated", "is_deleted", "updated_at", "id"),
+        # 按文档反查（缩略图、目录统计、在线编辑动态）
+        db.Index("ix_t_kb_file_document_deleted", "document_id", "is_deleted"),
+    )
 
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(BigIntPK, primary_key=True)
     folder_id = db.Column(db.BigInteger, db.ForeignKey("t_kb_folder.id"), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     document_id = db.Column(db.BigInteger, nullable=False)
@@ -48,7 +70,7 @@ class KbFile(db.Model):
 class KbTag(db.Model):
     __tablename__ = "t_kb_tag"
 
-    id = db.Column(db.BigInteger, primary_key=True)
+    id = db.Column(BigIntPK, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     color = db.Column(db.String(20))
 
@@ -57,6 +79,10 @@ class KbTag(db.Model):
 
 class KbFileTag(db.Model):
     __tablename__ = "t_kb_file_tag"
+    __table_args__ = (
+        # 按标签过滤：tag_id IN (...) 取 file_id（主键是 file_id 在前，用不上）
+        db.Index("ix_t_kb_file_tag_tag_file", "tag_id", "file_id"),
+    )
 
     file_id = db.Column(
         db.BigInteger,
@@ -33,11 +33,12 @@ class Menu(db.Model):
     parent_id = db.Column(db.Integer, db.ForeignKey("t_menu_item.id"))
 
     # 自关联，parent_menu.children
+    # 用默认的 select 懒加载：菜单接口走 menu_service 的扁平列查询，不需要 eager load
     parent_menu = db.relationship(
         "Menu",
         remote_side=[id],
-        backref=db.backref("children", lazy="subquery"),
-        lazy="joined",
+        backref=db.backref("children", lazy="select"),
+        lazy="select",
     )
 
     # 你可以后面加 sort_order、hidden 等字段
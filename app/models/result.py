@@ -25,15 +25,23 @@ class ResponseTemplate:
 
 class ResponsePageTemplate:
     @staticmethod
-    def success(data=None, total_pages=0, current_page=0):
-        """分页成功返回，默认 message = 'Success'"""
-        response = jsonify({
+    def success(data=None, total_pages=0, current_page=0, total=None, next_cursor=None):
+        """
+        分页成功返回，默认 message = 'Success'
+        keyset 分页时额外返回 nextCursor（为 null 表示没有下一页）
+        """
+        body = {
             'success': True,
             'data': data or {},
             'totalPages': total_pages,
             'currentPage': current_page,
             'message': 'Success'
-        })
+        }
+        if total is not None:
+            body['total'] = total
+        if next_cursor is not None or total is not None:
+            body['nextCursor'] = next_cursor
+        response = jsonify(body)
         return make_response(response, 200)
 
     @staticmethod
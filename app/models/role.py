@@ -0,0 +1,61 @@
+# backend/app/models/role.py
+from sqlalchemy import text
+
+from ..extensions import db
+
+# 拥有该编码的角色可以看到全部菜单
+SUPER_ADMIN_ROLE = "super_admin"
+# 可以管理菜单 / 角色 / 用户角色的角色编码
+ADMIN_ROLES = (SUPER_ADMIN_ROLE, "admin")
+
+
+class Role(db.Model):
+    __tablename__ = "t_role"
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    code = db.Column(db.String(64), unique=True, nullable=False)   # 例如 'super_admin'、'kb_editor'
+    name = db.Column(db.String(100), nullable=False)               # 显示名称
+
+    created_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        server_default=text("CURRENT_TIMESTAMP"),
+    )
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "code": self.code,
+            "name": self.name,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class UserRole(db.Model):
+    __tablename__ = "t_user_role"
+
+    user_id = db.Column(
+        db.Integer,
+        db.ForeignKey("t_user.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    role_id = db.Column(
+        db.Integer,
+        db.ForeignKey("t_role.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+
+
+class RoleMenu(db.Model):
+    __tablename__ = "t_role_menu"
+
+    role_id = db.Column(
+        db.Integer,
+        db.ForeignKey("t_role.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    menu_id = db.Column(
+        db.Integer,
+        db.ForeignKey("t_menu_item.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
@@ -1,13 +1,17 @@
 # backend/app/models/user.py
 from datetime import datetime
 from sqlalchemy import text
-from werkzeug.security import generate_password_hash, check_password_hash
-
 from ..extensions import db
+from ..utils import password_hasher
 
 
 class User(db.Model):
     __tablename__ = "t_user"
+    __table_args__ = (
+        # 用户列表：按状态过滤 + id 倒序 keyset 分页；姓名前缀搜索
+        db.Index("ix_t_user_status_id", "status", "id"),
+        db.Index("ix_t_user_fullname", "user_fullname"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, nullable=False)
@@ -28,10 +32,14 @@ class User(db.Model):
     )
 
     def set_password(self, password: str) -> None:
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify_password(self.password_hash, password)
+
+    def password_needs_rehash(self) -> bool:
+        """哈希参数已过时（配置调整过），登录成功时应顺便重新哈希"""
+        return password_hasher.needs_rehash(self.password_hash)
 
     def to_dict(self) -> dict:
         return {
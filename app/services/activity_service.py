@@ -0,0 +1,163 @@
+# app/services/activity_service.py
+"""
+知识库动态（最近变更）：
+- 写操作 commit 之后 XADD 到三条有上限的 Redis 流（MAXLEN ~）：
+    kb:activity:global            全局
+    kb:activity:folder:<id>       文件所在目录
+    kb:activity:user:<uid>        操作人
+- “最近变更”就是 XREVRANGE 取 k 条，与目录里有多少文件无关，不用再按 updated_at 全量排序
+- 分页游标就是流里的 entry id
+- 目录 / 用户流设置过期时间，长期无动态的自动清理；Redis 不可用时只记日志，不影响业务
+- 批量导入（kb-import）不逐条写动态
+"""
+from datetime import datetime
+from typing import Optional
+
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+from app.exceptions.exceptions import CustomAPIException
+from app.extensions import db, get_redis
+from app.models.kb_models import KbFile
+from app.models.result import ResponseTemplate
+from app.services import permission_service
+
+GLOBAL_KEY = "kb:activity:global"
+FOLDER_KEY = "kb:activity:folder:{}"
+USER_KEY = "kb:activity:user:{}"
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default)
+
+
+def current_user_id() -> Optional[int]:
+    """知识库接口不强制登录：带了有效 token 就取操作人，否则为 None"""
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+        return int(identity) if identity is not None else None
+    except Exception:
+        return None
+
+
+def record(action: str, *, file_id=None, folder_id=None, name=None, user_id=None, events=None) -> None:
+    """
+    记录一条（或一批）动态，需在业务 commit 之后调用。
+    events: 可选，[{file_id, folder_id, name}, ...]，同一个 action 的多条动态一次 pipeline 写入
+    """
+    r = get_redis()
+    if r is None:
+        return
+
+    if events is None:
+        events = [{"file_id": file_id, "folder_id": folder_id, "name": name}]
+
+    global_max = int(_cfg("KB_ACTIVITY_GLOBAL_MAXLEN", 10000))
+    scoped_max = int(_cfg("KB_ACTIVITY_SCOPED_MAXLEN", 1000))
+    ttl = int(_cfg("KB_ACTIVITY_SCOPED_TTL", 30 * 24 * 3600))
+
+    try:
+        pipe = r.pipeline(transaction=False)
+        for ev in events:
+            fields = {
+                "action": action,
+                "file_id": ev.get("file_id") or "",
+                "folder_id": ev.get("folder_id") or "",
+                "name": ev.get("name") or "",
+                "user_id": user_id or "",
+            }
+            pipe.xadd(GLOBAL_KEY, fields, maxlen=global_max, approximate=True)
+            scoped = []
+            if ev.get("folder_id"):
+                scoped.append(FOLDER_KEY.format(ev["folder_id"]))
+            if user_id:
+                scoped.append(USER_KEY.format(user_id))
+            for key in scoped:
+                pipe.xadd(key, fields, maxlen=scoped_max, approximate=True)
+                pipe.expire(key, ttl)
+        pipe.execute()
+    except Exception:
+        current_app.logger.warning("[Activity] redis xadd failed", exc_info=True)
+
+
+def record_document_saved(document_id: int, user_id=None) -> None:
+    """OnlyOffice 保存后：给引用该文档的每个知识库文件记一条 edit 动态"""
+    rows = db.session.query(KbFile.id, KbFile.folder_id, KbFile.name).filter(
+        KbFile.document_id == document_id, KbFile.is_deleted == False
+    ).all()
+    if rows:
+        record("edit", user_id=user_id, events=[
+            {"file_id": r.id, "folder_id": r.folder_id, "name": r.name} for r in rows
+        ])
+
+
+def _entry_to_dict(entry_id: str, fields: dict) -> dict:
+    def as_int(value):
+        return int(value) if value else None
+
+    return {
+        "id": entry_id,
+        "action": fields.get("action"),
+        "file_id": as_int(fields.get("file_id")),
+        "folder_id": as_int(fields.get("folder_id")),
+        "name": fields.get("name") or None,
+        "user_id": as_int(fields.get("user_id")),
+        # entry id 的前半段就是写入时间（毫秒），按 UTC 交给 JSON provider 统一转北京时间
+        "at": datetime.utcfromtimestamp(int(entry_id.split("-", 1)[0]) / 1000),
+    }
+
+
+def list_activity():
+    """
+    最近动态（新的在前）
+    GET /api/kb/activity
+      scope:     global（默认）/ folder / user
+      folder_id: scope=folder 时必填
+      user_id:   scope=user 时可选，默认当前登录用户；需登录，非管理员只能查自己
+      cursor:    上一页返回的 nextCursor
+      limit:     默认 20，最大 200
+    """
+    scope = (request.args.get("scope") or "global").strip().lower()
+    if scope == "global":
+        key = GLOBAL_KEY
+    elif scope == "folder":
+        folder_id = request.args.get("folder_id", type=int)
+        if not folder_id:
+            raise CustomAPIException("缺少 folder_id 参数", 400)
+        key = FOLDER_KEY.format(folder_id)
+    elif scope == "user":
+        # 个人动态需要登录，且只能看自己的；管理员可以看任意用户
+        me = current_user_id()
+        if me is None:
+            raise CustomAPIException("请先登录", 401)
+        user_id = request.args.get("user_id", type=int) or me
+        if user_id != me and not permission_service.is_admin(me):
+            raise CustomAPIException("只能查看自己的动态", 403)
+        key = USER_KEY.format(user_id)
+    else:
+        raise CustomAPIException("scope 只支持 global / folder / user", 400)
+
+    limit = max(1, min(request.args.get("limit", 20, type=int), 200))
+    cursor = (request.args.get("cursor") or "").strip()
+
+    r = get_redis()
+    if r is None:
+        raise CustomAPIException("动态服务不可用", 503)
+
+    try:
+        # 从 cursor（含）往前多取两条：一条可能是 cursor 本身，一条用来判断是否还有下一页
+        entries = r.xrevrange(key, max=cursor or "+", min="-", count=limit + 2)
+    except Exception:
+        current_app.logger.warning("[Activity] redis xrevrange failed", exc_info=True)
+        raise CustomAPIException("动态服务不可用", 503)
+
+    if cursor and entries and entries[0][0] == cursor:
+        entries = entries[1:]
+
+    items = [_entry_to_dict(entry_id, fields) for entry_id, fields in entries[:limit]]
+    next_cursor = items[-1]["id"] if len(entries) > limit else None
+
+    return ResponseTemplate.success(
+        message="获取动态成功",
+        data={"items": items, "nextCursor": next_cursor},
+    )
@@ -0,0 +1,215 @@
+# app/services/kb_export_service.py
+"""
+知识库搜索结果导出（XLSX / CSV）：
+- 过滤条件与 search_files 完全相同（共用 kb_service.build_search_statement）
+- 服务端游标逐批读取 -> xlsxwriter constant_memory 模式 / csv 逐行写临时文件 -> 上传 MinIO
+- 行数不超过 KB_EXPORT_SYNC_MAX_ROWS 时同步导出直接返回下载地址，否则转后台任务，
+  前端轮询 GET /api/kb/export/<job_id>
+"""
+import csv
+import json
+import os
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app, request
+from sqlalchemy import func, select
+
+from app.exceptions.exceptions import CustomAPIException
+from app.extensions import db, get_redis
+from app.models.result import ResponseTemplate
+from app.services import kb_service
+from app.utils import minio_storage, task_pool
+from app.utils.datetime_provider import datetime_to_bj
+
+JOB_KEY = "kb:export:{}"
+
+HEADERS = ["文件名", "目录", "类型", "版本", "标签", "描述", "更新时间"]
+CONTENT_TYPES = {
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "csv": "text/csv",
+}
+
+# Redis 不可用时的任务状态（仅本进程可见）
+_local_jobs: dict = {}
+_local_jobs_lock = threading.Lock()
+
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default)
+
+
+# ============== 任务状态 ==============
+
+def _save_job(job_id: str, **fields) -> None:
+    r = get_redis()
+    if r is not None:
+        try:
+            key = JOB_KEY.format(job_id)
+            r.hset(key, mapping={k: json.dumps(v, ensure_ascii=False) for k, v in fields.items()})
+            r.expire(key, int(_cfg("KB_EXPORT_JOB_TTL", 24 * 3600)))
+            return
+        except Exception:
+            current_app.logger.warning("[KbExport] redis unavailable", exc_info=True)
+    with _local_jobs_lock:
+        _local_jobs.setdefault(job_id, {}).update(fields)
+
+
+def _load_job(job_id: str):
+    r = get_redis()
+    if r is not None:
+        try:
+            raw = r.hgetall(JOB_KEY.format(job_id))
+            if raw:
+                return {k: json.loads(v) for k, v in raw.items()}
+        except Exception:
+            current_app.logger.warning("[KbExport] redis unavailable", exc_info=True)
+    with _local_jobs_lock:
+        job = _local_jobs.get(job_id)
+        return dict(job) if job else None
+
+
+# ============== 写文件 ==============
+
+def _row_values(item: dict) -> list:
+    return [
+        item["name"],
+        item.get("folder_path", ""),
+        item["file_type"] or "",
+        item["version"],
+        ",".join(item["tags"]),
+        item["description"] or "",
+        datetime_to_bj(item["updated_at"]) or "",
+    ]
+
+
+def _write_xlsx(path: str, rows) -> int:
+    import xlsxwriter  # 只有导出 xlsx 才用到，不在启动时加载
+
+    # constant_memory：每写完一行就刷到磁盘，内存与行数无关（要求按行顺序写）
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    try:
+        sheet = workbook.add_worksheet("文件列表")
+        bold = workbook.add_format({"bold": True})
+        sheet.set_column(0, 0, 40)
+        sheet.set_column(1, 1, 40)
+        sheet.set_column(4, 6, 20)
+        sheet.write_row(0, 0, HEADERS, bold)
+
+        count = 0
+        for item in rows:
+            count += 1
+            sheet.write_row(count, 0, _row_values(item))
+        return count
+    finally:
+        workbook.close()
+
+
+def _write_csv(path: str, rows) -> int:
+    count = 0
+    # utf-8-sig：Excel 直接双击打开不乱码
+    with open(path, "w", newline="", encoding="utf-8-sig") as fp:
+        writer = csv.writer(fp)
+        writer.writerow(HEADERS)
+        for item in rows:
+            writer.writerow(_row_values(item))
+            count += 1
+    return count
+
+
+def run_export(job_id: str, stmt, fmt: str) -> dict:
+    """执行导出（同步调用或在后台线程池中执行），返回任务状态"""
+    _save_job(job_id, status="running", format=fmt)
+    fd, path = tempfile.mkstemp(suffix=f".{fmt}", prefix="kb-export-")
+    os.close(fd)
+    try:
+        rows = kb_service.iter_file_dicts(stmt, with_folder_path=True, stream=True, with_thumbnails=False)
+        count = _write_xlsx(path, rows) if fmt == "xlsx" else _write_csv(path, rows)
+
+        bucket = current_app.config["MINIO_BUCKET"]
+        object_key = f"exports/kb/{datetime.now().strftime('%Y/%m/%d')}/{job_id}.{fmt}"
+        minio_storage.upload_file(bucket, object_key, path, CONTENT_TYPES[fmt])
+
+        job = {
+            "status": "done",
+            "format": fmt,
+            "rows": count,
+            "bucket": bucket,
+            "object_key": object_key,
+            "filename": f"知识库导出_{datetime.now().strftime('%Y%m%d%H%M%S')}.{fmt}",
+        }
+        _save_job(job_id, **job)
+        current_app.logger.info(f"[KbExport] job {job_id} exported {count} rows")
+        return job
+    except Exception as e:
+        current_app.logger.exception(f"[KbExport] job {job_id} failed")
+        _save_job(job_id, status="failed", error=str(e))
+        raise
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _job_response(job_id: str, job: dict):
+    data = {
+        "jobId": job_id,
+        "status": job.get("status"),
+        "format": job.get("format"),
+        "rows": job.get("rows"),
+    }
+    if job.get("status") == "done":
+        data["downloadUrl"] = minio_storage.generate_presigned_download_url(
+            bucket=job["bucket"],
+            object_key=job["object_key"],
+            ttl=timedelta(seconds=int(_cfg("KB_EXPORT_URL_TTL", 3600))),
+            download_filename=job.get("filename"),
+            request=request,
+        )
+    if job.get("status") == "failed":
+        data["error"] = job.get("error")
+    return ResponseTemplate.success(message="OK", data=data)
+
+
+# ============== 接口 ==============
+
+def export_files():
+    """
+    导出搜索结果
+    GET/POST /api/kb/export?format=xlsx|csv&q=...&tags=...&sort_field=...&sort_order=...
+    """
+    fmt = (request.args.get("format") or "xlsx").strip().lower()
+    if fmt not in CONTENT_TYPES:
+        raise CustomAPIException("format 只支持 xlsx / csv", 400)
+
+    stmt = kb_service.build_search_statement()
+    total = db.session.execute(
+        select(func.count()).select_from(stmt.order_by(None).subquery())
+    ).scalar() or 0
+
+    job_id = uuid.uuid4().hex
+    if total <= int(_cfg("KB_EXPORT_SYNC_MAX_ROWS", 5000)):
+        job = run_export(job_id, stmt, fmt)
+        return _job_response(job_id, job)
+
+    _save_job(job_id, status="pending", format=fmt, rows=total)
+    task_pool.submit(
+        "export",
+        run_export,
+        job_id,
+        stmt,
+        fmt,
+        max_workers=int(_cfg("KB_EXPORT_WORKERS", 2)),
+    )
+    return _job_response(job_id, {"status": "pending", "format": fmt, "rows": total})
+
+
+def get_export_job(job_id: str):
+    """GET /api/kb/export/<job_id>：查询后台导出任务状态 / 下载地址"""
+    job = _load_job(job_id)
+    if not job:
+        raise CustomAPIException("导出任务不存在或已过期", 404)
+    return _job_response(job_id, job)
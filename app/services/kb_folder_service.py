@@ -0,0 +1,214 @@
+# app/services/kb_folder_service.py
+"""
+目录移动 / 排序：
+
+排序用“带间隔”的 sort_order（相邻兄弟默认相差 SORT_GAP）：
+- 拖到 A、B 之间时取两者中点，只改被拖动的那一行
+- 间隔用完（相邻差 < 2，或历史数据都是 0）时才把这一层兄弟重新编号一次，之后又恢复 O(1)
+- 同一层排序键是 (sort_order, id)，与 get_folder_tree 一致
+
+移动 = 改 parent_id（子树跟着父节点走，不需要逐个改子孙），目录统计从旧祖先链挪到新祖先链；
+防止把目录移到自己的子孙下面，用一条递归 CTE 查目标父目录的祖先链。
+"""
+from typing import Optional
+
+from flask import request
+from sqlalchemy import and_, func, or_, select, update
+
+from app.exceptions.exceptions import CustomAPIException
+from app.extensions import db
+from app.models.kb_models import KbFolder
+from app.models.result import ResponseTemplate
+from app.services import kb_stats_service
+from app.utils import cache
+
+SORT_GAP = 1024
+
+
+def _siblings_cond(parent_id: Optional[int]):
+    if parent_id is None:
+        return and_(KbFolder.parent_id.is_(None), KbFolder.is_deleted == False)
+    return and_(KbFolder.parent_id == parent_id, KbFolder.is_deleted == False)
+
+
+def next_sort_order(parent_id: Optional[int]) -> int:
+    """追加到某一层末尾时使用的 sort_order"""
+    current = db.session.execute(
+        select(func.max(KbFolder.sort_order)).where(_siblings_cond(parent_id))
+    ).scalar()
+    return (current or 0) + SORT_GAP
+
+
+def ancestor_ids(folder_id: int) -> list[int]:
+    """folder_id 自己 + 所有祖先的 id（一条递归 CTE）"""
+    base = select(KbFolder.id, KbFolder.parent_id).where(KbFolder.id == folder_id)
+    anc = base.cte("anc", recursive=True)
+    anc = anc.union_all(
+        select(KbFolder.id, KbFolder.parent_id).join(anc, KbFolder.id == anc.c.parent_id)
+    )
+    return [row[0] for row in db.session.execute(select(anc.c.id))]
+
+
+def subtree_ids(folder_id: int) -> list[int]:
+    """folder_id 自己 + 所有未删除的子孙目录 id（一条递归 CTE）"""
+    base = select(KbFolder.id).where(KbFolder.id == folder_id)
+    sub = base.cte("sub", recursive=True)
+    sub = sub.union_all(
+        select(KbFolder.id).join(sub, KbFolder.parent_id == sub.c.id).where(KbFolder.is_deleted == False)
+    )
+    return [row[0] for row in db.session.execute(select(sub.c.id))]
+
+
+def _renumber(parent_id: Optional[int]) -> None:
+    """把一层兄弟按当前顺序重新编号为 SORT_GAP 的整数倍"""
+    ids = db.session.execute(
+        select(KbFolder.id).where(_siblings_cond(parent_id)).order_by(KbFolder.sort_order, KbFolder.id)
+    ).scalars().all()
+    if ids:
+        db.session.execute(
+            update(KbFolder),
+            [{"id": fid, "sort_order": (i + 1) * SORT_GAP} for i, fid in enumerate(ids)],
+        )
+
+
+def _neighbour(parent_id: Optional[int], anchor: KbFolder, exclude_id: int, after: bool):
+    """anchor 在 (sort_order, id) 顺序里的下一个（after=True）或上一个兄弟"""
+    if after:
+        cond = or_(
+            KbFolder.sort_order > anchor.sort_order,
+            and_(KbFolder.sort_order == anchor.sort_order, KbFolder.id > anchor.id),
+        )
+        order = (KbFolder.sort_order.asc(), KbFolder.id.asc())
+    else:
+        cond = or_(
+            KbFolder.sort_order < anchor.sort_order,
+            and_(KbFolder.sort_order == anchor.sort_order, KbFolder.id < anchor.id),
+        )
+        order = (KbFolder.sort_order.desc(), KbFolder.id.desc())
+
+    return db.session.execute(
+        select(KbFolder.id, KbFolder.sort_order)
+        .where(_siblings_cond(parent_id), KbFolder.id != exclude_id, cond)
+        .order_by(*order)
+        .limit(1)
+    ).first()
+
+
+def _sort_order_between(parent_id: Optional[int], folder_id: int,
+                        before_id: Optional[int], after_id: Optional[int]) -> int:
+    """
+    计算 folder 放到 after_id 之后 / before_id 之前时的 sort_order。
+    两个都不传 = 追加到末尾。
+    """
+    anchor_id = after_id or before_id
+    if not anchor_id:
+        return next_sort_order(parent_id)
+    if anchor_id == folder_id:
+        raise CustomAPIException("不能以自己作为参照目录", 400)
+
+    for attempt in range(2):
+        anchor = db.session.execute(
+            select(KbFolder.id, KbFolder.sort_order).where(KbFolder.id == anchor_id, _siblings_cond(parent_id))
+        ).first()
+        if not anchor:
+            raise CustomAPIException("参照目录不存在或不在同一层", 400)
+
+        other = _neighbour(parent_id, anchor, folder_id, after=bool(after_id))
+        if other is None:
+            return anchor.sort_order + SORT_GAP if after_id else anchor.sort_order - SORT_GAP
+
+        low, high = sorted((anchor.sort_order, other.sort_order))
+        if high - low >= 2:
+            return (low + high) // 2
+        if attempt == 0:
+            # 间隔用完：这一层重新编号一次后再算
+            _renumber(parent_id)
+
+    raise CustomAPIException("排序计算失败", 500)
+
+
+def _position_args(data: dict) -> tuple[Optional[int], Optional[int]]:
+    before_id = data.get("before_id")
+    after_id = data.get("after_id")
+    if before_id and after_id:
+        raise CustomAPIException("before_id 和 after_id 只能传一个", 400)
+    return before_id, after_id
+
+
+def _get_json() -> dict:
+    try:
+        return request.get_json(force=True) or {}
+    except Exception:
+        raise CustomAPIException("请求体必须是 JSON", 400)
+
+
+def reorder_folder(folder_id: int):
+    """
+    同一层内调整顺序
+    POST /api/kb/folders/<folder_id>/reorder
+    JSON body（二选一）：
+      { "after_id": 12 }    # 放到 12 后面
+      { "before_id": 15 }   # 放到 15 前面
+    """
+    data = _get_json()
+    before_id, after_id = _position_args(data)
+    if not (before_id or after_id):
+        raise CustomAPIException("缺少 before_id 或 after_id", 400)
+
+    folder = KbFolder.query.filter_by(id=folder_id, is_deleted=False).first()
+    if not folder:
+        raise CustomAPIException("文件夹不存在", 404)
+
+    folder.sort_order = _sort_order_between(folder.parent_id, folder.id, before_id, after_id)
+    cache.invalidate_after_commit(kb_stats_service.TREE_CACHE_TAG)
+    db.session.commit()
+
+    return ResponseTemplate.success(
+        message="目录排序成功",
+        data={"id": folder.id, "parent_id": folder.parent_id, "sort_order": folder.sort_order},
+    )
+
+
+def move_folder(folder_id: int):
+    """
+    移动目录（连同整棵子树）到新的父目录下
+    POST /api/kb/folders/<folder_id>/move
+    JSON body:
+      {
+        "parent_id": 3,       # 新父目录，移到根目录传 null
+        "after_id": 12,       # 可选，新父目录下放在谁后面
+        "before_id": 15       # 可选，新父目录下放在谁前面；都不传则追加到末尾
+      }
+    """
+    data = _get_json()
+    if "parent_id" not in data:
+        raise CustomAPIException("缺少 parent_id", 400)
+    parent_id = data.get("parent_id") or None
+    before_id, after_id = _position_args(data)
+
+    folder = KbFolder.query.filter_by(id=folder_id, is_deleted=False).first()
+    if not folder:
+        raise CustomAPIException("文件夹不存在", 404)
+
+    if parent_id is not None:
+        if not KbFolder.query.filter_by(id=parent_id, is_deleted=False).first():
+            raise CustomAPIException("目标父目录不存在", 404)
+        if folder.id in ancestor_ids(parent_id):
+            raise CustomAPIException("不能把目录移动到它自己或它的子目录下", 400)
+
+    old_parent_id = folder.parent_id
+    kb_stats_service.subtree_moved(folder, old_parent_id, parent_id)
+    folder.parent_id = parent_id
+    folder.sort_order = _sort_order_between(parent_id, folder.id, before_id, after_id)
+    cache.invalidate_after_commit(kb_stats_service.TREE_CACHE_TAG)
+    db.session.commit()
+
+    return ResponseTemplate.success(
+        message="目录移动成功",
+        data={
+            "id": folder.id,
+            "old_parent_id": old_parent_id,
+            "parent_id": folder.parent_id,
+            "sort_order": folder.sort_order,
+        },
+    )
@@ -0,0 +1,62 @@
+# app/services/kb_recycle_service.py
+"""
+回收站清理：把软删除超过 KB_RECYCLE_RETENTION_DAYS 天的文件 / 目录物理删除。
+
+MySQL 没有部分索引，软删除的行会一直留在 (folder_id, is_deleted, ...) 这些复合索引里，
+定期清理可以让热索引只包含（基本上）未删除的数据。
+- 按批次（先查 id 再按 id 删除）执行，每批一个短事务，不长时间锁表
+- 先删文件标签、再删文件、最后自底向上删目录（目录下还有未清理的文件 / 子目录时跳过）
+- t_documents 和 MinIO 对象不动（可能被其他地方引用）
+"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, select
+
+from app.extensions import db
+from app.models.kb_models import KbFile, KbFileTag, KbFolder
+
+
+def purge_deleted(retention_days: int = 30, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    """返回清理数量；dry_run 时只统计可清理的文件数和当前可直接清理的目录数"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    stats = {"files": 0, "folders": 0, "cutoff": cutoff.isoformat(timespec="seconds"), "dry_run": dry_run}
+
+    expired_files = select(KbFile.id).where(KbFile.is_deleted == True, KbFile.updated_at < cutoff)
+
+    # 没有子目录、没有文件（含未过期的已删除文件）的过期目录；自底向上每轮清掉一层
+    child = KbFolder.__table__.alias("child")
+    expired_leaf_folders = select(KbFolder.id).where(
+        KbFolder.is_deleted == True,
+        KbFolder.updated_at < cutoff,
+        ~exists().where(child.c.parent_id == KbFolder.id),
+        ~exists().where(KbFile.folder_id == KbFolder.id),
+    )
+
+    if dry_run:
+        def count(stmt):
+            return db.session.execute(select(func.count()).select_from(stmt.subquery())).scalar()
+
+        stats["files"] = count(expired_files)
+        stats["folders"] = count(expired_leaf_folders)
+        return stats
+
+    # 1. 文件（连同标签关联）
+    while True:
+        ids = db.session.execute(expired_files.order_by(KbFile.updated_at).limit(batch_size)).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(KbFileTag).where(KbFileTag.file_id.in_(ids)))
+        db.session.execute(delete(KbFile).where(KbFile.id.in_(ids)))
+        db.session.commit()
+        stats["files"] += len(ids)
+
+    # 2. 目录
+    while True:
+        ids = db.session.execute(expired_leaf_folders.limit(batch_size)).scalars().all()
+        if not ids:
+            break
+        db.session.execute(delete(KbFolder).where(KbFolder.id.in_(ids)))
+        db.session.commit()
+        stats["folders"] += len(ids)
+
+    return stats
@@ -1,35 +1,50 @@
 import os
 from flask import request, current_app, send_file
-from app.models.kb_models import KbFolder, KbFile, KbTag
+from sqlalchemy import asc, desc, select, update
+from app.models.kb_models import KbFolder, KbFile, KbTag, KbFileTag
 from app.models.result import ResponseTemplate
 from app.exceptions.exceptions import CustomAPIException
+from app.services import activity_service, kb_folder_service, kb_stats_service, preview_service
+from app.utils import cache, db_routing
+from app.utils.streaming import stream_format, stream_response
 from ..extensions import db
 
-def _build_folder_path(folder: KbFolder) -> str:
-    """返回类似 '根目录 / 子目录 / 子子目录' 的路径"""
-    parts = []
-    cur = folder
-    while cur:
-        parts.append(cur.name)
-        cur = cur.parent
-    return " / ".join(reversed(parts))
-
-
-def get_folder_tree():
-    """获取目录树结构"""
-    folders = (
-        KbFolder.query
-        .filter_by(is_deleted=False)
+def build_folder_tree_statement():
+    """目录树查询（get_folder_tree / 执行计划检查共用）"""
+    return (
+        select(
+            KbFolder.id, KbFolder.parent_id, KbFolder.name,
+            KbFolder.file_count, KbFolder.total_bytes, KbFolder.last_file_at,
+        )
+        .where(KbFolder.is_deleted == False)
         .order_by(KbFolder.sort_order, KbFolder.id)
-        .all()
     )
 
+
+@cache.cached(
+    "kb:tree",
+    ttl=lambda: current_app.config.get("KB_TREE_CACHE_TTL", 600),
+    local_ttl=lambda: current_app.config.get("KB_TREE_CACHE_LOCAL_TTL", 60),
+    tags=[kb_stats_service.TREE_CACHE_TAG],
+)
+def load_folder_tree():
+    """
+    目录树（根节点列表）。目录增删改 / 统计变化 commit 后失效。
+    总是读主库：从延迟的只读副本填进缓存的旧数据会一直留到下一次失效。
+    返回的是缓存里的对象，不要修改。
+    """
+    folders = db.session.execute(build_folder_tree_statement()).all()
+
     node_map = {}
     for f in folders:
         node_map[f.id] = {
             "id": f.id,
             "title": f.name,
             "key": str(f.id),
+            # 统计含子孙目录，随目录一起查出
+            "file_count": f.file_count or 0,
+            "total_bytes": f.total_bytes or 0,
+            "last_file_at": f.last_file_at,
             "children": []
         }
 
@@ -40,10 +55,14 @@ def get_folder_tree():
             node_map[f.parent_id]["children"].append(node)
         else:
             roots.append(node)
+    return roots
+
 
+def get_folder_tree():
+    """获取目录树结构"""
     return ResponseTemplate.success(
         message="获取目录树成功",
-        data=roots
+        data=load_folder_tree()
     )
 
 
@@ -54,7 +73,7 @@ def create_folder():
       {
         "name": "施工方案",
         "parent_id": 1,        # 可选，根目录传null或不传
-        "sort_order": 0        # 可选
+        "sort_order": 0        # 可选，不传则排在同级最后
       }
     """
     try:
@@ -67,7 +86,7 @@ def create_folder():
         raise CustomAPIException("目录名称不能为空", 400)
 
     parent_id = data.get("parent_id")
-    sort_order = data.get("sort_order", 0)
+    sort_order = data.get("sort_order")
 
     parent = None
     if parent_id:
@@ -75,14 +94,19 @@ def create_folder():
         if not parent:
             raise CustomAPIException("父目录不存在", 404)
 
+    if sort_order is None:
+        # 不指定时追加到同级末尾（带间隔，后续拖动排序只需改一行）
+        sort_order = kb_folder_service.next_sort_order(parent.id if parent else None)
+
     folder = KbFolder(
         name=name,
         parent_id=parent.id if parent else None,
-        sort_order=sort_order or 0,
+        sort_order=sort_order,
         is_deleted=False,
     )
 
     db.session.add(folder)
+    cache.invalidate_after_commit(kb_stats_service.TREE_CACHE_TAG)
     db.session.commit()
 
     # 前端树节点格式
@@ -90,6 +114,9 @@ def create_folder():
         "id": folder.id,
         "title": folder.name,
         "key": str(folder.id),
+        "file_count": 0,
+        "total_bytes": 0,
+        "last_file_at": None,
         "children": []
     }
 
@@ -99,15 +126,21 @@ def create_folder():
     )
 
 
-from sqlalchemy import asc, desc  # 确保有这个导入
+# 列表 / 搜索只查这些列，不加载 ORM 对象
+FILE_COLUMNS = (
+    KbFile.id,
+    KbFile.name,
+    KbFile.folder_id,
+    KbFile.document_id,
+    KbFile.file_type,
+    KbFile.description,
+    KbFile.version,
+    KbFile.updated_at,
+)
 
-def list_files_by_folder():
-    """根据目录列出文件"""
-    folder_id = request.args.get("folder_id", type=int)
-    if not folder_id:
-        raise CustomAPIException("缺少 folder_id 参数", 400)
 
-    # ⭐ 新增：排序参数
+def _file_order_by():
+    """根据 sort_field / sort_order 参数返回排序表达式"""
     sort_field = (request.args.get("sort_field") or "updated_at").strip()
     sort_order = (request.args.get("sort_order") or "desc").strip().lower()
 
@@ -121,118 +154,209 @@ def list_files_by_folder():
 
     # 升降序
     if sort_order == "asc":
-        order_by_expr = asc(order_col)
-    else:
-        order_by_expr = desc(order_col)
+        return asc(order_col), asc(KbFile.id)
+    return desc(order_col), desc(KbFile.id)
 
-    files = (
-        KbFile.query
-        .filter(KbFile.folder_id == folder_id, KbFile.is_deleted == False)
-        .order_by(order_by_expr)
+
+def _folder_path_resolver():
+    """
+    一次查出所有目录，返回函数 folder_id -> '根目录 / 子目录 / 子子目录'（按需计算并记忆），
+    避免逐个文件沿着 parent 懒加载
+    """
+    rows = db.session.query(KbFolder.id, KbFolder.parent_id, KbFolder.name).all()
+    nodes = {r.id: (r.parent_id, r.name) for r in rows}
+    paths: dict = {}
+
+    def path_of(folder_id):
+        if folder_id in paths:
+            return paths[folder_id]
+        parts = []
+        cur, seen = folder_id, set()
+        while cur in nodes and cur not in seen:
+            if cur in paths:
+                parts.append(paths[cur])
+                break
+            seen.add(cur)
+            parent_id, name = nodes[cur]
+            parts.append(name)
+            cur = parent_id
+        result = " / ".join(reversed(parts))
+        paths[folder_id] = result
+        return result
+
+    return path_of
+
+
+def _tag_names_by_file(file_ids) -> dict:
+    """一次查询拿到一批文件的标签名"""
+    result: dict = {}
+    if not file_ids:
+        return result
+    rows = (
+        db.session.query(KbFileTag.file_id, KbTag.name)
+        .join(KbTag, KbTag.id == KbFileTag.tag_id)
+        .filter(KbFileTag.file_id.in_(file_ids))
         .all()
     )
+    for file_id, name in rows:
+        result.setdefault(file_id, []).append(name)
+    return result
 
-    data = []
-    for f in files:
-        data.append({
-            "id": f.id,
-            "name": f.name,
-            "folder_id": f.folder_id,
-            "document_id": f.document_id,
-            "file_type": f.file_type,
-            "description": f.description,
-            "version": f.version,
-            "updated_at": f.updated_at,
-            "tags": [t.name for t in f.tags],
-        })
 
-    return ResponseTemplate.success(
-        message="获取文件列表成功",
-        data=data
+def iter_file_dicts(stmt, with_folder_path: bool = False, stream: bool = False, with_thumbnails: bool = True):
+    """
+    按批执行文件查询并组装返回的 dict：
+    - 每批一次查询补齐标签、一次查询补齐缩略图地址（没有 N+1）
+    - stream=True 时用单独的连接 + 服务端游标（yield_per），边查边吐，内存与总行数无关；
+      批内的标签 / 缩略图查询走 db.session 的连接，不会和未读完的游标冲突
+    """
+    batch_size = int(current_app.config.get("KB_QUERY_BATCH_SIZE", 1000))
+    path_of = _folder_path_resolver() if with_folder_path else None
+
+    def build(rows):
+        tags = _tag_names_by_file([r.id for r in rows])
+        thumbs = preview_service.thumbnail_urls(r.document_id for r in rows) if with_thumbnails else {}
+        for r in rows:
+            item = {
+                "id": r.id,
+                "name": r.name,
+                "folder_id": r.folder_id,
+                "document_id": r.document_id,
+                "file_type": r.file_type,
+                "description": r.description,
+                "version": r.version,
+                "updated_at": r.updated_at,
+                "tags": tags.get(r.id, []),
+                "thumbnail_url": thumbs.get(r.document_id),
+            }
+            if path_of is not None:
+                item["folder_path"] = path_of(r.folder_id) if r.folder_id else ""
+            yield item
+
+    if not stream:
+        rows = db.session.execute(stmt).all()
+        for i in range(0, len(rows), batch_size):
+            yield from build(rows[i:i + batch_size])
+        return
+
+    with db_routing.read_engine(db).connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        for partition in result.partitions():
+            yield from build(partition)
+
+
+def build_folder_files_statement(folder_id: int):
+    """目录下的文件（list_files_by_folder / 执行计划检查共用），排序取自请求参数"""
+    return (
+        select(*FILE_COLUMNS)
+        .where(KbFile.folder_id == folder_id, KbFile.is_deleted == False)
+        .order_by(*_file_order_by())
     )
 
-from sqlalchemy import asc, desc  # 同样需要这个导入
 
-def search_files():
+def list_files_by_folder():
     """
-    文件搜索：支持文件名 + 标签
+    根据目录列出文件
     GET 参数：
-      q:          模糊匹配文件名
-      tags:       逗号分隔的标签名列表（满足其一即可）
+      folder_id:  必填
       sort_field: name / updated_at / file_type （可选）
       sort_order: asc / desc （可选）
+      stream:     ndjson / json（可选，大目录流式返回）
     """
-    q_str = request.args.get("q", "", type=str).strip()
-    tag_str = request.args.get("tags", "", type=str).strip()
+    folder_id = request.args.get("folder_id", type=int)
+    if not folder_id:
+        raise CustomAPIException("缺少 folder_id 参数", 400)
 
-    # ⭐ 新增：排序参数
-    sort_field = (request.args.get("sort_field") or "updated_at").strip()
-    sort_order = (request.args.get("sort_order") or "desc").strip().lower()
+    stmt = build_folder_files_statement(folder_id)
 
-    sort_map = {
-      "name": KbFile.name,
-      "updated_at": KbFile.updated_at,
-      "file_type": KbFile.file_type,
-    }
-    order_col = sort_map.get(sort_field, KbFile.updated_at)
+    fmt = stream_format()
+    if fmt:
+        return stream_response(iter_file_dicts(stmt, stream=True), fmt, "获取文件列表成功")
 
-    if sort_order == "asc":
-        order_by_expr = asc(order_col)
-    else:
-        order_by_expr = desc(order_col)
+    return ResponseTemplate.success(
+        message="获取文件列表成功",
+        data=list(iter_file_dicts(stmt))
+    )
 
-    query = KbFile.query.filter(KbFile.is_deleted == False)
+
+def build_search_statement():
+    """
+    根据搜索参数构造查询（search_files / 导出共用）
+      q:    模糊匹配文件名
+      tags: 逗号分隔的标签名列表（满足其一即可）
+    """
+    q_str = request.args.get("q", "", type=str).strip()
+    tag_str = request.args.get("tags", "", type=str).strip()
+
+    stmt = select(*FILE_COLUMNS).where(KbFile.is_deleted == False)
 
     # 文件名模糊搜索
     if q_str:
         like = f"%{q_str}%"
-        query = query.filter(KbFile.name.like(like))
+        stmt = stmt.where(KbFile.name.like(like))
 
-    # 标签过滤：当前简单逻辑是“包含任意一个标签”
+    # 标签过滤：当前简单逻辑是“包含任意一个标签”（用子查询代替 join + distinct）
     if tag_str:
         tags = [t.strip() for t in tag_str.split(",") if t.strip()]
         if tags:
-            query = query.join(KbFile.tags).filter(KbTag.name.in_(tags)).distinct()
+            tagged = (
+                select(KbFileTag.file_id)
+                .join(KbTag, KbTag.id == KbFileTag.tag_id)
+                .where(KbTag.name.in_(tags))
+            )
+            stmt = stmt.where(KbFile.id.in_(tagged))
 
     # ⭐ 应用排序
-    files = query.order_by(order_by_expr).all()
+    return stmt.order_by(*_file_order_by())
 
-    data = []
-    for f in files:
-        folder_path = _build_folder_path(f.folder) if f.folder else ""
-        data.append({
-            "id": f.id,
-            "name": f.name,
-            "folder_id": f.folder_id,
-            "folder_path": folder_path,
-            "document_id": f.document_id,
-            "file_type": f.file_type,
-            "description": f.description,
-            "version": f.version,
-            "updated_at": f.updated_at,
-            "tags": [t.name for t in f.tags],
-        })
+
+def search_files():
+    """
+    文件搜索：支持文件名 + 标签
+    GET 参数：
+      q:          模糊匹配文件名
+      tags:       逗号分隔的标签名列表（满足其一即可）
+      sort_field: name / updated_at / file_type （可选）
+      sort_order: asc / desc （可选）
+      stream:     ndjson / json（可选，结果很多时流式返回）
+    """
+    stmt = build_search_statement()
+
+    fmt = stream_format()
+    if fmt:
+        return stream_response(
+            iter_file_dicts(stmt, with_folder_path=True, stream=True), fmt, "搜索文件成功"
+        )
 
     return ResponseTemplate.success(
         message="搜索文件成功",
-        data=data
+        data=list(iter_file_dicts(stmt, with_folder_path=True))
     )
 
 
-def list_tags():
-    """列出所有标签（用于前端下拉多选）"""
-    tags = KbTag.query.order_by(KbTag.name).all()
-    data = [
+@cache.cached(
+    "kb:tags",
+    ttl=lambda: current_app.config.get("KB_TREE_CACHE_TTL", 600),
+    local_ttl=lambda: current_app.config.get("KB_TREE_CACHE_LOCAL_TTL", 60),
+    tags=[kb_stats_service.TAGS_CACHE_TAG],
+)
+def load_tags():
+    """全部标签，新建标签 commit 后失效；与目录树一样总是读主库"""
+    return [
         {
             "id": t.id,
             "name": t.name,
             "color": t.color,
         }
-        for t in tags
+        for t in KbTag.query.order_by(KbTag.name).all()
     ]
+
+
+def list_tags():
+    """列出所有标签（用于前端下拉多选）"""
     return ResponseTemplate.success(
         message="获取标签列表成功",
-        data=data
+        data=load_tags()
     )
 
 
@@ -258,6 +382,7 @@ def _get_or_create_tags(tag_names):
         if not tag:
             tag = KbTag(name=name)
             db.session.add(tag)
+            cache.invalidate_after_commit(kb_stats_service.TAGS_CACHE_TAG)
             existing_map[name] = tag
         result.append(tag)
     return result
@@ -332,7 +457,12 @@ def upload_file():
         tag_objs = []
 
     db.session.add(kb_file)
+    kb_stats_service.file_added(folder_id, document_id)
     db.session.commit()
+    activity_service.record(
+        "upload", file_id=kb_file.id, folder_id=kb_file.folder_id, name=kb_file.name,
+        user_id=activity_service.current_user_id(),
+    )
 
     return ResponseTemplate.success(
         message="文件登记成功",
@@ -378,6 +508,10 @@ def update_file_tags(file_id: int):
     # 替换标签
     kb_file.tags = tag_objs
     db.session.commit()
+    activity_service.record(
+        "tags", file_id=kb_file.id, folder_id=kb_file.folder_id, name=kb_file.name,
+        user_id=activity_service.current_user_id(),
+    )
 
     return ResponseTemplate.success(
         message="标签更新成功",
@@ -444,7 +578,12 @@ def delete_file(file_id: int):
       raise CustomAPIException("文件不存在", 404)
 
   kb_file.is_deleted = True
+  kb_stats_service.file_removed(kb_file.folder_id, kb_file.document_id)
   db.session.commit()
+  activity_service.record(
+      "delete", file_id=kb_file.id, folder_id=kb_file.folder_id, name=kb_file.name,
+      user_id=activity_service.current_user_id(),
+  )
 
 
   return ResponseTemplate.success(
@@ -475,6 +614,7 @@ def rename_folder(folder_id):
         raise CustomAPIException("文件夹不存在", 404)
 
     folder.name = new_name
+    cache.invalidate_after_commit(kb_stats_service.TREE_CACHE_TAG)
     db.session.commit()
 
     return ResponseTemplate.success(
@@ -494,23 +634,33 @@ def delete_folder(folder_id):
     if not folder:
         raise CustomAPIException("文件夹不存在", 404)
 
-    # 软删除该文件夹
-    folder.is_deleted = True
+    # 整棵子树一条递归 CTE 查出，目录和文件各一条 UPDATE 软删除
+    folder_ids = kb_folder_service.subtree_ids(folder.id)
 
-    # 删除该文件夹下的所有文件（软删除）
-    files = KbFile.query.filter_by(folder_id=folder.id, is_deleted=False).all()
-    for file in files:
-        file.is_deleted = True
-
-    # 删除该文件夹下的所有子文件夹（递归删除）
-    subfolders = KbFolder.query.filter_by(parent_id=folder.id, is_deleted=False).all()
-    for subfolder in subfolders:
-        delete_folder(subfolder.id)  # Recursive delete
+    # 祖先链减掉这棵子树的统计
+    kb_stats_service.apply_delta(folder.parent_id, -(folder.file_count or 0), -(folder.total_bytes or 0))
 
+    db.session.execute(
+        update(KbFile)
+        .where(KbFile.folder_id.in_(folder_ids), KbFile.is_deleted == False)
+        .values(is_deleted=True),
+        execution_options={"synchronize_session": False},
+    )
+    db.session.execute(
+        update(KbFolder)
+        .where(KbFolder.id.in_(folder_ids))
+        .values(is_deleted=True),
+        execution_options={"synchronize_session": False},
+    )
+    cache.invalidate_after_commit(kb_stats_service.TREE_CACHE_TAG)
     db.session.commit()
+    activity_service.record(
+        "delete_folder", folder_id=folder.parent_id, name=folder.name,
+        user_id=activity_service.current_user_id(),
+    )
 
     return ResponseTemplate.success(
         message="文件夹及其所有内容删除成功",
-        data={"id": folder.id}
+        data={"id": folder_id}
     )
 
@@ -0,0 +1,227 @@
+# app/services/kb_stats_service.py
+"""
+目录统计（含所有子孙目录）：file_count / total_bytes / last_file_at
+
+- 存在 t_kb_folder 上，get_folder_tree 读目录时顺带取出，不需要额外查询
+- 上传 / 删除文件、删除 / 移动目录、在线编辑保存时增量更新：
+  先用一条递归 CTE 找出所有受影响的祖先，再把每个目录的增量作为参数，一条 UPDATE 按 executemany 执行
+- 增量和业务写操作在同一个事务里，由调用方 commit
+- last_file_at 只会往后推（删除文件不会回退），recompute_all() 负责修正累计误差
+- 统计变化后目录树缓存（TREE_CACHE_TAG）在 commit 之后失效
+"""
+from collections import defaultdict
+from datetime import datetime
+from typing import Iterable, Optional
+
+from sqlalchemy import bindparam, case, func, select, update
+
+from app.extensions import db
+from app.models.document import Document
+from app.models.kb_models import KbFile, KbFolder
+from app.utils import cache
+
+# 知识库缓存标签（kb_service 的目录树 / 标签列表）；放在这里是因为其他 kb_* 服务都依赖本模块
+TREE_CACHE_TAG = "kb:tree"
+TAGS_CACHE_TAG = "kb:tags"
+
+
+def _ancestor_pairs(folder_ids: Iterable[int]) -> list[tuple[int, int]]:
+    """[(起点目录, 起点自己或祖先)]，一条递归 CTE 查完一批目录的祖先链"""
+    folder_ids = list({fid for fid in folder_ids if fid})
+    if not folder_ids:
+        return []
+
+    base = select(KbFolder.id.label("start_id"), KbFolder.id, KbFolder.parent_id).where(
+        KbFolder.id.in_(folder_ids)
+    )
+    anc = base.cte("anc", recursive=True)
+    anc = anc.union_all(
+        select(anc.c.start_id, KbFolder.id, KbFolder.parent_id).join(anc, KbFolder.id == anc.c.parent_id)
+    )
+    return [(r[0], r[1]) for r in db.session.execute(select(anc.c.start_id, anc.c.id))]
+
+
+def document_sizes(document_ids: Iterable[int]) -> dict:
+    """document_id -> size（查不到或为空按 0 处理；非数字的 document_id 忽略）"""
+    ids = list({int(d) for d in document_ids if d and str(d).isdigit()})
+    if not ids:
+        return {}
+    return {
+        r.id: r.size or 0
+        for r in db.session.query(Document.id, Document.size).filter(Document.id.in_(ids))
+    }
+
+
+def apply_deltas(deltas: dict, invalidate: bool = True) -> None:
+    """
+    deltas: {folder_id: (文件数增量, 字节数增量, 最新文件时间或 None)}
+    每个 folder 自己和所有祖先都加上对应增量。
+    invalidate: 是否在 commit 后失效目录树缓存（批量导入结束时自己统一失效）
+    """
+    deltas = {fid: d for fid, d in deltas.items() if fid and (d[0] or d[1] or d[2])}
+    if not deltas:
+        return
+
+    # 汇总到每个祖先
+    per_folder: dict = defaultdict(lambda: [0, 0, None])
+    for start_id, folder_id in _ancestor_pairs(deltas):
+        files, size, last_at = deltas[start_id]
+        acc = per_folder[folder_id]
+        acc[0] += files
+        acc[1] += size
+        if last_at and (acc[2] is None or last_at > acc[2]):
+            acc[2] = last_at
+
+    if invalidate:
+        cache.invalidate_after_commit(TREE_CACHE_TAG)
+
+    # 一条语句 + 每个目录一组参数（executemany），不用为每种增量各编译一条 UPDATE
+    folders = KbFolder.__table__
+    b_last_at = bindparam("b_last_at", type_=folders.c.last_file_at.type)
+    stmt = (
+        update(folders)
+        .where(folders.c.id == bindparam("b_id"))
+        .values(
+            file_count=folders.c.file_count + bindparam("b_files"),
+            total_bytes=folders.c.total_bytes + bindparam("b_size"),
+            # last_file_at 只往后推
+            last_file_at=case(
+                (b_last_at.is_(None), folders.c.last_file_at),
+                (folders.c.last_file_at.is_(None), b_last_at),
+                (folders.c.last_file_at < b_last_at, b_last_at),
+                else_=folders.c.last_file_at,
+            ),
+        )
+    )
+    db.session.execute(stmt, [
+        {"b_id": folder_id, "b_files": files, "b_size": size, "b_last_at": last_at}
+        for folder_id, (files, size, last_at) in per_folder.items()
+    ])
+
+
+def apply_delta(folder_id: Optional[int], files: int, size: int, last_at: Optional[datetime] = None) -> None:
+    apply_deltas({folder_id: (files, size, last_at)})
+
+
+def files_added(rows: Iterable[tuple], when: Optional[datetime] = None) -> None:
+    """rows: [(folder_id, document_id)]，批量登记文件后调用"""
+    rows = list(rows)
+    sizes = document_sizes(d for _, d in rows)
+    when = when or datetime.utcnow()
+    deltas: dict = {}
+    for folder_id, document_id in rows:
+        files, size, _ = deltas.get(folder_id, (0, 0, None))
+        deltas[folder_id] = (files + 1, size + sizes.get(_int_or_none(document_id), 0), when)
+    apply_deltas(deltas)
+
+
+def file_added(folder_id: int, document_id, when: Optional[datetime] = None) -> None:
+    files_added([(folder_id, document_id)], when)
+
+
+def file_removed(folder_id: int, document_id) -> None:
+    size = document_sizes([document_id]).get(_int_or_none(document_id), 0)
+    apply_delta(folder_id, -1, -size)
+
+
+def _int_or_none(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def document_resized(document_id: int, old_size: Optional[int], new_size: Optional[int],
+                     when: Optional[datetime] = None) -> None:
+    """在线编辑保存后文档大小变化：所有引用这个文档的知识库文件所在目录都要调整"""
+    diff = (new_size or 0) - (old_size or 0)
+    folder_ids = [
+        fid for (fid,) in db.session.query(KbFile.folder_id).filter(
+            KbFile.document_id == document_id, KbFile.is_deleted == False
+        )
+    ]
+    deltas: dict = {}
+    for fid in folder_ids:
+        files, size, _ = deltas.get(fid, (0, 0, None))
+        deltas[fid] = (files, size + diff, when or datetime.utcnow())
+    apply_deltas(deltas)
+
+
+def subtree_moved(folder: KbFolder, old_parent_id: Optional[int], new_parent_id: Optional[int]) -> None:
+    """整棵子树从 old_parent 挪到 new_parent：旧祖先链减掉、新祖先链加上"""
+    if old_parent_id == new_parent_id:
+        return
+    files, size, last_at = folder.file_count or 0, folder.total_bytes or 0, folder.last_file_at
+    if not (files or size):
+        return
+    deltas = {}
+    if old_parent_id:
+        deltas[old_parent_id] = (-files, -size, None)
+    if new_parent_id:
+        deltas[new_parent_id] = (files, size, last_at)
+    apply_deltas(deltas)
+
+
+def recompute_all(dry_run: bool = False) -> dict:
+    """
+    从 t_kb_file / t_documents 重新汇总所有目录的统计，修正增量维护产生的偏差。
+    一次 GROUP BY 拿到每个目录直接包含的文件，再在内存里自底向上累加；只写有变化的行。
+    """
+    folders = db.session.query(
+        KbFolder.id, KbFolder.parent_id, KbFolder.file_count, KbFolder.total_bytes, KbFolder.last_file_at
+    ).filter(KbFolder.is_deleted == False).all()
+
+    direct = {
+        r.folder_id: (r.files, int(r.size or 0), r.last_at)
+        for r in db.session.query(
+            KbFile.folder_id,
+            func.count(KbFile.id).label("files"),
+            func.coalesce(func.sum(Document.size), 0).label("size"),
+            func.max(KbFile.updated_at).label("last_at"),
+        )
+        .outerjoin(Document, Document.id == KbFile.document_id)
+        .filter(KbFile.is_deleted == False)
+        .group_by(KbFile.folder_id)
+    }
+
+    children: dict = defaultdict(list)
+    alive = {f.id for f in folders}
+    for f in folders:
+        if f.parent_id in alive:
+            children[f.parent_id].append(f.id)
+
+    totals: dict = {}
+
+    def total(folder_id):
+        # 用显式栈做后序遍历，目录很深也不会递归溢出
+        stack = [(folder_id, False)]
+        while stack:
+            fid, expanded = stack.pop()
+            if fid in totals:
+                continue
+            if not expanded:
+                stack.append((fid, True))
+                stack.extend((c, False) for c in children[fid] if c not in totals)
+                continue
+            files, size, last_at = direct.get(fid, (0, 0, None))
+            for c in children[fid]:
+                c_files, c_size, c_last = totals.get(c, (0, 0, None))
+                files += c_files
+                size += c_size
+                if c_last and (last_at is None or c_last > last_at):
+                    last_at = c_last
+            totals[fid] = (files, size, last_at)
+        return totals[folder_id]
+
+    changed = []
+    for f in folders:
+        files, size, last_at = total(f.id)
+        if (f.file_count, f.total_bytes, f.last_file_at) != (files, size, last_at):
+            changed.append({"id": f.id, "file_count": files, "total_bytes": size, "last_file_at": last_at})
+
+    if changed and not dry_run:
+        db.session.execute(update(KbFolder), changed)
+        cache.invalidate_after_commit(TREE_CACHE_TAG)
+        db.session.commit()
+
+    return {"folders": len(folders), "changed": len(changed), "dry_run": dry_run}
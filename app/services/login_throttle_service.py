@@ -0,0 +1,85 @@
+# app/services/login_throttle_service.py
+"""
+登录失败限流（Redis 计数，每次失败顺延窗口）：
+- 同一用户名连续失败 LOGIN_MAX_FAILURES_PER_USER 次后锁定 LOGIN_FAILURE_WINDOW 秒
+- 同一 IP 失败 LOGIN_MAX_FAILURES_PER_IP 次后锁定
+在做密码哈希之前检查，暴力破解的请求不会消耗哈希算力。
+Redis 不可用（熔断时 get_redis() 返回 None）时不限流；出错只在第一次记堆栈，恢复后再记一条，
+不会每次登录都刷一遍日志。
+"""
+from flask import current_app
+
+from app.exceptions.exceptions import TooManyRequestsException
+from app.extensions import get_redis
+
+USER_KEY = "login:fail:user:{}"
+IP_KEY = "login:fail:ip:{}"
+
+
+# 本进程当前是否处在“Redis 出错”状态，用来只记一次日志
+_redis_failing = False
+
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default)
+
+
+def _redis_failed() -> None:
+    global _redis_failing
+    if not _redis_failing:
+        _redis_failing = True
+        current_app.logger.warning("[LoginThrottle] redis unavailable, login throttling disabled", exc_info=True)
+
+
+def _redis_ok() -> None:
+    global _redis_failing
+    if _redis_failing:
+        _redis_failing = False
+        current_app.logger.warning("[LoginThrottle] redis is back, login throttling resumed")
+
+
+def check_login_allowed(username: str, ip: str) -> None:
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        user_fails, ip_fails = r.mget(USER_KEY.format(username), IP_KEY.format(ip))
+    except Exception:
+        _redis_failed()
+        return
+    _redis_ok()
+
+    if int(user_fails or 0) >= int(_cfg("LOGIN_MAX_FAILURES_PER_USER", 5)) or \
+            int(ip_fails or 0) >= int(_cfg("LOGIN_MAX_FAILURES_PER_IP", 50)):
+        raise TooManyRequestsException(
+            "登录失败次数过多，请稍后再试", retry_after=int(_cfg("LOGIN_FAILURE_WINDOW", 900))
+        )
+
+
+def record_login_failure(username: str, ip: str) -> None:
+    r = get_redis()
+    if r is None:
+        return
+    window = int(_cfg("LOGIN_FAILURE_WINDOW", 900))
+    try:
+        pipe = r.pipeline()
+        for key in (USER_KEY.format(username), IP_KEY.format(ip)):
+            pipe.incr(key)
+            pipe.expire(key, window)
+        pipe.execute()
+    except Exception:
+        _redis_failed()
+        return
+    _redis_ok()
+
+
+def reset_login_failures(username: str) -> None:
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        r.delete(USER_KEY.format(username))
+    except Exception:
+        _redis_failed()
+        return
+    _redis_ok()
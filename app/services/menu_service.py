@@ -0,0 +1,263 @@
+# app/services/menu_service.py
+"""
+菜单缓存：
+- 只查一次扁平的列（不加载 ORM 对象、不做自关联 join），在内存里建树
+- 树 / 扁平列表都预先序列化成 JSON bytes，配合 ETag 直接返回
+- 增删改菜单 / 角色权限后调用 invalidate_menu_cache()：本进程立即失效，
+  其他进程通过 Redis 里的 menu:version 在 MENU_VERSION_CHECK_INTERVAL 秒内感知
+
+按权限过滤：
+- 每个菜单在快照里有一个位序号（flat 中的下标）
+- 每个角色的可见菜单预先算成一个 int 位图；用户的位图 = 所属角色位图按位或
+- 每个节点预先算好“自己 + 所有子孙”的位图，与用户位图相与不为 0 就保留（父节点跟随子节点显示）
+- 同一位图的结果树序列化后缓存在快照上，请求期间不查库
+"""
+import hashlib
+import threading
+import time
+from typing import Optional
+
+from flask import Response, current_app, request
+
+from app.extensions import db, get_redis
+from app.models.menu import Menu
+from app.models.role import ADMIN_ROLES, Role, RoleMenu, SUPER_ADMIN_ROLE
+
+VERSION_KEY = "menu:version"
+
+MENU_COLUMNS = (
+    Menu.id,
+    Menu.created_at,
+    Menu.created_by,
+    Menu.updated_at,
+    Menu.updated_by,
+    Menu.component,
+    Menu.icon,
+    Menu.name,
+    Menu.path,
+    Menu.parent_id,
+)
+
+
+class MenuSnapshot:
+    def __init__(self, version: str, flat: list[dict], tree: list[dict],
+                 role_menu_pairs=(), super_role_ids=frozenset(), admin_role_ids=frozenset()):
+        self.version = version
+        self.flat = flat
+        self.tree = tree
+        self.flat_json = current_app.json.dumps(flat).encode("utf-8")
+        self.tree_json = current_app.json.dumps(tree).encode("utf-8")
+        self.flat_etag = _etag(self.flat_json)
+        self.tree_etag = _etag(self.tree_json)
+
+        self.index = {m["id"]: pos for pos, m in enumerate(flat)}
+        self.all_mask = (1 << len(flat)) - 1
+        self.subtree_masks = compute_subtree_masks(tree, self.index)
+        self.role_masks = compute_role_masks(role_menu_pairs, self.index)
+        self.super_role_ids = frozenset(super_role_ids)
+        self.admin_role_ids = frozenset(admin_role_ids)
+        # 位图 -> (json bytes, etag)，相同角色组合的用户共用
+        self._user_trees: dict[int, tuple[bytes, str]] = {}
+        self._user_trees_lock = threading.Lock()
+
+    def mask_for_roles(self, role_ids) -> int:
+        mask = 0
+        for rid in role_ids or ():
+            if rid in self.super_role_ids:
+                return self.all_mask
+            mask |= self.role_masks.get(rid, 0)
+        return mask
+
+    def tree_for_mask(self, mask: int) -> tuple[bytes, str]:
+        cached = self._user_trees.get(mask)
+        if cached is not None:
+            return cached
+
+        if mask & self.all_mask == self.all_mask:
+            cached = (self.tree_json, self.tree_etag)
+        else:
+            body = current_app.json.dumps(
+                prune_tree(self.tree, self.index, self.subtree_masks, mask)
+            ).encode("utf-8")
+            cached = (body, _etag(body))
+
+        with self._user_trees_lock:
+            if len(self._user_trees) >= int(current_app.config.get("MENU_USER_TREE_CACHE_SIZE", 1024)):
+                self._user_trees.clear()
+            self._user_trees[mask] = cached
+        return cached
+
+
+_lock = threading.Lock()
+_snapshot: Optional[MenuSnapshot] = None
+_local_version = 0
+_version_cache = ("", 0.0)  # (version, 检查时间)
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+
+
+def _row_to_dict(r) -> dict:
+    """与 Menu.to_dict(include_children=False) 结构一致"""
+    return {
+        "id": r.id,
+        "created_at": r.created_at.isoformat() if r.created_at else None,
+        "created_by": r.created_by,
+        "updated_at": r.updated_at.isoformat() if r.updated_at else None,
+        "updated_by": r.updated_by,
+        "component": r.component,
+        "icon": r.icon,
+        "name": r.name,
+        "path": r.path,
+        "parent_id": r.parent_id,
+    }
+
+
+def build_menu_tree(items: list[dict]) -> list[dict]:
+    """
+    把扁平的菜单 dict 列表转成树形结构（不修改入参）：
+    [
+      { id, name, path, children: [...] },
+      ...
+    ]
+    """
+    # 先按 id 建个字典
+    item_dict: dict[int, dict] = {}
+    roots: list[dict] = []
+
+    for m in items:
+        node = dict(m)
+        node["children"] = []
+        item_dict[m["id"]] = node
+
+    # 建树
+    for m in items:
+        node = item_dict[m["id"]]
+        parent_id = m["parent_id"]
+        if parent_id and parent_id in item_dict:
+            item_dict[parent_id]["children"].append(node)
+        else:
+            roots.append(node)
+
+    return roots
+
+
+def compute_subtree_masks(tree: list[dict], index: dict[int, int]) -> list[int]:
+    """每个节点（按位序号）的 “自己 + 所有子孙” 位图"""
+    masks = [0] * len(index)
+
+    def walk(node: dict) -> int:
+        mask = 1 << index[node["id"]]
+        for child in node["children"]:
+            mask |= walk(child)
+        masks[index[node["id"]]] = mask
+        return mask
+
+    for root in tree:
+        walk(root)
+    return masks
+
+
+def compute_role_masks(role_menu_pairs, index: dict[int, int]) -> dict[int, int]:
+    """(role_id, menu_id) 列表 -> {role_id: 位图}"""
+    masks: dict[int, int] = {}
+    for role_id, menu_id in role_menu_pairs:
+        pos = index.get(menu_id)
+        if pos is not None:
+            masks[role_id] = masks.get(role_id, 0) | (1 << pos)
+    return masks
+
+
+def prune_tree(nodes: list[dict], index: dict[int, int], subtree_masks: list[int], mask: int) -> list[dict]:
+    """只保留子树与 mask 有交集的节点（不修改缓存里的原树）"""
+    result = []
+    for node in nodes:
+        if not subtree_masks[index[node["id"]]] & mask:
+            continue
+        pruned = dict(node)
+        pruned["children"] = prune_tree(node["children"], index, subtree_masks, mask)
+        result.append(pruned)
+    return result
+
+
+def _current_version() -> str:
+    global _version_cache
+    r = get_redis()
+    if r is None:
+        return str(_local_version)
+
+    version, checked_at = _version_cache
+    now = time.monotonic()
+    if version and now - checked_at < float(current_app.config.get("MENU_VERSION_CHECK_INTERVAL", 1.0)):
+        return version
+
+    try:
+        version = f"{_local_version}:{r.get(VERSION_KEY) or 0}"
+    except Exception:
+        current_app.logger.warning("[MenuCache] redis get version failed", exc_info=True)
+        version = version or str(_local_version)
+    _version_cache = (version, now)
+    return version
+
+
+def _load_snapshot(version: str) -> MenuSnapshot:
+    rows = db.session.query(*MENU_COLUMNS).order_by(Menu.id.asc()).all()
+    flat = [_row_to_dict(r) for r in rows]
+    pairs = db.session.query(RoleMenu.role_id, RoleMenu.menu_id).all()
+    role_codes = db.session.query(Role.id, Role.code).filter(Role.code.in_(ADMIN_ROLES)).all()
+    super_role_ids = [rid for rid, code in role_codes if code == SUPER_ADMIN_ROLE]
+    admin_role_ids = [rid for rid, _ in role_codes]
+    return MenuSnapshot(version, flat, build_menu_tree(flat), pairs, super_role_ids, admin_role_ids)
+
+
+def get_snapshot() -> MenuSnapshot:
+    global _snapshot
+    version = _current_version()
+    snap = _snapshot
+    if snap is not None and snap.version == version:
+        return snap
+
+    with _lock:
+        snap = _snapshot
+        if snap is None or snap.version != version:
+            snap = _load_snapshot(version)
+            _snapshot = snap
+    return snap
+
+
+def user_tree_response(role_ids) -> Response:
+    """按用户所属角色返回裁剪后的菜单树"""
+    snap = get_snapshot()
+    body, etag = snap.tree_for_mask(snap.mask_for_roles(role_ids))
+    return json_response(body, etag)
+
+
+def is_admin(role_ids) -> bool:
+    """角色里有 super_admin / admin（角色表变更后随菜单快照一起失效）"""
+    admin_role_ids = get_snapshot().admin_role_ids
+    return any(rid in admin_role_ids for rid in role_ids or ())
+
+
+def invalidate_menu_cache() -> None:
+    """菜单增删改、角色菜单权限变更 commit 之后调用"""
+    global _snapshot, _local_version, _version_cache
+    with _lock:
+        _local_version += 1
+        _snapshot = None
+        _version_cache = ("", 0.0)
+
+    r = get_redis()
+    if r is not None:
+        try:
+            r.incr(VERSION_KEY)
+        except Exception:
+            current_app.logger.warning("[MenuCache] redis incr version failed", exc_info=True)
+
+
+def json_response(body: bytes, etag: str) -> Response:
+    """返回预序列化好的 JSON；If-None-Match 命中时返回 304"""
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=304, headers=headers)
+    return Response(body, mimetype="application/json", headers=headers)
@@ -1,19 +1,20 @@
 # app/services/onlyoffice_service.py
 import hashlib
+import os
+import threading
 import time
-import io
 import mimetypes
 import jwt as pyjwt
-import requests
 from datetime import datetime
+from urllib.parse import quote
 
-from flask import current_app, request, jsonify, send_file
+from flask import Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import get_jwt_identity
 
 from app.models.result import ResponseTemplate
-from app.models.user import User
+from app.services import activity_service, kb_stats_service, user_cache_service
 from app.models.document import Document, DocumentStatus
-from app.utils import minio_storage  # 引入刚才修改的 minio_storage
+from app.utils import metrics, minio_storage, task_pool  # 引入刚才修改的 minio_storage
 from app.extensions import db
 from app.exceptions.exceptions import CustomAPIException
 
@@ -42,6 +43,16 @@ def _verify_callback_jwt() -> bool:
         return False
 
 
+def _encode_jwt(payload: dict) -> str:
+    """按 ONLYOFFICE_JWT_SECRET 签名（编辑器配置 / 命令服务共用）"""
+    secret = _cfg("ONLYOFFICE_JWT_SECRET", "MyJWTSecretKey123")
+    alg = _cfg("ONLYOFFICE_JWT_ALG", "HS256")
+    token = pyjwt.encode(payload, secret, algorithm=alg)
+    if isinstance(token, (bytes, bytearray)):
+        token = token.decode("utf-8")
+    return token
+
+
 def _doc_key(doc: Document) -> str:
     updated_at = getattr(doc, "updated_at", None)
     ts = int(updated_at.timestamp()) if isinstance(updated_at, datetime) else int(time.time())
@@ -61,30 +72,48 @@ ALLOWED_EXTS_MAP = {
 
 # ============== 核心逻辑 ==============
 
+def _content_disposition(filename: str) -> str:
+    """attachment + RFC 5987 中文文件名（与 send_file 生成的一致）"""
+    try:
+        filename.encode("ascii")
+        return f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        fallback = filename.encode("ascii", "ignore").decode("ascii") or "download"
+        return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename)}"
+
+
 def proxy_download_file(doc_id: int):
     """
     服务：从 MinIO 读取流 -> 转发给 OnlyOffice
+    按块边读边写，内存占用与文件大小无关；读完或客户端断开都会把 MinIO 连接还回连接池
     """
     doc = Document.query.get(doc_id)
     if not doc:
         raise Exception("Document not found")
 
-    # 1. 调用 minio_storage 获取 MinIO 原始流
-    minio_stream = minio_storage.get_object_stream(doc.bucket, doc.object_key)
+    # 1. 先 stat：对象不存在时直接 404，同时拿到 Content-Length
+    stat = minio_storage.stat_object(doc.bucket, doc.object_key)
+    if stat is None:
+        raise CustomAPIException("文件不存在", 404)
 
     # 2. 自动猜测 MIME
     mime_type = doc.content_type
     if not mime_type:
         mime_type, _ = mimetypes.guess_type(doc.file_name)
 
-    # 3. 使用 Flask send_file 转发流
-    # as_attachment=True 配合 download_name 能完美处理中文文件名 (RFC 5987)
-    return send_file(
-        minio_stream,
-        as_attachment=True,
-        download_name=doc.file_name,
+    # 3. 流式转发
+    chunks = minio_storage.iter_object(
+        doc.bucket, doc.object_key, chunk_size=int(_cfg("PROXY_CHUNK_BYTES", 256 * 1024))
+    )
+    return Response(
+        stream_with_context(chunks),
         mimetype=mime_type or "application/octet-stream",
-        max_age=0
+        headers={
+            "Content-Length": str(stat.size),
+            "Content-Disposition": _content_disposition(doc.file_name or "download"),
+            "Cache-Control": "no-cache",
+        },
+        direct_passthrough=True,
     )
 
 
@@ -133,12 +162,7 @@ def _editor_config(doc: Document, id: str, user_name: str, mode: str = "edit"):
     }
 
     # 签名
-    secret = _cfg("ONLYOFFICE_JWT_SECRET", "MyJWTSecretKey123")
-    alg = _cfg("ONLYOFFICE_JWT_ALG", "HS256")
-    token = pyjwt.encode(cfg, secret, algorithm=alg)
-    if isinstance(token, (bytes, bytearray)):
-        token = token.decode("utf-8")
-    cfg["token"] = token
+    cfg["token"] = _encode_jwt(cfg)
 
     return cfg
 
@@ -161,12 +185,12 @@ def get_editor_config():
         raise CustomAPIException("Document not found", 404)
 
     identity = get_jwt_identity()
-    user = User.query.get(identity)
+    user = user_cache_service.get_user_profile(identity)
     if not user:
         raise CustomAPIException("User not found", 401)
 
     return ResponseTemplate.success(
-        data=_editor_config(doc, str(user.id), user.user_fullname, mode),
+        data=_editor_config(doc, str(user["id"]), user["user_fullname"], mode),
         message="OK"
     )
 
@@ -189,27 +213,34 @@ def onlyoffice_callback(document_id: int):
         if status in (2, 6):
             download_url = data.get("url")
             if download_url:
+                import requests  # 只有回调保存用到，不在启动时加载
+
                 current_app.logger.info(f"[OnlyOffice] Downloading updated file from {download_url}")
 
                 # 1. Flask 从 OnlyOffice 下载文件
                 # 这里的 download_url 是 OnlyOffice 容器内部生成的，Flask 必须能访问到它
-                r = requests.get(download_url, stream=True, timeout=60)
-                r.raise_for_status()
-
-                # 2. 读取流数据
-                file_data = io.BytesIO(r.content)
-                length = file_data.getbuffer().nbytes
-
-                # 3. 通过 minio_storage 直接上传流，覆盖原文件
-                minio_storage.upload_stream(
-                    bucket=doc.bucket,
-                    object_key=doc.object_key,
-                    data=file_data,
-                    length=length,
-                    content_type=doc.content_type or "application/octet-stream"
-                )
-
-                # 4. 更新数据库信息
+                with requests.get(download_url, stream=True, timeout=(5, 60)) as r:
+                    r.raise_for_status()
+
+                    # 2. 边下载边上传：不再把整个文件读进内存（r.content），
+                    #    有 Content-Length 就一次 PUT，没有就按 MINIO_STREAM_PART_SIZE 分片上传
+                    r.raw.decode_content = True
+                    body = _CountingReader(r.raw)
+                    declared = r.headers.get("Content-Length")
+                    length = int(declared) if declared and not r.headers.get("Content-Encoding") else -1
+
+                    # 3. 通过 minio_storage 直接上传流，覆盖原文件
+                    minio_storage.upload_stream(
+                        bucket=doc.bucket,
+                        object_key=doc.object_key,
+                        data=body,
+                        length=length,
+                        content_type=doc.content_type or "application/octet-stream"
+                    )
+                    length = body.count
+
+                # 4. 更新数据库信息（知识库目录统计跟着调整）
+                kb_stats_service.document_resized(doc.id, doc.size, length)
                 doc.size = length
                 doc.updated_at = datetime.now()
                 if doc.status != DocumentStatus.COMPLETED:
@@ -218,6 +249,9 @@ def onlyoffice_callback(document_id: int):
                 db.session.commit()
                 current_app.logger.info(f"[OnlyOffice] Saved doc {document_id} success.")
 
+                editors = data.get("users") or []
+                activity_service.record_document_saved(doc.id, user_id=editors[0] if editors else None)
+
         return jsonify({"error": 0}), 200
 
     except Exception as e:
@@ -225,12 +259,188 @@ def onlyoffice_callback(document_id: int):
         return jsonify({"error": 1, "message": str(e)}), 200
 
 
-# 保持原样的辅助函数
+class _CountingReader:
+    """包一层 file-like 对象，记录实际读了多少字节（未知长度上传后用来更新 doc.size）"""
+
+    def __init__(self, raw):
+        self._raw = raw
+        self.count = 0
+
+    def read(self, size=-1):
+        data = self._raw.read(size)
+        self.count += len(data)
+        return data
+
+
+# ============== 命令服务（info / forcesave / drop） ==============
+#
+# 命令服务一次只接受一个 key：一批 key 在进程内的 onlyoffice-command 线程池里并发请求
+# （所有请求共用，最多 ONLYOFFICE_COMMAND_CONCURRENCY 个同时进行），走同一个带连接池的 Session。
+
+COMMAND_ERRORS = {
+    0: "成功",
+    1: "文档未在编辑中（key 不存在）",
+    2: "回调地址错误",
+    3: "Document Server 内部错误",
+    4: "文档没有改动，无需保存",
+    5: "命令错误",
+    6: "token 无效",
+}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def _command_session():
+    """进程内共用的 requests.Session（复用到命令服务的连接），fork 后重建"""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                import requests  # 只有命令服务用到，不在启动时加载
+                from requests.adapters import HTTPAdapter
+
+                adapter = HTTPAdapter(pool_maxsize=int(_cfg("ONLYOFFICE_COMMAND_CONCURRENCY", 8)))
+                session = requests.Session()
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session, _session_pid = session, os.getpid()
+    return _session
+
+
+def _command_targets(data: dict) -> list:
+    """
+    请求体里的 keys（编辑器配置里的 document.key）和 / 或 document_ids -> [(document_id 或 None, key)]
+    按 document_id 查时用当前版本的 key；正在编辑的文档保存过之后 key 会变，前端最好直接传 keys
+    """
+    keys = data.get("keys") or []
+    document_ids = data.get("document_ids") or data.get("documentIds") or []
+    if not isinstance(keys, list) or not isinstance(document_ids, list):
+        raise CustomAPIException("keys / document_ids 必须是数组", 400)
+
+    # 不合法 / 不存在的 id 直接 400，不能只对其中一部分文档执行命令
+    if any(isinstance(d, bool) or not str(d).isdigit() for d in document_ids):
+        raise CustomAPIException("document_ids 必须是整数数组", 400)
+
+    targets = [(None, str(k)) for k in keys if k]
+    ids = {int(d) for d in document_ids}
+    if ids:
+        rows = db.session.query(Document.id, Document.updated_at, Document.size).filter(Document.id.in_(ids)).all()
+        missing = sorted(ids - {row.id for row in rows})
+        if missing:
+            raise CustomAPIException(f"文档不存在：{missing}", 400)
+        targets += [(row.id, _doc_key(row)) for row in rows]
+
+    seen, unique = set(), []
+    for document_id, key in targets:
+        if key not in seen:
+            seen.add(key)
+            unique.append((document_id, key))
+    if not unique:
+        raise CustomAPIException("keys / document_ids 不能为空", 400)
+    if len(unique) > int(_cfg("ONLYOFFICE_COMMAND_MAX_KEYS", 200)):
+        raise CustomAPIException(f"一次最多 {_cfg('ONLYOFFICE_COMMAND_MAX_KEYS', 200)} 个文档", 400)
+    return unique
+
+
+def run_commands(command: str, keys: list, **extra) -> dict:
+    """
+    对每个 key 发一次命令，返回 key -> {"error": 错误码, "message": 说明}
+    请求失败（超时 / 连不上 / 非 200）的 error 为 -1，不影响其他 key
+    """
+    url = _cfg("DOCUMENT_SERVER_COMMAND_URL")
+    if not url:
+        raise CustomAPIException("未配置 OnlyOffice 命令服务", 503)
+
+    read_timeout = float(_cfg("ONLYOFFICE_COMMAND_TIMEOUT", 5))
+    timeout = (min(2.0, read_timeout), read_timeout)
+    session = _command_session()
+    # 签名要在请求线程里做（要读配置），线程池里只发请求
+    bodies = {}
+    for key in keys:
+        payload = {"c": command, "key": key, **extra}
+        bodies[key] = {**payload, "token": _encode_jwt(payload)}
+
+    def call(key):
+        try:
+            resp = session.post(url, json=bodies[key], timeout=timeout)
+            resp.raise_for_status()
+            error = int(resp.json().get("error", 3))
+        except Exception as e:
+            return key, {"error": -1, "message": f"命令服务请求失败：{e}"}
+        return key, {"error": error, "message": COMMAND_ERRORS.get(error, "未知错误")}
+
+    start = time.perf_counter()
+    if len(keys) == 1:
+        results = dict([call(keys[0])])
+    else:
+        pool = task_pool.get_pool("onlyoffice-command", int(_cfg("ONLYOFFICE_COMMAND_CONCURRENCY", 8)))
+        results = dict(pool.map(call, keys))
+    metrics.record_backend("onlyoffice", time.perf_counter() - start)
+
+    failed = [k for k, r in results.items() if r["error"] == -1]
+    if failed:
+        current_app.logger.warning(
+            f"[OnlyOffice] command {command} failed for {len(failed)}/{len(keys)} keys: "
+            f"{results[failed[0]]['message']}"
+        )
+    return results
+
+
+def _command_items(targets: list, results: dict, field: str, states: dict, default: str) -> list:
+    items = []
+    for document_id, key in targets:
+        result = results[key]
+        items.append({
+            "document_id": document_id,
+            "key": key,
+            field: states.get(result["error"], default),
+            "error": result["error"],
+            "message": result["message"],
+        })
+    return items
+
+
 def online_status():
-    # ... (逻辑同上一次提供代码，调用 DOCUMENT_SERVER_COMMAND_URL)
-    pass
+    """
+    批量查询文档是否正在被编辑（命令服务 info）
+    POST /api/onlyoffice/status
+    JSON body: { "keys": ["..."], "document_ids": [1, 2] }   # 二选一或同时传
+    返回每个文档 online: true / false；命令服务请求失败的为 null
+    """
+    targets = _command_targets(request.get_json(silent=True) or {})
+    results = run_commands("info", [key for _, key in targets])
+    items = _command_items(targets, results, "online", {0: True, 1: False}, None)
+    return ResponseTemplate.success(message="OK", data=items)
 
 
 def force_save():
-    # ... (逻辑同上一次提供代码)
-    pass
\ No newline at end of file
+    """
+    批量强制保存正在编辑的文档（命令服务 forcesave），用于批量导出前把编辑中的内容落盘
+    POST /api/onlyoffice/force-save（仅管理员）
+    JSON body: { "keys": [...], "document_ids": [...] }
+    status: saving（已提交，保存结果通过回调写回 MinIO）/ no_changes / not_open / failed
+    """
+    targets = _command_targets(request.get_json(silent=True) or {})
+    userdata = str(get_jwt_identity() or "")
+    results = run_commands("forcesave", [key for _, key in targets], userdata=userdata)
+    items = _command_items(targets, results, "status", {0: "saving", 1: "not_open", 4: "no_changes"}, "failed")
+    return ResponseTemplate.success(message="OK", data=items)
+
+
+def drop_users():
+    """
+    把指定用户从正在编辑的文档中断开（命令服务 drop），如禁用用户 / 回收权限后
+    POST /api/onlyoffice/drop（仅管理员）
+    JSON body: { "keys": [...], "document_ids": [...], "users": ["12", "15"] }
+    """
+    data = request.get_json(silent=True) or {}
+    users = data.get("users")
+    if not isinstance(users, list) or not users:
+        raise CustomAPIException("users 不能为空", 400)
+
+    targets = _command_targets(data)
+    results = run_commands("drop", [key for _, key in targets], users=[str(u) for u in users])
+    items = _command_items(targets, results, "status", {0: "dropped", 1: "not_open"}, "failed")
+    return ResponseTemplate.success(message="OK", data=items)
@@ -0,0 +1,38 @@
+# app/services/permission_service.py
+"""
+管理权限：拥有 super_admin / admin 角色（ADMIN_ROLES）的用户才能管理菜单、角色和用户角色。
+用户角色来自 user_cache_service 的资料缓存，角色编码 -> id 来自菜单快照，检查时不查库。
+"""
+from functools import wraps
+from typing import Optional
+
+from flask_jwt_extended import get_jwt_identity
+
+from app.exceptions.exceptions import CustomAPIException
+from app.services import menu_service, user_cache_service
+
+
+def is_admin(user_id) -> bool:
+    profile = user_cache_service.get_user_profile(user_id) if user_id is not None else None
+    return bool(profile) and menu_service.is_admin(profile.get("role_ids"))
+
+
+def current_user_is_admin() -> bool:
+    """需在 @jwt_required() 之后调用"""
+    return is_admin(get_jwt_identity())
+
+
+def require_admin(message: Optional[str] = None) -> None:
+    if not current_user_is_admin():
+        raise CustomAPIException(message or "没有管理权限", 403)
+
+
+def admin_required(view):
+    """视图装饰器，放在 @jwt_required() 下面"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        require_admin()
+        return view(*args, **kwargs)
+
+    return wrapper
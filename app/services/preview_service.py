@@ -0,0 +1,321 @@
+# app/services/preview_service.py
+"""
+缩略图 / 预览派生文件：
+- 图片：直接用 Pillow 生成缩略图
+- Office / PDF：调用 OnlyOffice ConvertService 渲染第一页，再用 Pillow 统一尺寸
+- 派生文件存到同一个 bucket 的 PREVIEW_PREFIX/<document_id>/<version>_<size>.webp 下
+- version 由源文件的 updated_at + size 计算，源文件变了 key 就变了，访问时惰性重新生成
+- Pillow / requests 只在后台渲染时才导入；列表接口只用到 thumbnail_urls，不需要它们
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import threading
+import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterable
+
+import jwt as pyjwt
+from flask import Response, current_app, jsonify, request, stream_with_context
+
+from app.exceptions.exceptions import CustomAPIException
+from app.models.document import Document, DocumentStatus
+from app.utils import minio_storage, task_pool
+
+if TYPE_CHECKING:
+    from PIL import Image
+
+IMAGE_EXTS = {"png", "jpg", "jpeg", "gif", "bmp", "webp", "tif", "tiff"}
+# OnlyOffice 能渲染首页的类型
+DOCUMENT_EXTS = {"docx", "doc", "xlsx", "xls", "csv", "pptx", "ppt", "pdf", "txt"}
+
+PREVIEW_CONTENT_TYPE = "image/webp"
+
+# 渲染失败的负缓存：derived_key -> 过期时间戳，避免坏文件每次请求都重新渲染
+_failures: Dict[str, float] = {}
+_failures_lock = threading.Lock()
+
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default)
+
+
+def _ext(file_name: str) -> str:
+    if file_name and "." in file_name:
+        return file_name.rsplit(".", 1)[-1].lower()
+    return ""
+
+
+def is_previewable(file_name: str) -> bool:
+    ext = _ext(file_name)
+    return ext in IMAGE_EXTS or ext in DOCUMENT_EXTS
+
+
+def _normalize_size(size) -> int:
+    """只允许配置里的几个尺寸，防止派生文件数量失控"""
+    sizes = sorted(_cfg("PREVIEW_SIZES", (128, 256, 512)))
+    try:
+        size = int(size)
+    except (TypeError, ValueError):
+        return sizes[len(sizes) // 2]
+    for s in sizes:
+        if size <= s:
+            return s
+    return sizes[-1]
+
+
+def source_version(updated_at, size) -> str:
+    """源文件版本：内容变化（OnlyOffice 回调保存 / 重新上传）时 updated_at、size 会变"""
+    ts = int(updated_at.timestamp()) if isinstance(updated_at, datetime) else 0
+    return hashlib.sha1(f"{ts}:{size or 0}".encode("utf-8")).hexdigest()[:16]
+
+
+def derived_key(doc_id: int, version: str, size: int) -> str:
+    prefix = _cfg("PREVIEW_PREFIX", "_derived/thumb").strip("/")
+    return f"{prefix}/{doc_id}/{version}_{size}.webp"
+
+
+def thumbnail_url(doc_id: int, version: str, size: int = None) -> str:
+    size = _normalize_size(size or _cfg("PREVIEW_DEFAULT_SIZE", 256))
+    return f"/api/file/{doc_id}/thumbnail?size={size}&v={version}"
+
+
+def thumbnail_urls(document_ids: Iterable[int]) -> Dict[int, str]:
+    """
+    列表接口用：一次查询拿到一批文件的缩略图地址（带 version，可长期缓存）
+    """
+    ids = {i for i in document_ids if i}
+    if not ids:
+        return {}
+
+    rows = (
+        Document.query
+        .with_entities(Document.id, Document.file_name, Document.updated_at, Document.size)
+        .filter(Document.id.in_(ids))
+        .all()
+    )
+    return {
+        r.id: thumbnail_url(r.id, source_version(r.updated_at, r.size))
+        for r in rows
+        if is_previewable(r.file_name)
+    }
+
+
+# ============== 渲染 ==============
+
+def _to_thumbnail(img: Image.Image, size: int) -> bytes:
+    from PIL import Image, ImageOps
+
+    # JPEG 可以在解码阶段直接缩小，省掉大部分解码开销
+    img.draft("RGB", (size * 2, size * 2))
+    img = ImageOps.exif_transpose(img)
+
+    if img.mode in ("RGBA", "LA", "P"):
+        img = img.convert("RGBA")
+        bg = Image.new("RGB", img.size, (255, 255, 255))
+        bg.paste(img, mask=img.split()[-1])
+        img = bg
+    elif img.mode != "RGB":
+        img = img.convert("RGB")
+
+    img.thumbnail((size, size), Image.Resampling.LANCZOS, reducing_gap=2.0)
+
+    out = io.BytesIO()
+    img.save(out, format="WEBP", quality=int(_cfg("PREVIEW_QUALITY", 80)), method=4)
+    return out.getvalue()
+
+
+def _render_document_first_page(doc: Document, version: str, size: int) -> Image.Image:
+    """调用 OnlyOffice ConvertService，把文档第一页转成 png"""
+    import requests
+    from PIL import Image
+
+    base = (_cfg("BACKEND_PUBLIC") or "").rstrip("/")
+    convert_url = _cfg("ONLYOFFICE_CONVERT_URL") or (
+        (_cfg("ONLYOFFICE_BASE_URL") or "").rstrip("/") + "/ConvertService.ashx"
+    )
+
+    payload = {
+        "async": False,
+        "filetype": _ext(doc.file_name),
+        "key": f"thumb-{doc.id}-{version}-{size}",
+        "outputtype": "png",
+        "thumbnail": {"aspect": 1, "first": True, "width": size, "height": size},
+        "title": doc.file_name,
+        "url": f"{base}/api/onlyoffice/download/{doc.id}",
+    }
+    headers = {"Accept": "application/json"}
+
+    secret = _cfg("ONLYOFFICE_JWT_SECRET")
+    if secret:
+        token = pyjwt.encode(payload, secret, algorithm=_cfg("ONLYOFFICE_JWT_ALG", "HS256"))
+        if isinstance(token, (bytes, bytearray)):
+            token = token.decode("utf-8")
+        payload["token"] = token
+        headers["Authorization"] = f"Bearer {token}"
+
+    timeout = int(_cfg("PREVIEW_CONVERT_TIMEOUT", 60))
+    r = requests.post(convert_url, json=payload, headers=headers, timeout=timeout)
+    r.raise_for_status()
+    result = r.json()
+    if result.get("error") or not result.get("fileUrl"):
+        raise RuntimeError(f"OnlyOffice convert failed: {result}")
+
+    img_resp = requests.get(result["fileUrl"], timeout=timeout)
+    img_resp.raise_for_status()
+    return Image.open(io.BytesIO(img_resp.content))
+
+
+def _cleanup_old_versions(doc: Document, keep_key: str) -> None:
+    """删除该文档旧版本的派生文件（best effort）"""
+    prefix = derived_key(doc.id, "", 0).rsplit("/", 1)[0] + "/"
+    client = minio_storage.get_minio_client()
+    try:
+        for obj in client.list_objects(doc.bucket, prefix=prefix):
+            name = obj.object_name
+            if not name.startswith(keep_key.rsplit("_", 1)[0]):
+                client.remove_object(doc.bucket, name)
+    except Exception:
+        current_app.logger.warning("[Preview] cleanup failed for doc %s", doc.id, exc_info=True)
+
+
+def render_thumbnail(doc_id: int, size: int) -> str:
+    """
+    在后台线程池中执行：渲染并写入 MinIO，返回派生文件 key
+    """
+    doc = Document.query.get(doc_id)
+    if not doc:
+        raise RuntimeError(f"Document not found: {doc_id}")
+
+    version = source_version(doc.updated_at, doc.size)
+    key = derived_key(doc.id, version, size)
+
+    # 可能别的 worker 已经生成好了
+    if minio_storage.stat_object(doc.bucket, key) is not None:
+        return key
+
+    ext = _ext(doc.file_name)
+    if ext in IMAGE_EXTS:
+        from PIL import Image
+
+        max_bytes = int(_cfg("PREVIEW_MAX_SOURCE_BYTES", 50 * 1024 * 1024))
+        raw = minio_storage.get_object_bytes(doc.bucket, doc.object_key, max_bytes=max_bytes)
+        img = Image.open(io.BytesIO(raw))
+    else:
+        img = _render_document_first_page(doc, version, size)
+
+    data = _to_thumbnail(img, size)
+    minio_storage.upload_stream(
+        bucket=doc.bucket,
+        object_key=key,
+        data=io.BytesIO(data),
+        length=len(data),
+        content_type=PREVIEW_CONTENT_TYPE,
+    )
+    _cleanup_old_versions(doc, key)
+    current_app.logger.info(f"[Preview] rendered {key} ({len(data)} bytes)")
+    return key
+
+
+def _mark_failed(key: str) -> None:
+    ttl = int(_cfg("PREVIEW_FAILURE_TTL", 300))
+    with _failures_lock:
+        _failures[key] = time.time() + ttl
+
+
+def _recently_failed(key: str) -> bool:
+    with _failures_lock:
+        expires = _failures.get(key)
+        if expires is None:
+            return False
+        if expires < time.time():
+            _failures.pop(key, None)
+            return False
+        return True
+
+
+# ============== 接口 ==============
+
+def _cache_headers(version: str, etag: str) -> dict:
+    # URL 里带了当前 version 的请求可以永久缓存；否则每次都要带 ETag 回来校验
+    if request.args.get("v") == version:
+        max_age = int(_cfg("PREVIEW_CACHE_MAX_AGE", 365 * 24 * 3600))
+        cache_control = f"public, max-age={max_age}, immutable"
+    else:
+        cache_control = "public, max-age=0, must-revalidate"
+    return {
+        "Cache-Control": cache_control,
+        "ETag": etag,
+        "X-Preview-Version": version,
+    }
+
+
+def get_thumbnail(document_id: int):
+    """
+    GET /api/file/<document_id>/thumbnail?size=256&v=<version>
+    - 派生文件已存在：直接从 MinIO 流式返回
+    - 不存在：提交到后台渲染，等待 PREVIEW_WAIT_SECONDS，没渲染完返回 202
+    """
+    doc = Document.query.get(document_id)
+    if not doc or doc.status == DocumentStatus.DELETED:
+        raise CustomAPIException(f"Document not found: {document_id}", 404)
+    if not is_previewable(doc.file_name):
+        raise CustomAPIException("该文件类型不支持预览", 404)
+
+    size = _normalize_size(request.args.get("size") or _cfg("PREVIEW_DEFAULT_SIZE", 256))
+    version = source_version(doc.updated_at, doc.size)
+    key = derived_key(doc.id, version, size)
+    etag = f'"{version}-{size}"'
+    headers = _cache_headers(version, etag)
+
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status=304, headers=headers)
+
+    stat = minio_storage.stat_object(doc.bucket, key)
+    if stat is None:
+        if _recently_failed(key):
+            raise CustomAPIException("预览生成失败", 404)
+
+        fut = task_pool.submit(
+            "preview",
+            render_thumbnail,
+            doc.id,
+            size,
+            max_workers=int(_cfg("PREVIEW_WORKERS", 4)),
+            dedup_key=key,
+        )
+        try:
+            fut.result(timeout=float(_cfg("PREVIEW_WAIT_SECONDS", 3)))
+        except FutureTimeoutError:
+            resp = jsonify({"success": False, "data": None, "message": "预览生成中，请稍后重试"})
+            resp.status_code = 202
+            resp.headers["Retry-After"] = "2"
+            resp.headers["Cache-Control"] = "no-store"
+            return resp
+        except Exception as e:
+            current_app.logger.warning(f"[Preview] render failed for doc {doc.id}: {e}")
+            _mark_failed(key)
+            raise CustomAPIException("预览生成失败", 404)
+
+        stat = minio_storage.stat_object(doc.bucket, key)
+        if stat is None:
+            raise CustomAPIException("预览生成失败", 404)
+
+    stream = minio_storage.get_object_stream(doc.bucket, key)
+
+    def generate():
+        try:
+            for chunk in stream.stream(64 * 1024):
+                yield chunk
+        finally:
+            stream.close()
+            stream.release_conn()
+
+    headers["Content-Length"] = str(stat.size)
+    return Response(
+        stream_with_context(generate()),
+        mimetype=PREVIEW_CONTENT_TYPE,
+        headers=headers,
+    )
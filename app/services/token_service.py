@@ -0,0 +1,259 @@
+# app/services/token_service.py
+"""
+JWT 吊销（blocklist）：
+- 单个 token：Redis key jwt:revoked:<jti>，TTL = token 剩余有效期
+- 整个用户（禁用 / 改密码）：Redis key jwt:user_revoked_before:<uid>，早于该时间签发的 token 全部失效
+- 每次吊销同时 XADD 到 jwt:revocations 流，各进程定期增量拉取，维护本地布隆过滤器 + 用户截止时间表
+- 流按时间裁剪（MINID = 现在 - 最长 token 有效期），还可能生效的 token 对应的吊销记录一定还在流里，
+  全量重建不会“忘掉”吊销
+- 用户截止时间精确到微秒：签发时带 iat_us 声明（iat 只到秒），改密码后同一秒内换发的新 token 不会被误杀，
+  吊销前同一秒签发的旧 token 也不会漏过
+
+请求校验路径只查本地内存：布隆过滤器判定“一定没被吊销”时直接放行，
+只有布隆命中时才去 Redis 确认，因此绝大多数请求的额外开销是几微秒。
+本进程还没从 Redis 同步成功过时（启动时 Redis 不可用等），本地状态不完整，直接查 Redis 里的两类 key。
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+from flask import current_app
+
+from app.extensions import get_redis
+
+REVOKED_KEY = "jwt:revoked:{}"
+USER_REVOKED_KEY = "jwt:user_revoked_before:{}"
+STREAM_KEY = "jwt:revocations"
+
+
+class BloomFilter:
+    """简单的布隆过滤器，bytearray 存储位图，双重哈希生成 k 个位置"""
+
+    def __init__(self, num_bits: int = 1 << 20, num_hashes: int = 7):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray(num_bits // 8)
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, value: str) -> None:
+        for pos in self._positions(value):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, value: str) -> bool:
+        for pos in self._positions(value):
+            if not self.bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class _RevocationState:
+    """每个进程一份；fork 之后按 pid 重建"""
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self.lock = threading.Lock()
+        self.bloom = BloomFilter()
+        # uid(str) -> (cutoff_ts, expires_ts)，cutoff_ts 为浮点秒
+        self.user_cutoffs: Dict[str, tuple] = {}
+        # 最近一次成功同步到的流位置；None 表示还没同步成功过，本地状态不可信
+        self.last_id: Optional[str] = None
+        self.last_sync = 0.0
+        self.last_rebuild = 0.0
+
+
+_state = _RevocationState()
+
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default)
+
+
+def _get_state() -> _RevocationState:
+    global _state
+    if _state.pid != os.getpid():
+        _state = _RevocationState()
+    return _state
+
+
+def _max_token_ttl() -> int:
+    refresh = _cfg("JWT_REFRESH_TOKEN_EXPIRES")
+    return int(refresh.total_seconds()) if refresh else 30 * 24 * 3600
+
+
+def _apply_entry(state: _RevocationState, fields: dict, now: float) -> None:
+    kind = fields.get("t")
+    if kind == "jti":
+        if float(fields.get("exp", 0)) > now:
+            state.bloom.add(fields["v"])
+    elif kind == "user":
+        cutoff = float(fields.get("ts", 0))
+        expires = cutoff + _max_token_ttl()
+        if expires > now:
+            old = state.user_cutoffs.get(fields["v"])
+            if not old or old[0] < cutoff:
+                state.user_cutoffs[fields["v"]] = (cutoff, expires)
+
+
+def _sync(force: bool = False) -> None:
+    """
+    从 Redis 流增量拉取吊销记录。
+    最多每 JWT_BLOCKLIST_SYNC_INTERVAL 秒一次；拿不到锁说明别的线程在同步，直接用现有状态。
+    """
+    state = _get_state()
+    now = time.time()
+    if not force and now - state.last_sync < float(_cfg("JWT_BLOCKLIST_SYNC_INTERVAL", 1.0)):
+        return
+    if not state.lock.acquire(blocking=force):
+        return
+    try:
+        state.last_sync = now
+        r = get_redis()
+        if r is None:
+            return
+
+        rebuild = (
+            state.last_id is None
+            or now - state.last_rebuild > float(_cfg("JWT_BLOCKLIST_REBUILD_INTERVAL", 3600))
+        )
+        if rebuild:
+            # 全量重建：顺便丢掉已过期的条目，防止布隆过滤器越来越满
+            tmp = _RevocationState()
+            last_id = "0-0"
+            for entry_id, fields in r.xrange(STREAM_KEY):
+                _apply_entry(tmp, fields, now)
+                last_id = entry_id
+            state.bloom, state.user_cutoffs = tmp.bloom, tmp.user_cutoffs
+            state.last_id = last_id
+            state.last_rebuild = now
+            return
+
+        resp = r.xread({STREAM_KEY: state.last_id}, count=10000)
+        for _stream, entries in resp or []:
+            for entry_id, fields in entries:
+                _apply_entry(state, fields, now)
+                state.last_id = entry_id
+    except Exception:
+        current_app.logger.warning("[TokenBlocklist] sync failed", exc_info=True)
+    finally:
+        state.lock.release()
+
+
+def _publish(r, fields: dict) -> None:
+    # 按时间裁剪：只丢掉比最长 token 有效期还早的记录（approximate 只会少删，不会多删）
+    min_ms = int((time.time() - _max_token_ttl()) * 1000)
+    r.xadd(STREAM_KEY, fields, minid=f"{max(min_ms, 0)}-0", approximate=True)
+
+
+def revoke_token(jti: str, exp) -> None:
+    """吊销单个 token（logout / refresh 轮换时调用）"""
+    if not jti:
+        return
+    now = time.time()
+    exp = float(exp or now + _max_token_ttl())
+    ttl = max(int(exp - now), 1)
+
+    state = _get_state()
+    state.bloom.add(jti)
+
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        r.setex(REVOKED_KEY.format(jti), ttl, 1)
+        _publish(r, {"t": "jti", "v": jti, "exp": int(exp)})
+    except Exception:
+        current_app.logger.warning("[TokenBlocklist] revoke token failed", exc_info=True)
+
+
+def revoke_user_tokens(user_id) -> None:
+    """吊销某个用户在此之前签发的所有 token（禁用用户 / 修改密码时调用）"""
+    uid = str(user_id)
+    cutoff = time.time()
+    ttl = _max_token_ttl()
+
+    state = _get_state()
+    state.user_cutoffs[uid] = (cutoff, cutoff + ttl)
+
+    r = get_redis()
+    if r is None:
+        return
+    try:
+        r.setex(USER_REVOKED_KEY.format(uid), ttl, f"{cutoff:.6f}")
+        _publish(r, {"t": "user", "v": uid, "ts": f"{cutoff:.6f}"})
+    except Exception:
+        current_app.logger.warning("[TokenBlocklist] revoke user failed", exc_info=True)
+
+
+def _issued_at(jwt_payload: dict) -> float:
+    """签发时间（浮点秒）：优先用 iat_us，旧 token 没有这个声明时退回 iat"""
+    iat_us = jwt_payload.get("iat_us")
+    if iat_us is not None:
+        return int(iat_us) / 1_000_000
+    return float(jwt_payload.get("iat", 0))
+
+
+def _is_revoked_in_redis(uid: str, jti: Optional[str], issued_at: float) -> bool:
+    """本地状态不可信时直接查 Redis；Redis 也不可用时放行（与未配置 Redis 时的行为一致）"""
+    r = get_redis()
+    if r is None:
+        return False
+    try:
+        pipe = r.pipeline(transaction=False)
+        pipe.get(USER_REVOKED_KEY.format(uid))
+        if jti:
+            pipe.exists(REVOKED_KEY.format(jti))
+        cutoff, *jti_revoked = pipe.execute()
+    except Exception:
+        current_app.logger.warning("[TokenBlocklist] redis check failed", exc_info=True)
+        return False
+    if cutoff is not None and issued_at < float(cutoff):
+        return True
+    return bool(jti_revoked and jti_revoked[0])
+
+
+def is_token_revoked(jwt_payload: dict) -> bool:
+    _sync()
+    state = _get_state()
+
+    uid = str(jwt_payload.get("sub"))
+    jti = jwt_payload.get("jti")
+    issued_at = _issued_at(jwt_payload)
+
+    cutoff = state.user_cutoffs.get(uid)
+    if cutoff and issued_at < cutoff[0]:
+        return True
+
+    if state.last_id is None:
+        return _is_revoked_in_redis(uid, jti, issued_at)
+
+    if not jti or jti not in state.bloom:
+        return False
+
+    # 布隆命中：去 Redis 确认（排除误判）。Redis 不可用时按已吊销处理
+    r = get_redis()
+    if r is None:
+        return True
+    try:
+        return bool(r.exists(REVOKED_KEY.format(jti)))
+    except Exception:
+        current_app.logger.warning("[TokenBlocklist] confirm failed", exc_info=True)
+        return True
+
+
+def register_jwt_callbacks(jwt_manager) -> None:
+    @jwt_manager.token_in_blocklist_loader
+    def _check_if_token_revoked(jwt_header, jwt_payload):
+        return is_token_revoked(jwt_payload)
+
+    @jwt_manager.additional_claims_loader
+    def _issued_at_claims(identity):
+        # iat 只精确到秒，用户截止时间比较用这个微秒级的签发时间
+        return {"iat_us": time.time_ns() // 1000}
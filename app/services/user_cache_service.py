@@ -0,0 +1,57 @@
+# app/services/user_cache_service.py
+"""
+用户资料缓存（JWT identity -> 用户资料 dict），基于 app.utils.cache 两级缓存：
+- 一级：进程内，TTL 短（默认 30 秒），命中时零网络、零 SQL
+- 二级：Redis，TTL 默认 5 分钟
+- 改密码 / 改状态 / 禁用用户时调用 invalidate_user()，所有 worker 的本地副本一起失效
+"""
+from typing import Optional
+
+from flask import current_app
+
+from app.extensions import db
+from app.models.role import UserRole
+from app.models.user import User
+from app.utils import cache
+
+
+def _tag(user_id: int) -> str:
+    return f"user:{user_id}"
+
+
+@cache.cached(
+    "user:profile",
+    ttl=lambda: current_app.config.get("USER_CACHE_REDIS_TTL", 300),
+    local_ttl=lambda: current_app.config.get("USER_CACHE_LOCAL_TTL", 30),
+    tags=lambda user_id: [_tag(user_id)],
+)
+def _load_profile(user_id: int) -> Optional[dict]:
+    user = User.query.get(user_id)
+    if not user:
+        return None
+    profile = user.to_dict()
+    profile["role_ids"] = [
+        rid for (rid,) in db.session.query(UserRole.role_id).filter(UserRole.user_id == user_id)
+    ]
+    return profile
+
+
+def get_user_profile(user_id) -> Optional[dict]:
+    """
+    按 id 获取用户资料（User.to_dict() + role_ids），不存在返回 None。
+    返回的是缓存里的同一个 dict，调用方不要修改它。
+    """
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return None
+    return _load_profile(user_id)
+
+
+def invalidate_user(user_id) -> None:
+    """用户信息变更后调用（需在 commit 之后）"""
+    try:
+        user_id = int(user_id)
+    except (TypeError, ValueError):
+        return
+    cache.invalidate_tags(_tag(user_id))
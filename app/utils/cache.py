@@ -0,0 +1,522 @@
+# app/utils/cache.py
+"""
+通用两级缓存（装饰器）：
+
+    @cache.cached("kb:tree", ttl=300, local_ttl=10, tags=["kb:tree"])
+    def load_tree(): ...
+
+    @cache.cached("user:profile", ttl=300, tags=lambda user_id: [f"user:{user_id}"])
+    def load_profile(user_id): ...
+
+    cache.invalidate_tags("kb:tree")              # 立即失效
+    cache.invalidate_after_commit("kb:tree")      # 当前事务 commit 之后失效（写操作里用这个）
+
+- 一级：进程内 LRU + TTL，按 JSON 编码后的字节数控制总大小（CACHE_LOCAL_MAX_BYTES），
+  单条超过总预算 1/8 的不进本地
+- 二级：Redis，key = cache:<name>:<参数>，值为 JSON（用应用的 JSON Provider 编码，datetime 转成
+  北京时间字符串，与接口输出一致）；Redis 不可用 / 熔断时只用本地缓存
+- 缓存的值只能是 dict / list / 标量；本地存的也是 JSON 解码后的副本，两级命中返回的类型一致
+- 防击穿：同一进程里同一个 key 只有一个线程去算，其余线程等它的结果；跨进程用 SET NX 短锁，
+  没抢到锁的先轮询 Redis 等别人算好，超过 CACHE_LOCK_WAIT 秒还没有就自己算
+- 按标签失效：删掉 Redis 里带这些标签的 key，再通过 pub/sub 通知所有 worker 清掉本地副本；
+  订阅断开重连后清空本地缓存（断线期间可能漏掉了消息）
+- Redis 不可用 / 熔断期间的失效只清得了本地，先记下来（超过 CACHE_PENDING_MAX 条就记成“全部清空”），
+  Redis 恢复后第一次用到缓存（或订阅线程重连）时先补删、补广播，再读 Redis，
+  不会把 user:{id} 这类旧副本当成命中读回来
+- 计算期间标签被失效的，这次的结果不写缓存，避免把旧数据缓存下来
+- 指标：cache_requests_total{cache, result=local|redis|miss}
+- None 不缓存；本地命中返回的是缓存里的同一个对象，调用方不要修改
+"""
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Iterable, Optional, Union
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.extensions import get_redis
+from app.utils import metrics
+
+KEY_PREFIX = "cache:"
+TAG_PREFIX = "cache:tag:"
+LOCK_PREFIX = "cache:lock:"
+CHANNEL = "cache:invalidate"
+PENDING_TAGS = "cache_pending_tags"
+
+_MISS = object()
+
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def _encode(value) -> bytes:
+    return current_app.json.dumps_bytes(value)
+
+
+def _decode(raw: Union[str, bytes]):
+    return current_app.json.loads(raw)
+
+
+def _resolve(value):
+    return value() if callable(value) else value
+
+
+# ========== 一级：进程内 LRU ==========
+
+class _LocalCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._items: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (过期时间, 值, 字节数, 标签)
+        self._by_tag: dict = {}
+        self.bytes = 0
+
+    def get(self, key: str):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return _MISS
+            if item[0] < time.monotonic():
+                self._remove(key)
+                return _MISS
+            self._items.move_to_end(key)
+            return item[1]
+
+    def set(self, key: str, value, size: int, ttl: float, tags: tuple, max_bytes: int) -> None:
+        if ttl <= 0 or size > max_bytes // 8:
+            return
+        with self._lock:
+            self._remove(key)
+            self._items[key] = (time.monotonic() + ttl, value, size, tags)
+            self.bytes += size
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            while self.bytes > max_bytes and self._items:
+                self._remove(next(iter(self._items)))
+
+    def _remove(self, key: str) -> None:
+        item = self._items.pop(key, None)
+        if item is None:
+            return
+        self.bytes -= item[2]
+        for tag in item[3]:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+    def delete(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def invalidate_tags(self, tags: Iterable[str]) -> None:
+        with self._lock:
+            for tag in tags:
+                for key in list(self._by_tag.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._by_tag.clear()
+            self.bytes = 0
+
+
+_local = _LocalCache()
+
+# 标签最近一次失效的时间：计算开始之后被失效过的，结果不写缓存
+_epoch_lock = threading.Lock()
+_tag_epochs: dict = {}
+_clear_epoch = 0.0
+
+
+def _mark_invalidated(tags: Iterable[str]) -> None:
+    now = time.monotonic()
+    with _epoch_lock:
+        for tag in tags:
+            _tag_epochs[tag] = now
+        if len(_tag_epochs) > 10000:
+            for tag, at in list(_tag_epochs.items()):
+                if now - at > 60:
+                    del _tag_epochs[tag]
+
+
+def _invalidated_since(tags: tuple, started: float) -> bool:
+    if _clear_epoch >= started:
+        return True
+    return any(_tag_epochs.get(tag, 0.0) >= started for tag in tags)
+
+
+# ========== pub/sub 失效通知 ==========
+
+_listener_lock = threading.Lock()
+_listener_pid: Optional[int] = None
+
+
+def _origin() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _apply_message(data) -> None:
+    global _clear_epoch
+    try:
+        message = json.loads(data)
+    except (TypeError, ValueError):
+        return
+    if message.get("origin") == _origin():
+        return
+    tags = message.get("tags") or []
+    if tags:
+        _mark_invalidated(tags)
+        _local.invalidate_tags(tags)
+    if message.get("keys"):
+        _local.delete(message["keys"])
+    if message.get("clear"):
+        _clear_epoch = time.monotonic()
+        _local.clear()
+
+
+def _listen(app) -> None:
+    global _clear_epoch
+    backoff = 1.0
+    with app.app_context():
+        while True:
+            r = get_redis()
+            if r is None:
+                time.sleep(backoff)
+                continue
+            pubsub = r.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(CHANNEL)
+                _clear_epoch = time.monotonic()
+                _local.clear()
+                _replay_pending(r)
+                backoff = 1.0
+                while True:
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "message":
+                        _apply_message(message["data"])
+            except Exception:
+                app.logger.warning("[Cache] invalidation subscriber disconnected", exc_info=True)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+
+def _ensure_listener() -> None:
+    """每个进程（fork 后的 worker）第一次用到缓存时启动订阅线程"""
+    global _listener_pid
+    pid = os.getpid()
+    if _listener_pid == pid or not _cfg("CACHE_PUBSUB_ENABLED", True):
+        return
+    with _listener_lock:
+        if _listener_pid == pid:
+            return
+        _listener_pid = pid
+        _local.clear()
+        threading.Thread(
+            target=_listen,
+            args=(current_app._get_current_object(),),
+            name="cache-invalidation",
+            daemon=True,
+        ).start()
+
+
+def _publish(r, **message) -> None:
+    r.publish(CHANNEL, json.dumps({"origin": _origin(), **message}))
+
+
+# ========== 失效 ==========
+
+def _delete_tags(r, tags) -> None:
+    pipe = r.pipeline(transaction=False)
+    for tag in tags:
+        pipe.smembers(TAG_PREFIX + tag)
+    keys = set().union(*pipe.execute())
+
+    pipe = r.pipeline(transaction=False)
+    if keys:
+        pipe.delete(*keys)
+    pipe.delete(*(TAG_PREFIX + t for t in tags))
+    pipe.execute()
+    _publish(r, tags=list(tags))
+
+
+def _delete_keys(r, cache_keys) -> None:
+    r.delete(*(KEY_PREFIX + k for k in cache_keys))
+    _publish(r, keys=list(cache_keys))
+
+
+def _delete_all(r) -> None:
+    batch = []
+    for redis_key in r.scan_iter(match=KEY_PREFIX + "*", count=1000):
+        batch.append(redis_key)
+        if len(batch) >= 1000:
+            r.delete(*batch)
+            batch = []
+    if batch:
+        r.delete(*batch)
+    _publish(r, clear=True)
+
+
+# Redis 不可用期间没删掉的标签 / key；True 表示记不下了，恢复后清空全部缓存
+_pending_lock = threading.Lock()
+_pending_tags: set = set()
+_pending_keys: set = set()
+_pending_all = False
+
+
+def _defer(tags=(), cache_keys=(), everything: bool = False) -> None:
+    global _pending_all
+    limit = int(_cfg("CACHE_PENDING_MAX", 10000))
+    with _pending_lock:
+        if _pending_all:
+            return
+        _pending_tags.update(tags)
+        _pending_keys.update(cache_keys)
+        if everything or len(_pending_tags) + len(_pending_keys) > limit:
+            _pending_all = True
+            _pending_tags.clear()
+            _pending_keys.clear()
+
+
+def _replay_pending(r) -> bool:
+    """补做 Redis 不可用期间的失效；失败时重新记下并返回 False（调用方这次不要读 Redis）"""
+    global _pending_all
+    if not (_pending_tags or _pending_keys or _pending_all):
+        return True
+    with _pending_lock:
+        tags, cache_keys, everything = set(_pending_tags), set(_pending_keys), _pending_all
+        _pending_tags.clear()
+        _pending_keys.clear()
+        _pending_all = False
+    if not (tags or cache_keys or everything):
+        return True
+    try:
+        if everything:
+            _delete_all(r)
+        else:
+            if tags:
+                _delete_tags(r, sorted(tags))
+            if cache_keys:
+                _delete_keys(r, sorted(cache_keys))
+    except Exception:
+        current_app.logger.warning("[Cache] replay pending invalidations failed", exc_info=True)
+        _defer(tags, cache_keys, everything)
+        return False
+    current_app.logger.info(
+        "[Cache] replayed invalidations deferred while redis was unavailable: %s",
+        "all" if everything else f"{len(tags)} tags, {len(cache_keys)} keys",
+    )
+    return True
+
+
+def invalidate_tags(*tags: str) -> None:
+    """立即失效带这些标签的缓存（本进程 + Redis + 其他 worker）；Redis 不可用时记下来，恢复后补做"""
+    tags = tuple(t for t in tags if t)
+    if not tags:
+        return
+    _mark_invalidated(tags)
+    _local.invalidate_tags(tags)
+
+    r = get_redis()
+    if r is None or not _replay_pending(r):
+        _defer(tags)
+        return
+    try:
+        _delete_tags(r, tags)
+    except Exception:
+        current_app.logger.warning("[Cache] invalidate tags %s failed", tags, exc_info=True)
+        _defer(tags)
+
+
+def invalidate_after_commit(*tags: str) -> None:
+    """在当前事务 commit 之后再失效（rollback 则不失效）"""
+    from app.extensions import db
+
+    db.session.info.setdefault(PENDING_TAGS, set()).update(t for t in tags if t)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    tags = session.info.pop(PENDING_TAGS, None)
+    if tags:
+        invalidate_tags(*sorted(tags))
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(PENDING_TAGS, None)
+
+
+def clear_local() -> None:
+    """清空本进程的一级缓存（调试 / 测试用）"""
+    _local.clear()
+
+
+# ========== 装饰器 ==========
+
+def _default_key(*args, **kwargs) -> str:
+    return ":".join([str(a) for a in args] + [f"{k}={kwargs[k]}" for k in sorted(kwargs)])
+
+
+def cached(
+    name: str,
+    *,
+    ttl: Union[float, Callable[[], float]] = 300,
+    local_ttl: Union[float, Callable[[], float], None] = None,
+    tags: Union[Iterable[str], Callable[..., Iterable[str]], None] = None,
+    key: Optional[Callable[..., str]] = None,
+):
+    """
+    name:      缓存名（Redis key 前缀、指标标签）
+    ttl:       Redis 里的秒数，可以是返回秒数的函数（读配置用）
+    local_ttl: 进程内的秒数，默认与 ttl 相同，0 表示不用本地缓存
+    tags:      标签列表，或 (*args, **kwargs) -> 标签列表
+    key:       (*args, **kwargs) -> str，默认把参数拼起来
+    """
+    key_fn = key or _default_key
+    requests_total = metrics.CACHE_REQUESTS
+
+    def decorator(fn):
+        def full_key(*args, **kwargs) -> str:
+            suffix = key_fn(*args, **kwargs)
+            return f"{name}:{suffix}" if suffix else name
+
+        def tags_for(*args, **kwargs) -> tuple:
+            if tags is None:
+                return ()
+            return tuple(tags(*args, **kwargs) if callable(tags) else tags)
+
+        def load(cache_key: str, item_tags: tuple, args, kwargs):
+            started = time.monotonic()
+            redis_ttl = int(_resolve(ttl))
+            mem_ttl = float(_resolve(local_ttl) if local_ttl is not None else redis_ttl)
+            max_bytes = int(_cfg("CACHE_LOCAL_MAX_BYTES", 64 * 1024 * 1024))
+            redis_key = KEY_PREFIX + cache_key
+            lock_key = LOCK_PREFIX + cache_key
+
+            r = get_redis()
+            if r is not None and not _replay_pending(r):
+                r = None
+            locked = False
+            if r is not None:
+                try:
+                    raw = r.get(redis_key)
+                    if raw is None:
+                        lock_ms = int(float(_cfg("CACHE_LOCK_TTL", 10)) * 1000)
+                        locked = bool(r.set(lock_key, _origin(), nx=True, px=lock_ms))
+                        if not locked:
+                            # 别的进程正在算：等它写进 Redis
+                            deadline = time.monotonic() + float(_cfg("CACHE_LOCK_WAIT", 2.0))
+                            while raw is None and time.monotonic() < deadline:
+                                time.sleep(0.05)
+                                raw = r.get(redis_key)
+                    if raw is not None:
+                        # 共用的客户端开了 decode_responses，读回来的是 str
+                        data = raw.encode("utf-8") if isinstance(raw, str) else raw
+                        value = _decode(data)
+                        _local.set(cache_key, value, len(data), mem_ttl, item_tags, max_bytes)
+                        requests_total.labels(name, "redis").inc()
+                        return value
+                except Exception:
+                    current_app.logger.warning("[Cache] redis get %s failed", cache_key, exc_info=True)
+
+            requests_total.labels(name, "miss").inc()
+            try:
+                value = fn(*args, **kwargs)
+                if value is None or _invalidated_since(item_tags, started):
+                    return value
+
+                raw = _encode(value)
+                value = _decode(raw)
+                _local.set(cache_key, value, len(raw), mem_ttl, item_tags, max_bytes)
+                if r is not None:
+                    tag_ttl = max(redis_ttl, int(_cfg("CACHE_TAG_TTL", 24 * 3600)))
+                    try:
+                        pipe = r.pipeline(transaction=False)
+                        pipe.set(redis_key, raw, ex=redis_ttl)
+                        for tag in item_tags:
+                            pipe.sadd(TAG_PREFIX + tag, redis_key)
+                            pipe.expire(TAG_PREFIX + tag, tag_ttl)
+                        pipe.execute()
+                    except Exception:
+                        current_app.logger.warning("[Cache] redis set %s failed", cache_key, exc_info=True)
+                return value
+            finally:
+                if locked:
+                    try:
+                        r.delete(lock_key)
+                    except Exception:
+                        pass
+
+        inflight_lock = threading.Lock()
+        inflight: dict = {}
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _cfg("CACHE_ENABLED", True) or not has_app_context():
+                return fn(*args, **kwargs)
+            _ensure_listener()
+
+            cache_key = full_key(*args, **kwargs)
+            value = _local.get(cache_key)
+            if value is not _MISS:
+                requests_total.labels(name, "local").inc()
+                return value
+
+            item_tags = tags_for(*args, **kwargs)
+
+            # 同进程单飞：只有一个线程去 Redis / 数据库，其他线程等它写进本地缓存
+            with inflight_lock:
+                done = inflight.get(cache_key)
+                leader = done is None
+                if leader:
+                    done = inflight[cache_key] = threading.Event()
+            if not leader:
+                done.wait(float(_cfg("CACHE_LOCK_WAIT", 2.0)))
+                value = _local.get(cache_key)
+                if value is not _MISS:
+                    requests_total.labels(name, "local").inc()
+                    return value
+                return load(cache_key, item_tags, args, kwargs)
+
+            try:
+                return load(cache_key, item_tags, args, kwargs)
+            finally:
+                with inflight_lock:
+                    inflight.pop(cache_key, None)
+                done.set()
+
+        def invalidate(*args, **kwargs) -> None:
+            """失效某一组参数对应的缓存"""
+            cache_key = full_key(*args, **kwargs)
+            _local.delete([cache_key])
+            r = get_redis()
+            if r is None or not _replay_pending(r):
+                _defer(cache_keys=[cache_key])
+                return
+            try:
+                _delete_keys(r, [cache_key])
+            except Exception:
+                current_app.logger.warning("[Cache] invalidate %s failed", cache_key, exc_info=True)
+                _defer(cache_keys=[cache_key])
+
+        wrapper.invalidate = invalidate
+        wrapper.cache_key = full_key
+        wrapper.uncached = fn
+        return wrapper
+
+    return decorator
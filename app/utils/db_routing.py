@@ -0,0 +1,106 @@
+# app/utils/db_routing.py
+"""
+读写分离：
+- 配了 DATABASE_REPLICA_URL 时，SQLALCHEMY_BINDS 里多一个 "replica" 引擎
+- 用 @read_replica 标记的只读接口（文件列表、搜索）里，
+  普通 SELECT 走从库；写语句、flush、SELECT ... FOR UPDATE 以及写过之后的所有查询都走主库
+- 菜单 / 用户资料 / 目录树 / 标签不标记：它们的结果会被缓存（menu_service 快照、app.utils.cache），
+  从库延迟时会把旧数据缓存下来，必须从主库加载
+- 读自己的写：一次请求里有写操作并 commit 后，给客户端种一个短期 cookie，
+  REPLICA_STICKY_SECONDS 秒内这个客户端的请求全部读主库，避免从库延迟导致“刚改完看不到”
+- 没配从库时一切照旧（全部走主库）
+"""
+import time
+from functools import wraps
+
+from flask import g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+REPLICA_BIND = "replica"
+STICKY_COOKIE = "db_primary_until"
+
+
+def read_replica(view):
+    """标记只读接口：其中的 SELECT 可以走从库"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_read_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+
+def _replica_allowed() -> bool:
+    return (
+        has_request_context()
+        and g.get("db_read_replica", False)
+        and not g.get("db_force_primary", False)
+        and not g.get("db_wrote", False)
+    )
+
+
+class RoutingSession(Session):
+    """在 Flask-SQLAlchemy 的 Session 上加一层：只读接口里的 SELECT 路由到从库"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is not None:
+            return bind
+
+        is_read = (
+            not self._flushing
+            and isinstance(clause, Select)
+            and clause._for_update_arg is None
+        )
+        if is_read:
+            replica = self._db.engines.get(REPLICA_BIND)
+            if replica is not None and _replica_allowed():
+                return replica
+        else:
+            # 写过主库：本次请求后面的读也走主库，commit 后再种粘滞 cookie
+            self.info["wrote"] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _after_commit(session):
+    if session.info.pop("wrote", False) and has_request_context():
+        g.db_wrote = True
+
+
+def read_engine(db):
+    """直接用引擎执行的只读查询（如流式游标）按同样规则选择引擎"""
+    replica = db.engines.get(REPLICA_BIND)
+    if replica is not None and _replica_allowed():
+        return replica
+    return db.engine
+
+
+def init_app(app) -> None:
+    if not app.config.get("SQLALCHEMY_BINDS", {}).get(REPLICA_BIND):
+        return
+
+    sticky_seconds = float(app.config.get("REPLICA_STICKY_SECONDS", 5))
+
+    @app.before_request
+    def _check_sticky():
+        try:
+            until = float(request.cookies.get(STICKY_COOKIE) or 0)
+        except ValueError:
+            until = 0
+        if until > time.time():
+            g.db_force_primary = True
+
+    @app.after_request
+    def _set_sticky(response):
+        if g.get("db_wrote"):
+            response.set_cookie(
+                STICKY_COOKIE,
+                f"{time.time() + sticky_seconds:.3f}",
+                max_age=int(sticky_seconds) + 1,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
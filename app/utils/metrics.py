@@ -0,0 +1,269 @@
+# app/utils/metrics.py
+"""
+请求级性能埋点：
+- 每个请求记录：总耗时、SQL 条数 / 耗时（SQLAlchemy 游标事件）、Redis / MinIO 调用次数 / 耗时、响应大小
+- 响应头 Server-Timing：浏览器 DevTools 的 Timing 面板里直接看到 db / redis / minio 各占多少
+- GET /metrics：Prometheus 文本格式；gunicorn 多 worker 时设置环境变量 PROMETHEUS_MULTIPROC_DIR，
+  所有 worker 的数据汇总后输出
+- 慢请求日志：总耗时超过 SLOW_REQUEST_SECONDS 打一条 warning，附上耗时最多的几条 SQL
+  （同一条语句合并计数，N+1 查询一眼能看出来）
+- 流式响应（文件代理、ndjson 列表）在响应体发完后才结算，总耗时 / 大小是真实值；
+  Server-Timing 是响应头，只能反映发出响应头之前的部分
+- 只统计请求上下文里的调用，后台线程 / CLI 不计入
+"""
+import os
+import re
+import time
+
+from flask import Response, current_app, g, has_request_context, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from redis import Connection
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app.exceptions.exceptions import CustomAPIException
+
+METRICS_ENDPOINT = "metrics"
+MAX_DISTINCT_STATEMENTS = 200
+SLOW_LOG_STATEMENTS = 5
+SLOW_LOG_SQL_CHARS = 500
+
+_TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+REQUESTS = Counter(
+    "http_requests_total", "HTTP 请求数", ["method", "endpoint", "status"]
+)
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "请求总耗时（流式响应含响应体发送）",
+    ["method", "endpoint"], buckets=_TIME_BUCKETS,
+)
+RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes", "响应体大小", ["endpoint"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864, 268435456),
+)
+SQL_STATEMENTS = Histogram(
+    "http_request_sql_statements", "单个请求执行的 SQL 条数", ["endpoint"],
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000),
+)
+SQL_SECONDS = Histogram(
+    "http_request_sql_seconds", "单个请求的 SQL 总耗时", ["endpoint"], buckets=_TIME_BUCKETS,
+)
+BACKEND_CALLS = Counter(
+    "http_request_backend_calls_total", "请求内调用 Redis / MinIO 的次数", ["endpoint", "backend"]
+)
+BACKEND_SECONDS = Histogram(
+    "http_request_backend_seconds", "单个请求调用 Redis / MinIO 的总耗时",
+    ["endpoint", "backend"], buckets=_TIME_BUCKETS,
+)
+
+REDIS_CIRCUIT_OPENED = Counter(
+    "redis_circuit_opened_total", "Redis 熔断打开次数（打开期间不访问 Redis）"
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total", "被限流拒绝的请求数（rate=令牌桶 429，concurrency=并发上限 503）", ["limit", "reason"]
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "缓存读取次数（local / redis 命中，miss 为回源计算）", ["cache", "result"]
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RequestStats:
+    """一次请求的累计数据，挂在 g._perf 上"""
+
+    __slots__ = ("start", "sql_count", "sql_time", "statements", "backends", "bytes_sent")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.statements = {}  # SQL 文本 -> [次数, 总耗时]
+        self.backends = {}    # redis / minio -> [次数, 总耗时]
+        self.bytes_sent = 0
+
+    def add_sql(self, statement: str, elapsed: float) -> None:
+        self.sql_count += 1
+        self.sql_time += elapsed
+        entry = self.statements.get(statement)
+        if entry is None:
+            if len(self.statements) >= MAX_DISTINCT_STATEMENTS:
+                return
+            entry = self.statements[statement] = [0, 0.0]
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def add_backend(self, name: str, elapsed: float) -> None:
+        entry = self.backends.setdefault(name, [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def server_timing(self) -> str:
+        parts = [f"app;dur={(time.perf_counter() - self.start) * 1000:.1f}"]
+        if self.sql_count:
+            parts.append(f'db;dur={self.sql_time * 1000:.1f};desc="{self.sql_count} queries"')
+        for name, (count, seconds) in self.backends.items():
+            parts.append(f'{name};dur={seconds * 1000:.1f};desc="{count} calls"')
+        return ", ".join(parts)
+
+    def slow_report(self, method: str, path: str, status: int, elapsed: float, size: int) -> str:
+        backends = " ".join(
+            f"{name}={count}/{seconds:.3f}s" for name, (count, seconds) in self.backends.items()
+        )
+        lines = [
+            f"[SlowRequest] {method} {path} {status} {elapsed:.3f}s "
+            f"sql={self.sql_count}/{self.sql_time:.3f}s {backends} size={size}".rstrip()
+        ]
+        top = sorted(self.statements.items(), key=lambda kv: kv[1][1], reverse=True)[:SLOW_LOG_STATEMENTS]
+        for statement, (count, seconds) in top:
+            sql = _WHITESPACE.sub(" ", statement).strip()
+            if len(sql) > SLOW_LOG_SQL_CHARS:
+                sql = sql[:SLOW_LOG_SQL_CHARS] + " ..."
+            lines.append(f"    {seconds:.3f}s x{count}  {sql}")
+        return "\n".join(lines)
+
+
+def _current() -> "RequestStats | None":
+    return g.get("_perf") if has_request_context() else None
+
+
+def record_backend(name: str, elapsed: float) -> None:
+    """记录一次外部调用（redis / minio）的耗时"""
+    stats = _current()
+    if stats is not None:
+        stats.add_backend(name, elapsed)
+
+
+# ========== SQLAlchemy ==========
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current() is not None:
+        conn.info.setdefault("_perf_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_perf_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+    stats = _current()
+    if stats is not None:
+        stats.add_sql(statement, elapsed)
+
+
+def _handle_error(exception_context):
+    # 语句出错时 after_cursor_execute 不会触发，把开始时间弹掉
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("_perf_start"):
+        conn.info["_perf_start"].pop()
+
+
+# ========== Redis ==========
+
+class TimedRedisConnection(Connection):
+    """
+    统计请求内 Redis 命令的次数 / 耗时：
+    read_response 从发完命令一直等到收到回复，包含网络往返和服务端处理；pipeline 里每条命令各算一次
+    """
+
+    def read_response(self, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().read_response(*args, **kwargs)
+        finally:
+            record_backend("redis", time.perf_counter() - start)
+
+
+# ========== Flask ==========
+
+def _counting(iterable, stats: RequestStats):
+    """流式响应体：边发边累计字节数，结束时关闭原迭代器（释放 MinIO / DB 连接）"""
+    try:
+        for chunk in iterable:
+            stats.bytes_sent += len(chunk.encode() if isinstance(chunk, str) else chunk)
+            yield chunk
+    finally:
+        close = getattr(iterable, "close", None)
+        if close is not None:
+            close()
+
+
+def metrics_view():
+    token = current_app.config.get("METRICS_TOKEN") or ""
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        raise CustomAPIException("无权访问", 403)
+
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), headers={"Content-Type": CONTENT_TYPE_LATEST})
+
+
+def init_app(app) -> None:
+    if not app.config.get("METRICS_ENABLED", True):
+        return
+
+    slow_seconds = float(app.config.get("SLOW_REQUEST_SECONDS", 1.0))
+    server_timing = app.config.get("SERVER_TIMING_ENABLED", True)
+    logger = app.logger
+
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(Engine, "handle_error", _handle_error)
+
+    app.add_url_rule("/metrics", METRICS_ENDPOINT, metrics_view)
+
+    @app.before_request
+    def _start_timer():
+        if request.endpoint != METRICS_ENDPOINT:
+            g._perf = RequestStats()
+
+    # 先注册的 after_request 最后执行：拿到的是其他钩子处理完的最终响应
+    @app.after_request
+    def _finish(response):
+        stats = g.get("_perf")
+        if stats is None:
+            return response
+
+        if server_timing:
+            response.headers["Server-Timing"] = stats.server_timing()
+
+        size = response.content_length
+        if size is None and response.is_streamed:
+            response.response = _counting(response.response, stats)
+        elif size is None:
+            size = response.calculate_content_length() or 0
+
+        method, path, status = request.method, request.path, response.status_code
+        endpoint = request.endpoint or "unmatched"
+
+        def observe():
+            try:
+                elapsed = time.perf_counter() - stats.start
+                body_size = stats.bytes_sent if size is None else size
+                REQUESTS.labels(method, endpoint, str(status)).inc()
+                REQUEST_SECONDS.labels(method, endpoint).observe(elapsed)
+                RESPONSE_BYTES.labels(endpoint).observe(body_size)
+                SQL_STATEMENTS.labels(endpoint).observe(stats.sql_count)
+                SQL_SECONDS.labels(endpoint).observe(stats.sql_time)
+                for name, (count, seconds) in stats.backends.items():
+                    BACKEND_CALLS.labels(endpoint, name).inc(count)
+                    BACKEND_SECONDS.labels(endpoint, name).observe(seconds)
+                if slow_seconds > 0 and elapsed >= slow_seconds:
+                    logger.warning(stats.slow_report(method, path, status, elapsed, body_size))
+            except Exception:
+                logger.exception("[Metrics] observe failed")
+
+        # 响应体发送完毕（WSGI close）时才结算，流式响应也能拿到真实耗时
+        response.call_on_close(observe)
+        return response
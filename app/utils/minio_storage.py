@@ -1,25 +1,95 @@
 # app/utils/minio_storage.py
-from typing import Optional, Dict
+# minio / urllib3 在第一次创建客户端时才导入（S3Error 在出错时才由 _s3_error() 导入），不拖慢应用启动
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import TYPE_CHECKING, Dict, Optional, Union
 
-from minio import Minio
 from datetime import timedelta
-from typing import Union, Optional
 from flask import current_app, Request
-from minio.error import S3Error
 
+from app.utils import metrics
+
+if TYPE_CHECKING:
+    import urllib3
+    from minio import Minio
+
+
+_client_lock = threading.Lock()
+_client: Optional[Minio] = None
+_client_pid = os.getpid()
+
+
+def _http_client() -> urllib3.PoolManager:
+    import certifi
+    import urllib3
+
+    class _TimedPoolManager(urllib3.PoolManager):
+        """MinIO 的每次 HTTP 调用计入请求级性能埋点（流式下载只算到收到响应头为止）"""
+
+        def urlopen(self, method, url, redirect=True, **kw):
+            start = time.perf_counter()
+            try:
+                return super().urlopen(method, url, redirect=redirect, **kw)
+            finally:
+                metrics.record_backend("minio", time.perf_counter() - start)
+
+    # 与 minio 默认的 http_client 参数一致，只是换成带计时的 PoolManager；
+    # 连接池至少容纳同时进行的代理流，否则 gevent 下多出来的连接用完就丢，每次重新建连
+    timeout = 300
+    streams = int((current_app.config.get("CONCURRENCY_LIMITS") or {}).get("proxy_stream") or 0)
+    return _TimedPoolManager(
+        timeout=urllib3.Timeout(connect=timeout, read=timeout),
+        maxsize=max(10, streams),
+        cert_reqs="CERT_REQUIRED",
+        ca_certs=os.environ.get("SSL_CERT_FILE") or certifi.where(),
+        retries=urllib3.Retry(total=5, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504]),
+    )
 
 
 def get_minio_client() -> Minio:
     """
     获取 MinIO 客户端，使用配置：
     MINIO_ENDPOINT, MINIO_ACCESS_KEY, MINIO_SECRET_KEY, MINIO_SECURE
+
+    每个进程复用一个客户端（内部的 urllib3 连接池线程安全），不再每次调用都新建连接池；
+    fork 之后子进程会重新创建，不和父进程共用 socket。
     """
-    return Minio(
-        current_app.config["MINIO_ENDPOINT"],
-        access_key=current_app.config["MINIO_ACCESS_KEY"],
-        secret_key=current_app.config["MINIO_SECRET_KEY"],
-        secure=current_app.config.get("MINIO_SECURE", False),
-    )
+    global _client, _client_pid
+    client = _client
+    if client is not None and _client_pid == os.getpid():
+        return client
+
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            from minio import Minio
+
+            _client = Minio(
+                current_app.config["MINIO_ENDPOINT"],
+                access_key=current_app.config["MINIO_ACCESS_KEY"],
+                secret_key=current_app.config["MINIO_SECRET_KEY"],
+                secure=current_app.config.get("MINIO_SECURE", False),
+                region=current_app.config.get("MINIO_REGION"),
+                http_client=_http_client(),
+            )
+            _client_pid = os.getpid()
+        return _client
+
+
+def reset_minio_client() -> None:
+    """丢弃当前进程缓存的客户端（fork 之后 / 退出时调用）"""
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def _s3_error() -> type:
+    """minio 的 S3Error；except 子句只在出错时才求值，不会提前导入 minio"""
+    from minio.error import S3Error
+
+    return S3Error
 
 
 def _ensure_bucket_exists(client: Minio, bucket: str) -> None:
@@ -116,7 +186,7 @@ def generate_presigned_upload_url(
             object_name=object_key,
             expires=expire_td,  # ⭐ 这里必须是 timedelta
         )
-    except S3Error as e:
+    except _s3_error() as e:
         raise RuntimeError("Failed to generate presigned upload URL") from e
 
     dynamic_public_base = _build_dynamic_public_base(request)
@@ -154,7 +224,7 @@ def generate_presigned_download_url(
             expires=expire_td,
             response_headers=extra_params or None,
         )
-    except S3Error as e:
+    except _s3_error() as e:
         raise RuntimeError("Failed to generate presigned download URL") from e
 
     dynamic_public_base = _build_dynamic_public_base(request)
@@ -169,7 +239,7 @@ def delete_object(bucket: str, object_key: str) -> None:
     client = get_minio_client()
     try:
         client.remove_object(bucket_name=bucket, object_name=object_key)
-    except S3Error as e:
+    except _s3_error() as e:
         raise RuntimeError("Failed to delete object from MinIO") from e
 
 # app/utils/minio_storage.py
@@ -187,23 +257,91 @@ def get_object_stream(bucket: str, object_key: str):
         # get_object 返回的是 urllib3.response.HTTPResponse
         # 它可以被 Flask 的 send_file 直接使用
         return client.get_object(bucket_name=bucket, object_name=object_key)
-    except S3Error as e:
+    except _s3_error() as e:
         raise RuntimeError(f"Failed to get object stream: {object_key}") from e
 
-def upload_stream(bucket: str, object_key: str, data, length: int, content_type: str = "application/octet-stream"):
+def upload_stream(bucket: str, object_key: str, data, length: int = -1,
+                  content_type: str = "application/octet-stream", part_size: int = 0):
     """
     【新增】直接上传流数据到 MinIO（用于回调保存）
     data: bytes 或 file-like object
+    length: 未知长度传 -1，此时按 part_size（默认 MINIO_STREAM_PART_SIZE）分片上传，
+            整个文件不会读进内存
     """
     client = get_minio_client()
     _ensure_bucket_exists(client, bucket)
+    if length is None or length < 0:
+        length = -1
+        part_size = part_size or int(current_app.config.get("MINIO_STREAM_PART_SIZE", 10 * 1024 * 1024))
     try:
         client.put_object(
             bucket_name=bucket,
             object_name=object_key,
             data=data,
             length=length,
-            content_type=content_type
+            content_type=content_type,
+            part_size=part_size,
+        )
+    except _s3_error() as e:
+        raise RuntimeError(f"Failed to upload stream: {object_key}") from e
+
+
+def iter_object(bucket: str, object_key: str, chunk_size: int = 256 * 1024):
+    """
+    按块读取对象的生成器（用于代理下载），读完或中途断开都会把连接还给连接池。
+    注意：对象不存在等错误在第一次迭代时才抛出，需要提前判断的先 stat_object。
+    """
+    resp = get_object_stream(bucket, object_key)
+    try:
+        for chunk in resp.stream(chunk_size):
+            yield chunk
+    finally:
+        resp.close()
+        resp.release_conn()
+
+
+def stat_object(bucket: str, object_key: str):
+    """
+    获取对象元信息；对象不存在时返回 None（其他错误照常抛出）
+    """
+    client = get_minio_client()
+    try:
+        return client.stat_object(bucket_name=bucket, object_name=object_key)
+    except _s3_error() as e:
+        if e.code in ("NoSuchKey", "NoSuchObject", "NoSuchBucket"):
+            return None
+        raise RuntimeError(f"Failed to stat object: {object_key}") from e
+
+
+def get_object_bytes(bucket: str, object_key: str, max_bytes: Optional[int] = None) -> bytes:
+    """
+    读取整个对象到内存（只用于缩略图这类小文件 / 受 max_bytes 限制的场景）
+    """
+    resp = get_object_stream(bucket, object_key)
+    try:
+        if max_bytes is None:
+            return resp.read()
+        data = resp.read(max_bytes + 1)
+        if len(data) > max_bytes:
+            raise RuntimeError(f"Object too large: {object_key}")
+        return data
+    finally:
+        resp.close()
+        resp.release_conn()
+
+
+def upload_file(bucket: str, object_key: str, file_path: str, content_type: str = "application/octet-stream"):
+    """
+    上传本地文件到 MinIO（大文件自动分片，不整体读进内存；用于导出等场景）
+    """
+    client = get_minio_client()
+    _ensure_bucket_exists(client, bucket)
+    try:
+        client.fput_object(
+            bucket_name=bucket,
+            object_name=object_key,
+            file_path=file_path,
+            content_type=content_type,
         )
-    except S3Error as e:
-        raise RuntimeError(f"Failed to upload stream: {object_key}") from e
\ No newline at end of file
+    except _s3_error() as e:
+        raise RuntimeError(f"Failed to upload file: {object_key}") from e
@@ -0,0 +1,112 @@
+# app/utils/password_hasher.py
+"""
+密码哈希：
+- 算法 / 参数由 PASSWORD_HASH_METHOD 配置（werkzeug 格式，如 scrypt:32768:8:1、pbkdf2:sha256:600000）
+- 校验和生成放到独立进程池里跑，请求线程只等结果，不会被 scrypt 占满 CPU 拖住其他接口
+- 进程池有界：排队超过 PASSWORD_HASH_MAX_PENDING 直接返回 503，而不是无限堆积
+- 算超时（PASSWORD_HASH_TIMEOUT）或哈希进程异常退出同样返回 503；进程池坏掉后丢弃，下次用到时重建
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Optional
+
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app.exceptions.exceptions import TooManyRequestsException
+
+_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+_slots: Optional[threading.BoundedSemaphore] = None
+_pid = os.getpid()
+
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default)
+
+
+def _method() -> str:
+    return _cfg("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+
+
+@lru_cache(maxsize=8)
+def _method_prefix(method: str) -> str:
+    """把配置的 method 归一化成 hash 串里的前缀（werkzeug 会补上默认参数）"""
+    return generate_password_hash("x", method=method).split("$", 1)[0]
+
+
+def _get_pool():
+    global _pool, _slots, _pid
+    workers = int(_cfg("PASSWORD_HASH_WORKERS", 2))
+    if workers <= 0:
+        return None, None
+
+    with _lock:
+        if _pool is not None and _pid != os.getpid():
+            # fork 出来的子进程不能复用父进程的进程池
+            _pool, _slots = None, None
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else None)
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+            _slots = threading.BoundedSemaphore(int(_cfg("PASSWORD_HASH_MAX_PENDING", workers * 8)))
+            _pid = os.getpid()
+        return _pool, _slots
+
+
+def _run(fn, *args):
+    pool, slots = _get_pool()
+    if pool is None:
+        return fn(*args)
+
+    if not slots.acquire(timeout=float(_cfg("PASSWORD_HASH_QUEUE_TIMEOUT", 2))):
+        raise TooManyRequestsException("登录请求过多，请稍后重试", retry_after=1, status_code=503)
+    try:
+        return pool.submit(fn, *args).result(timeout=float(_cfg("PASSWORD_HASH_TIMEOUT", 10)))
+    except FutureTimeoutError:
+        current_app.logger.warning("[PasswordHasher] hashing timed out")
+        raise TooManyRequestsException("登录请求过多，请稍后重试", retry_after=1, status_code=503)
+    except BrokenProcessPool:
+        current_app.logger.error("[PasswordHasher] hash worker died, recreating the pool", exc_info=True)
+        _discard_pool(pool)
+        raise TooManyRequestsException("登录服务暂不可用，请稍后重试", retry_after=1, status_code=503)
+    finally:
+        slots.release()
+
+
+def _discard_pool(pool) -> None:
+    global _pool, _slots
+    with _lock:
+        if _pool is pool:
+            _pool, _slots = None, None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def hash_password(password: str) -> str:
+    return _run(generate_password_hash, password, _method())
+
+
+def verify_password(password_hash: str, password: str) -> bool:
+    if not password_hash:
+        return False
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """哈希参数和当前配置不一致（比如提高了 scrypt 成本）时返回 True"""
+    if not password_hash or "$" not in password_hash:
+        return True
+    return password_hash.split("$", 1)[0] != _method_prefix(_method())
+
+
+def shutdown() -> None:
+    global _pool, _slots
+    with _lock:
+        if _pool is not None and _pid == os.getpid():
+            _pool.shutdown(wait=True)
+        _pool, _slots = None, None
@@ -0,0 +1,219 @@
+# app/utils/rate_limit.py
+"""
+接口限流与背压：
+
+    @bp.route("/upload/prepare", methods=["POST"])
+    @rate_limit("file.upload_prepare")
+    def prepare_upload(): ...
+
+    @bp.route("/download/<int:document_id>")
+    @rate_limit("onlyoffice.download", key=lambda document_id: f"{client_ip()}:{document_id}")
+    @concurrency_limit("proxy_stream")
+    def download_proxy(document_id): ...
+
+- rate_limit：令牌桶，参数在 RATE_LIMITS[name] = (每秒补充令牌数, 桶容量)，没配置的不限流；
+  默认按用户计（带有效 JWT 时按 identity，否则按 IP）。桶状态在 Redis 里，一段 Lua 原子完成
+  “补充 + 扣减”，时间取 Redis 服务器时间，多个 worker 之间不受时钟偏差影响；
+  Redis 不可用 / 熔断时退回进程内令牌桶（每个 worker 各算各的，相当于放宽到 worker 数倍）
+- concurrency_limit：每个 worker 进程内同时进行的代理流（MinIO -> 客户端）不超过
+  CONCURRENCY_LIMITS[name] 个，响应体发送完（或客户端断开）才释放名额；满了直接 503，
+  不让慢下载把工作线程占满
+- 被拒绝时抛 TooManyRequestsException（429 / 503 + Retry-After），指标 rate_limited_total{limit, reason}
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Optional
+
+from flask import current_app, make_response, request
+
+from app.exceptions.exceptions import TooManyRequestsException
+from app.extensions import get_redis
+from app.utils import metrics
+
+KEY_PREFIX = "ratelimit:"
+
+# KEYS[1] = 桶；ARGV = 每秒补充数, 容量, 本次消耗
+# 返回 {是否放行, 需要等待的秒数（字符串，Lua 数字返回给 Redis 会被截成整数）}
+_TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+else
+  wait = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+_script = None
+_script_lock = threading.Lock()
+
+
+def _cfg(key, default=None):
+    return current_app.config.get(key, default)
+
+
+def client_ip() -> str:
+    """
+    客户端 IP。不直接读 X-Forwarded-For（客户端可以随便填）：部署在反向代理后面时由 ProxyFix
+    按 PROXY_FIX_X_FOR 只信任最后几跳代理追加的地址，改写 remote_addr
+    """
+    return request.remote_addr or "unknown"
+
+
+def client_identity() -> str:
+    """带有效 JWT 时按用户，否则按 IP（未登录 / token 无效都按 IP 计，不在这里报鉴权错误）"""
+    from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        identity = None
+    return f"user:{identity}" if identity is not None else f"ip:{client_ip()}"
+
+
+# ========== 令牌桶 ==========
+
+class _LocalBuckets:
+    """Redis 不可用时的进程内令牌桶，只保留最近用到的 max_size 个桶"""
+
+    def __init__(self, max_size: int = 10000):
+        self._lock = threading.Lock()
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._max_size = max_size
+
+    def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        """放行返回 0，否则返回需要等待的秒数"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, ts = self._buckets.get(key, (burst, now))
+            tokens = min(burst, tokens + max(0.0, now - ts) * rate)
+            wait = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                wait = (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self._max_size:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+_local_buckets = _LocalBuckets()
+
+
+def _take(key: str, rate: float, burst: float) -> float:
+    global _script
+    r = get_redis()
+    if r is not None:
+        if _script is None:
+            with _script_lock:
+                if _script is None:
+                    _script = r.register_script(_TOKEN_BUCKET_LUA)
+        try:
+            allowed, wait = _script(keys=[KEY_PREFIX + key], args=[rate, burst, 1], client=r)
+            return 0.0 if int(allowed) else float(wait)
+        except Exception:
+            current_app.logger.warning("[RateLimit] redis unavailable, using local bucket", exc_info=True)
+    return _local_buckets.take(key, rate, burst)
+
+
+def check_rate(name: str, key: Optional[str] = None) -> None:
+    """按 RATE_LIMITS[name] 扣一个令牌，不够时抛 429；没配置或 RATE_LIMIT_ENABLED=False 时直接放行"""
+    if not _cfg("RATE_LIMIT_ENABLED", True):
+        return
+    limit = (_cfg("RATE_LIMITS") or {}).get(name)
+    if not limit:
+        return
+    rate, burst = float(limit[0]), float(limit[1])
+    if rate <= 0 or burst <= 0:
+        return
+    wait = _take(f"{name}:{key or client_identity()}", rate, burst)
+    if wait > 0:
+        metrics.RATE_LIMITED.labels(name, "rate").inc()
+        raise TooManyRequestsException("请求过于频繁，请稍后再试", retry_after=math.ceil(wait))
+
+
+def rate_limit(name: str, key: Optional[Callable[..., str]] = None):
+    """
+    视图装饰器（放在 @bp.route 下面）
+    key: 可选，(**视图参数) -> 限流维度，默认按用户 / IP
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            check_rate(name, key(*args, **kwargs) if key else None)
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+# ========== 并发上限 ==========
+
+_semaphores: dict = {}
+_semaphores_lock = threading.Lock()
+
+
+def _semaphore(name: str, size: int) -> threading.BoundedSemaphore:
+    sem = _semaphores.get(name)
+    if sem is None:
+        with _semaphores_lock:
+            sem = _semaphores.get(name)
+            if sem is None:
+                sem = _semaphores[name] = threading.BoundedSemaphore(size)
+    return sem
+
+
+def concurrency_limit(name: str):
+    """
+    视图装饰器：本进程内同时进行的请求（含流式响应体的发送）不超过 CONCURRENCY_LIMITS[name]，
+    满了返回 503 + Retry-After。没配置时不限制。
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            size = int((_cfg("CONCURRENCY_LIMITS") or {}).get(name) or 0)
+            if size <= 0:
+                return view(*args, **kwargs)
+
+            sem = _semaphore(name, size)
+            if not sem.acquire(blocking=False):
+                metrics.RATE_LIMITED.labels(name, "concurrency").inc()
+                raise TooManyRequestsException(
+                    "服务繁忙，请稍后再试",
+                    retry_after=_cfg("CONCURRENCY_RETRY_AFTER", 2),
+                    status_code=503,
+                )
+            try:
+                response = make_response(view(*args, **kwargs))
+            except BaseException:
+                sem.release()
+                raise
+            # 响应体发送完 / 客户端断开时 WSGI 服务器调用 close，这时才释放名额
+            response.call_on_close(sem.release)
+            return response
+
+        return wrapper
+
+    return decorator
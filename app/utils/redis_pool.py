@@ -0,0 +1,139 @@
+# app/utils/redis_pool.py
+"""
+Redis 连接池 + 熔断：
+- 全进程共用一个 BlockingConnectionPool：上限 REDIS_MAX_CONNECTIONS，池满时最多等 REDIS_POOL_TIMEOUT 秒
+- 连接 / 读写都有超时（REDIS_CONNECT_TIMEOUT / REDIS_SOCKET_TIMEOUT），空闲连接按
+  REDIS_HEALTH_CHECK_INTERVAL 先 PING 再用，TCP keepalive
+- 连接类错误按指数退避重试 REDIS_RETRIES 次；读超时不重试（命令可能已经执行，INCR / XADD 不能重放）
+- 熔断：连续 REDIS_BREAKER_THRESHOLD 次连接失败 / 超时后打开，get_redis() 直接返回 None，
+  调用方走各自的“无 Redis”降级逻辑（本地缓存 / 直接查库），不再每个请求都卡在超时上；
+  REDIS_BREAKER_RESET_SECONDS 后放一个请求去探测，成功即恢复
+- 创建客户端不连接 Redis，启动时 Redis 不可用不影响应用启动
+"""
+import logging
+import threading
+import time
+
+from redis import BlockingConnectionPool, Redis
+from redis.backoff import ExponentialBackoff
+from redis.exceptions import ConnectionError, TimeoutError
+from redis.retry import Retry
+
+from app.utils import metrics
+
+# 与 Flask app.logger 同一个 logger（应用包名），连接层没有 app context 也能记日志
+logger = logging.getLogger("app")
+
+
+class CircuitBreaker:
+    """连续失败计数熔断器：closed -> open -> （冷却后放行一次探测）-> closed / open"""
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 10.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0  # 0 表示关闭
+        self._probe_at = 0.0
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self._opened_at)
+
+    def allow(self) -> bool:
+        if not self._opened_at:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if not self._opened_at:
+                return True
+            if now - self._opened_at < self.reset_timeout:
+                return False
+            # 半开：每个冷却周期只放行一个探测请求
+            if now - self._probe_at < self.reset_timeout:
+                return False
+            self._probe_at = now
+            return True
+
+    def record_success(self) -> None:
+        # 绝大多数情况下是关闭状态且没有失败记录，不加锁直接返回
+        if not self._failures and not self._opened_at:
+            return
+        with self._lock:
+            if self._opened_at:
+                logger.warning("[%s] circuit closed, redis is back", self.name)
+            self._failures = 0
+            self._opened_at = 0.0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._opened_at:
+                # 探测失败：重新计时
+                self._opened_at = time.monotonic()
+            elif self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+                metrics.REDIS_CIRCUIT_OPENED.inc()
+                logger.warning(
+                    "[%s] circuit opened after %d failures, running without redis for %.0fs",
+                    self.name, self._failures, self.reset_timeout,
+                )
+
+    def reset(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = 0.0
+            self._probe_at = 0.0
+
+
+breaker = CircuitBreaker("Redis")
+
+
+class RedisConnection(metrics.TimedRedisConnection):
+    """连接建立 / 读取回复的成败都报给熔断器"""
+
+    def connect(self):
+        try:
+            super().connect()
+        except (ConnectionError, TimeoutError):
+            breaker.record_failure()
+            raise
+
+    def read_response(self, *args, **kwargs):
+        try:
+            response = super().read_response(*args, **kwargs)
+        except (ConnectionError, TimeoutError):
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return response
+
+
+def create_client(config) -> Redis:
+    """按配置创建客户端（不会连接 Redis）"""
+    breaker.failure_threshold = int(config.get("REDIS_BREAKER_THRESHOLD", 5))
+    breaker.reset_timeout = float(config.get("REDIS_BREAKER_RESET_SECONDS", 10))
+    breaker.reset()
+
+    retry = Retry(
+        ExponentialBackoff(cap=float(config.get("REDIS_RETRY_BACKOFF_CAP", 0.5)), base=0.05),
+        int(config.get("REDIS_RETRIES", 2)),
+        supported_errors=(ConnectionError,),
+    )
+    pool = BlockingConnectionPool(
+        host=config.get("REDIS_HOST"),
+        port=config.get("REDIS_PORT"),
+        db=config.get("REDIS_DB"),
+        password=config.get("REDIS_PASSWORD") or None,
+        decode_responses=True,
+        max_connections=int(config.get("REDIS_MAX_CONNECTIONS", 50)),
+        timeout=float(config.get("REDIS_POOL_TIMEOUT", 1.0)),
+        socket_connect_timeout=float(config.get("REDIS_CONNECT_TIMEOUT", 0.5)),
+        socket_timeout=float(config.get("REDIS_SOCKET_TIMEOUT", 1.0)),
+        socket_keepalive=True,
+        health_check_interval=int(config.get("REDIS_HEALTH_CHECK_INTERVAL", 30)),
+        retry=retry,
+        connection_class=RedisConnection,
+    )
+    return Redis(connection_pool=pool)
@@ -0,0 +1,67 @@
+# app/utils/streaming.py
+"""
+大列表的流式 JSON 输出：
+- ndjson：每行一个 JSON 对象（Content-Type: application/x-ndjson）
+- json  ：分块输出的 JSON，外层结构与 ResponseTemplate.success 一致
+          {"success": true, "message": "...", "data": [ ...逐行... ]}
+逐行序列化、按 STREAM_CHUNK_BYTES 攒批写出，内存占用与总行数无关。
+"""
+from typing import Iterable, Optional
+
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON = "ndjson"
+JSON = "json"
+
+
+def stream_format() -> Optional[str]:
+    """
+    根据请求判断是否走流式输出：
+      ?stream=ndjson / ?stream=json，或者 Accept: application/x-ndjson
+    不需要流式时返回 None（走原来的 ResponseTemplate）
+    """
+    fmt = (request.args.get("stream") or "").strip().lower()
+    if fmt in (NDJSON, JSON):
+        return fmt
+    if fmt in ("1", "true"):
+        return JSON
+    if "application/x-ndjson" in (request.headers.get("Accept") or ""):
+        return NDJSON
+    return None
+
+
+def _chunks(rows: Iterable[dict], fmt: str, message: str):
+    dumps = current_app.json.dumps_bytes
+    chunk_size = int(current_app.config.get("STREAM_CHUNK_BYTES", 64 * 1024))
+
+    buf = bytearray()
+    if fmt == JSON:
+        buf += b'{"success":true,"message":' + dumps(message) + b',"data":['
+
+    first = True
+    for row in rows:
+        if fmt == NDJSON:
+            buf += dumps(row)
+            buf += b"\n"
+        else:
+            if not first:
+                buf += b","
+            buf += dumps(row)
+        first = False
+
+        if len(buf) >= chunk_size:
+            yield bytes(buf)
+            buf.clear()
+
+    if fmt == JSON:
+        buf += b"]}"
+    if buf:
+        yield bytes(buf)
+
+
+def stream_response(rows: Iterable[dict], fmt: str, message: str = "Success") -> Response:
+    mimetype = "application/x-ndjson" if fmt == NDJSON else "application/json"
+    resp = Response(stream_with_context(_chunks(rows, fmt, message)), mimetype=mimetype)
+    # 告诉 Nginx 不要缓冲，边查边发
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
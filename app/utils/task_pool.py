@@ -0,0 +1,87 @@
+# app/utils/task_pool.py
+"""
+进程内的后台线程池：
+- 按名字区分不同用途的池（preview / export ...），互不抢占
+- 提交的任务自动带上 Flask app context
+- 同一个 dedup_key 的任务在执行中时不会重复提交（直接返回已有 Future）
+"""
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+from flask import Flask, current_app
+
+_lock = threading.Lock()
+_pools: Dict[str, ThreadPoolExecutor] = {}
+_inflight: Dict[str, Future] = {}
+_pid = os.getpid()
+
+
+def _reset_if_forked() -> None:
+    """gunicorn 等 fork 之后，父进程的线程不会带到子进程，这里重新建池"""
+    global _pid
+    if os.getpid() != _pid:
+        _pools.clear()
+        _inflight.clear()
+        _pid = os.getpid()
+
+
+def get_pool(name: str, max_workers: int) -> ThreadPoolExecutor:
+    with _lock:
+        _reset_if_forked()
+        pool = _pools.get(name)
+        if pool is None:
+            pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{name}-worker")
+            _pools[name] = pool
+        return pool
+
+
+def submit(
+    name: str,
+    fn: Callable,
+    *args,
+    max_workers: int = 2,
+    dedup_key: Optional[str] = None,
+    app: Optional[Flask] = None,
+    **kwargs,
+) -> Future:
+    """
+    在名为 name 的线程池中执行 fn(*args, **kwargs)，执行时处于 app context 中。
+    dedup_key 不为空时，同 key 的任务执行期间只会跑一次。
+    """
+    app = app or current_app._get_current_object()
+
+    def _run():
+        with app.app_context():
+            return fn(*args, **kwargs)
+
+    pool = get_pool(name, max_workers)
+
+    if not dedup_key:
+        return pool.submit(_run)
+
+    with _lock:
+        fut = _inflight.get(dedup_key)
+        if fut is not None and not fut.done():
+            return fut
+        fut = pool.submit(_run)
+        _inflight[dedup_key] = fut
+
+    def _cleanup(f: Future):
+        with _lock:
+            if _inflight.get(dedup_key) is f:
+                _inflight.pop(dedup_key, None)
+
+    fut.add_done_callback(_cleanup)
+    return fut
+
+
+def shutdown_all(wait: bool = True) -> None:
+    """优雅退出时调用：等待已提交的任务执行完"""
+    with _lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        _inflight.clear()
+    for pool in pools:
+        pool.shutdown(wait=wait)
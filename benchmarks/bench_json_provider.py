@@ -0,0 +1,73 @@
+# benchmarks/bench_json_provider.py
+"""
+JSON Provider 基准：10k 行知识库文件列表，对比 BJJSONProvider 与 BJOrjsonProvider
+
+    python -m benchmarks.bench_json_provider [--rows 10000] [--repeat 20]
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from app.models.result import ResponseTemplate
+from app.utils.datetime_provider import BJJSONProvider, BJOrjsonProvider, orjson
+
+
+def _make_rows(n: int) -> list[dict]:
+    base = datetime(2025, 1, 1, 8, 0, 0)
+    return [
+        {
+            "id": i,
+            "name": f"施工方案-{i}.docx",
+            "folder_id": i % 500,
+            "folder_path": "根目录 / 二沉池 / 施工方案",
+            "document_id": 100000 + i,
+            "file_type": "docx",
+            "description": "二沉池施工方案" if i % 3 else None,
+            "version": 1 + i % 5,
+            "updated_at": base + timedelta(minutes=i),
+            "tags": ["施工方案", "二沉池"][: i % 3],
+            "thumbnail_url": f"/api/file/{100000 + i}/thumbnail?size=256&v=abc{i}",
+        }
+        for i in range(n)
+    ]
+
+
+def _bench(app: Flask, provider_cls, rows, repeat: int) -> tuple[float, bytes]:
+    app.json = provider_cls(app)
+    with app.app_context():
+        body = ResponseTemplate.success(message="获取文件列表成功", data=rows).get_data()
+        start = time.perf_counter()
+        for _ in range(repeat):
+            ResponseTemplate.success(message="获取文件列表成功", data=rows).get_data()
+        elapsed = (time.perf_counter() - start) / repeat * 1000
+    return elapsed, body
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    rows = _make_rows(args.rows)
+
+    std_ms, std_body = _bench(app, BJJSONProvider, rows, args.repeat)
+    print(f"BJJSONProvider   : {std_ms:8.2f} ms/response  ({len(std_body)} bytes)")
+
+    if orjson is None:
+        print("orjson 未安装，跳过 BJOrjsonProvider")
+        return
+
+    fast_ms, fast_body = _bench(app, BJOrjsonProvider, rows, args.repeat)
+    print(f"BJOrjsonProvider : {fast_ms:8.2f} ms/response  ({len(fast_body)} bytes)")
+    print(f"speedup          : {std_ms / fast_ms:8.2f}x")
+
+    # 两种实现解析后的结果必须一致（北京时间字符串等）
+    assert orjson.loads(std_body) == orjson.loads(fast_body)
+
+
+if __name__ == "__main__":
+    main()
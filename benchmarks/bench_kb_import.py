@@ -0,0 +1,65 @@
+# benchmarks/bench_kb_import.py
+"""
+清单导入吞吐基准（目标 ≥ 10k 行/秒）
+
+    DATABASE_URL=sqlite:////tmp/kb_import.db python -m benchmarks.bench_kb_import --rows 50000
+    DATABASE_URL=mysql+pymysql://... python -m benchmarks.bench_kb_import --rows 100000
+
+不传 DATABASE_URL 时使用临时 SQLite 文件。会对目标库执行 create_all，不要指向生产库。
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+
+if not os.environ.get("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "kb_import.db")
+
+import pandas as pd  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.services import kb_import_service  # noqa: E402
+
+
+def _make_manifest(rows: int, folders: int, tags: int, seed: int) -> pd.DataFrame:
+    rng = random.Random(seed)
+    folder_paths = []
+    for i in range(folders):
+        depth = rng.randint(1, 4)
+        folder_paths.append("/".join(f"项目{i % 50}" if d == 0 else f"目录{i}-{d}" for d in range(depth)))
+    tag_names = [f"标签{i}" for i in range(tags)]
+    exts = ["pdf", "docx", "xlsx", "dwg", "png"]
+
+    return pd.DataFrame({
+        "path": [f"{rng.choice(folder_paths)}/文件{i}.{rng.choice(exts)}" for i in range(rows)],
+        "tags": [",".join(rng.sample(tag_names, rng.randint(0, 3))) for _ in range(rows)],
+        "description": ["" if i % 4 else f"说明 {i}" for i in range(rows)],
+        "name": ["" for _ in range(rows)],
+        "size": [str(rng.randint(1_000, 50_000_000)) for _ in range(rows)],
+        "content_type": ["" for _ in range(rows)],
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--folders", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=500)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    app = create_app("dev")
+    with app.app_context():
+        db.create_all()
+        df = _make_manifest(args.rows, args.folders, args.tags, args.seed)
+        stats = kb_import_service.import_manifest(df, chunk_size=args.chunk_size)
+        print(json.dumps(stats, ensure_ascii=False, indent=2))
+        if stats["rows_per_sec"] and stats["rows_per_sec"] < 10000:
+            print("WARNING: 低于 10k 行/秒 的目标")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+# benchmarks/bench_menu_permissions.py
+"""
+按角色裁剪菜单树的基准：1k 菜单 × 100 角色
+
+    python -m benchmarks.bench_menu_permissions [--menus 1000] [--roles 100] [--users 2000]
+
+对比：
+- bitset：menu_service 的预计算位图 + prune_tree
+- naive ：每次请求把角色菜单合并成 set，再递归过滤（相当于没有预计算时的做法）
+"""
+import argparse
+import random
+import time
+
+from app.services.menu_service import (
+    build_menu_tree,
+    compute_role_masks,
+    compute_subtree_masks,
+    prune_tree,
+)
+
+
+def _make_menus(n: int, rng: random.Random) -> list[dict]:
+    menus = []
+    for i in range(1, n + 1):
+        # 前 20 个是一级菜单，其余随机挂在前面的节点下
+        parent_id = None if i <= 20 else rng.randint(1, i - 1)
+        menus.append({
+            "id": i, "name": f"menu-{i}", "path": f"/m/{i}", "component": f"pages/M{i}",
+            "icon": None, "parent_id": parent_id,
+            "created_at": None, "created_by": None, "updated_at": None, "updated_by": None,
+        })
+    return menus
+
+
+def _naive_prune(nodes, allowed: set, parent_of: dict) -> list[dict]:
+    # 允许的节点 + 其所有祖先
+    visible = set()
+    for mid in allowed:
+        while mid and mid not in visible:
+            visible.add(mid)
+            mid = parent_of.get(mid)
+
+    def walk(items):
+        out = []
+        for node in items:
+            if node["id"] in visible:
+                pruned = dict(node)
+                pruned["children"] = walk(node["children"])
+                out.append(pruned)
+        return out
+
+    return walk(nodes)
+
+
+def _timeit(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6  # 微秒
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--menus", type=int, default=1000)
+    parser.add_argument("--roles", type=int, default=100)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    flat = _make_menus(args.menus, rng)
+    menu_ids = [m["id"] for m in flat]
+    pairs = []
+    role_menus: dict[int, set] = {}
+    for role_id in range(1, args.roles + 1):
+        chosen = rng.sample(menu_ids, rng.randint(args.menus // 20, args.menus // 3))
+        role_menus[role_id] = set(chosen)
+        pairs.extend((role_id, mid) for mid in chosen)
+    users = [rng.sample(range(1, args.roles + 1), rng.randint(1, 3)) for _ in range(args.users)]
+    parent_of = {m["id"]: m["parent_id"] for m in flat}
+
+    # 一次性预计算（菜单 / 权限变更时才发生）
+    start = time.perf_counter()
+    tree = build_menu_tree(flat)
+    index = {m["id"]: pos for pos, m in enumerate(flat)}
+    subtree_masks = compute_subtree_masks(tree, index)
+    role_masks = compute_role_masks(pairs, index)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    def bitset_mask():
+        for roles in users:
+            mask = 0
+            for rid in roles:
+                mask |= role_masks.get(rid, 0)
+
+    def naive_union():
+        for roles in users:
+            allowed = set()
+            for rid in roles:
+                allowed |= role_menus[rid]
+
+    sample = users[: max(1, min(200, len(users)))]
+
+    def bitset_prune():
+        for roles in sample:
+            mask = 0
+            for rid in roles:
+                mask |= role_masks.get(rid, 0)
+            prune_tree(tree, index, subtree_masks, mask)
+
+    def naive_prune():
+        for roles in sample:
+            allowed = set()
+            for rid in roles:
+                allowed |= role_menus[rid]
+            _naive_prune(tree, allowed, parent_of)
+
+    # 结果必须一致
+    for roles in sample[:20]:
+        mask = 0
+        allowed = set()
+        for rid in roles:
+            mask |= role_masks[rid]
+            allowed |= role_menus[rid]
+        assert prune_tree(tree, index, subtree_masks, mask) == _naive_prune(tree, allowed, parent_of)
+
+    print(f"menus={args.menus} roles={args.roles} users={args.users}")
+    print(f"precompute (tree + subtree masks + role masks): {build_ms:.2f} ms")
+    print(f"user mask   bitset: {_timeit(bitset_mask, 5) / len(users):8.2f} us/user")
+    print(f"user mask   naive : {_timeit(naive_union, 5) / len(users):8.2f} us/user")
+    print(f"prune tree  bitset: {_timeit(bitset_prune, 3) / len(sample):8.2f} us/user")
+    print(f"prune tree  naive : {_timeit(naive_prune, 3) / len(sample):8.2f} us/user")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+# benchmarks/bench_suite.py
+"""
+知识库 / 文档 / OnlyOffice 热点路径基准套件，输出 pytest-benchmark 风格的 JSON，可以和基线对比
+
+    python -m benchmarks.bench_suite                                  # 1 万目录 / 100 万文件 / 1000 标签
+    python -m benchmarks.bench_suite --folders 2000 --files 100000 --tags 200 --rounds 5   # 快速跑
+    python -m benchmarks.bench_suite --save .benchmarks/base.json
+    python -m benchmarks.bench_suite --compare .benchmarks/base.json --max-regression 0.15
+
+- 数据库：默认 SQLite。同一规模 / 种子的数据库缓存在系统临时目录，只造一次，每次运行复制一份再跑
+  （delete_folder 会改数据）。DATABASE_URL=mysql+pymysql://... 时直接用该库，表为空才造数据，
+  delete_folder 会软删除其中的叶子目录。会 create_all 并写入测试数据，不要指向生产库
+- MinIO：默认在进程内启动 fake_servers 的假 S3；--minio-endpoint 指向本地 MinIO。
+  设置了 MINIO_REGION，下载预签名是纯本地计算；上传预签名每次还有一次 bucket 存在性检查
+- Redis 默认指向 127.0.0.1，连不上时动态 / 缓存按原逻辑降级，对比时前后环境保持一致即可
+- 编辑器配置只测文档查询 + 配置组装 / 签名，不含登录态和用户资料缓存
+- 对比：逐项比较中位数，变慢超过 --max-regression（THRESHOLDS 里可单独放宽）记为回退，退出码 1
+- pytest：tests/test_bench_suite.py 在小数据上把每一项跑一轮，只保证套件能跑通。计时和对比留在命令行，
+  不用 pytest-benchmark：百万级造数据不适合放进测试，各项的回退阈值也不同（THRESHOLDS）
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# 单项阈值：波动大的项目放宽一些
+THRESHOLDS = {
+    "document.presign_upload": 0.30,
+    "kb.delete_folder": 0.30,
+}
+
+BATCH = 20000
+
+
+# ================= 造数据 =================
+
+def _seed(folders: int, files: int, tags: int, seed: int) -> None:
+    from sqlalchemy import func, insert, select
+
+    from app.extensions import db
+    from app.models.document import Document, DocumentStatus
+    from app.models.kb_models import KbFile, KbFileTag, KbFolder, KbTag
+    from app.services import kb_stats_service
+
+    if db.session.execute(select(func.count(KbFile.id))).scalar():
+        return
+
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    started = time.perf_counter()
+    print(f"造数据：{folders} 目录 / {files} 文件 / {tags} 标签 ...", flush=True)
+
+    # 目录：前 20 个是根，其余挂在深度 < 6 的已有目录下；id 显式指定（只在空表时造数据）
+    depth = {}
+    parents = []
+    rows = []
+    for fid in range(1, folders + 1):
+        parent_id = None if fid <= 20 else rng.choice(parents)
+        depth[fid] = 0 if parent_id is None else depth[parent_id] + 1
+        if depth[fid] < 6:
+            parents.append(fid)
+        rows.append({"id": fid, "parent_id": parent_id, "name": f"目录{fid}", "sort_order": fid * 1024})
+    for i in range(0, len(rows), BATCH):
+        db.session.execute(insert(KbFolder), rows[i:i + BATCH])
+
+    db.session.execute(insert(KbTag), [{"id": i, "name": f"标签{i}"} for i in range(1, tags + 1)])
+
+    # 文件：1% 落在热点目录 21（大目录列表），其余均匀分布；每个文件对应一个文档
+    hot = min(21, folders)
+    types = ["pdf", "docx", "xlsx", "dwg", "png"]
+    for start in range(0, files, BATCH):
+        docs, kb_files, links = [], [], []
+        for fid in range(start + 1, min(files, start + BATCH) + 1):
+            ext = types[fid % 5]
+            updated = now - timedelta(minutes=rng.randint(0, 500000))
+            docs.append({
+                "id": fid, "file_name": f"文件{fid}.{ext}", "bucket": "files",
+                "object_key": f"bench/{fid}.{ext}", "content_type": "application/octet-stream",
+                "size": rng.randint(1_000, 20_000_000), "status": DocumentStatus.COMPLETED,
+                "created_at": updated, "updated_at": updated,
+            })
+            kb_files.append({
+                "id": fid, "folder_id": hot if rng.random() < 0.01 else rng.randint(1, folders),
+                "name": f"文件{fid}.{ext}", "document_id": fid, "file_type": ext, "version": 1,
+                "is_deleted": False, "created_at": updated, "updated_at": updated,
+            })
+            for tag_id in {rng.randint(1, tags) for _ in range(rng.choice((0, 1, 1, 2)))}:
+                links.append({"file_id": fid, "tag_id": tag_id})
+        db.session.execute(insert(Document), docs)
+        db.session.execute(insert(KbFile), kb_files)
+        if links:
+            db.session.execute(insert(KbFileTag), links)
+        db.session.commit()
+        print(f"  {min(files, start + BATCH)}/{files}", end="\r", flush=True)
+
+    kb_stats_service.recompute_all()
+    db.session.commit()
+    print(f"造数据完成，用时 {time.perf_counter() - started:.1f}s          ")
+
+
+def _fixtures(rng: random.Random) -> dict:
+    """挑选各基准用到的目录 / 标签 / 文档"""
+    from sqlalchemy import func, select
+
+    from app.extensions import db
+    from app.models.kb_models import KbFile, KbFolder, KbTag
+
+    # 列表用“直接包含”的文件数挑目录：最多的是热点目录，中位数是普通目录
+    direct = db.session.execute(
+        select(KbFile.folder_id, func.count().label("files"))
+        .where(KbFile.is_deleted == False)
+        .group_by(KbFile.folder_id)
+        .order_by(func.count(), KbFile.folder_id)
+    ).all()
+    hot = direct[-1].folder_id if direct else 1
+    typical = direct[len(direct) // 2].folder_id if direct else hot
+
+    # delete_folder：文件数接近中位数的叶子目录，互不重叠，每轮删一个
+    folders = db.session.execute(
+        select(KbFolder.id, KbFolder.parent_id, KbFolder.file_count).where(KbFolder.is_deleted == False)
+    ).all()
+    has_children = {f.parent_id for f in folders if f.parent_id}
+    leaves = sorted(
+        (f for f in folders if f.id not in has_children and f.id not in (hot, typical)),
+        key=lambda f: (f.file_count, f.id),
+    )
+    if leaves:
+        median = leaves[len(leaves) // 2].file_count
+        leaves = [f.id for f in leaves if median * 0.5 <= f.file_count <= median * 1.5]
+    rng.shuffle(leaves)
+
+    tag = db.session.execute(select(KbTag.name).order_by(KbTag.id).limit(1)).scalar() or ""
+    file_name = db.session.execute(
+        select(KbFile.name).where(KbFile.folder_id == typical).order_by(KbFile.id).limit(1)
+    ).scalar() or "文件1"
+    document_id = db.session.execute(select(KbFile.document_id).order_by(KbFile.id).limit(1)).scalar() or 1
+    return {
+        "hot_folder": hot, "typical_folder": typical, "delete_candidates": leaves,
+        "tag": tag, "q": file_name.rsplit(".", 1)[0], "document_id": document_id,
+    }
+
+
+# ================= 基准项 =================
+
+def _benchmarks(app, fx: dict) -> list:
+    """(名称, 分组, 参数, 每轮调用的函数)"""
+    from app.models.document import Document
+    from app.services import document_service, kb_service, onlyoffice_service
+
+    def call(fn, *args, query=None, method="GET", json_body=None):
+        def run():
+            # 每轮一个新的请求 / app 上下文，结束时 session 随上下文清掉，和线上一次请求一致
+            with app.test_request_context("/", method=method, query_string=query, json=json_body):
+                resp = fn(*args)
+                return resp.get_data() if hasattr(resp, "get_data") else resp
+        return run
+
+    def editor_config():
+        doc = Document.query.get(fx["document_id"])
+        return json.dumps(onlyoffice_service._editor_config(doc, "1", "基准用户", "edit"))
+
+    candidates = iter(fx["delete_candidates"])
+
+    def delete_next():
+        return kb_service.delete_folder(next(candidates))
+
+    upload_body = {"filename": "基准.docx", "fileType": "OTHER", "businessId": "bench",
+                   "contentType": "application/octet-stream", "size": 1024}
+
+    items = [
+        ("kb.folder_tree", "kb", {}, call(kb_service.get_folder_tree)),
+        ("kb.list_files[typical]", "kb", {"folder_id": fx["typical_folder"]},
+         call(kb_service.list_files_by_folder, query={"folder_id": fx["typical_folder"]})),
+        ("kb.list_files[hot]", "kb", {"folder_id": fx["hot_folder"]},
+         call(kb_service.list_files_by_folder, query={"folder_id": fx["hot_folder"]})),
+        ("kb.list_files[hot,name asc]", "kb", {"folder_id": fx["hot_folder"]},
+         call(kb_service.list_files_by_folder,
+              query={"folder_id": fx["hot_folder"], "sort_field": "name", "sort_order": "asc"})),
+        ("kb.search[tag]", "kb", {"tags": fx["tag"]},
+         call(kb_service.search_files, query={"tags": fx["tag"]})),
+        ("kb.search[q]", "kb", {"q": fx["q"]},
+         call(kb_service.search_files, query={"q": fx["q"]})),
+        ("document.presign_download", "document", {"document_id": fx["document_id"]},
+         call(document_service.generate_download_url, fx["document_id"])),
+        ("document.presign_upload", "document", {},
+         call(document_service.prepare_upload, method="POST", json_body=upload_body)),
+        ("onlyoffice.editor_config", "onlyoffice", {"document_id": fx["document_id"]}, call(editor_config)),
+        # 放最后：会软删除数据
+        ("kb.delete_folder", "kb", {"candidates": len(fx["delete_candidates"])}, call(delete_next)),
+    ]
+    return items
+
+
+def _measure(fn, rounds: int, warmup: int) -> dict:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    mean = statistics.fmean(times)
+    return {
+        "min": min(times),
+        "max": max(times),
+        "mean": mean,
+        "median": statistics.median(times),
+        "stddev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "rounds": len(times),
+        "ops": 1 / mean if mean else None,
+    }
+
+
+def run_benchmarks(app, fx: dict, rounds: int, warmup: int, only=None) -> list:
+    """逐项计时并打印，返回 pytest-benchmark 风格的 benchmarks 列表"""
+    results = []
+    print(f"\n{'benchmark':<32} {'median ms':>10} {'min ms':>10} {'stddev':>8} {'rounds':>7}")
+    for name, group, params, fn in _benchmarks(app, fx):
+        if only and not any(s in name for s in only):
+            continue
+        item_rounds = rounds
+        if name == "kb.delete_folder":
+            item_rounds = min(rounds, max(0, len(fx["delete_candidates"]) - warmup))
+            if not item_rounds:
+                print(f"{name:<32} 跳过：没有可删除的叶子目录")
+                continue
+        stats = _measure(fn, item_rounds, warmup)
+        results.append({"name": name, "group": group, "params": params, "stats": stats})
+        print(f"{name:<32} {stats['median'] * 1000:>10.2f} {stats['min'] * 1000:>10.2f} "
+              f"{stats['stddev'] * 1000:>8.2f} {stats['rounds']:>7}", flush=True)
+    return results
+
+
+# ================= 对比 =================
+
+def _compare(results: dict, baseline_path: str, max_regression: float) -> list:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("params") != results["params"]:
+        print(f"注意：基线参数不同 {baseline.get('params')} vs {results['params']}")
+
+    base = {b["name"]: b["stats"] for b in baseline.get("benchmarks", [])}
+    regressions = []
+    print(f"\n{'benchmark':<32} {'base ms':>10} {'now ms':>10} {'change':>8}  threshold")
+    for b in results["benchmarks"]:
+        old = base.get(b["name"])
+        if not old:
+            print(f"{b['name']:<32} {'-':>10} {b['stats']['median'] * 1000:>10.2f} {'new':>8}")
+            continue
+        change = b["stats"]["median"] / old["median"] - 1 if old["median"] else 0.0
+        limit = THRESHOLDS.get(b["name"], max_regression)
+        flag = "  REGRESSION" if change > limit else ""
+        print(f"{b['name']:<32} {old['median'] * 1000:>10.2f} {b['stats']['median'] * 1000:>10.2f} "
+              f"{change:>+8.1%}  {limit:.0%}{flag}")
+        if change > limit:
+            regressions.append(b["name"])
+    return regressions
+
+
+def _commit_id() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--folders", type=int, default=10000)
+    parser.add_argument("--files", type=int, default=1000000)
+    parser.add_argument("--tags", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--only", action="append", help="只跑名称包含该字符串的基准（可多次）")
+    parser.add_argument("--minio-endpoint", help="本地 MinIO（host:port），默认进程内假 S3")
+    parser.add_argument("--save", help="结果 JSON 写到这个文件")
+    parser.add_argument("--compare", help="基线 JSON，逐项对比中位数")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="允许变慢的比例，默认 0.15")
+    args = parser.parse_args()
+
+    # ---- 环境：必须在导入 app（读取配置）之前设置 ----
+    cache_db = None
+    if not os.environ.get("DATABASE_URL"):
+        cache_db = os.path.join(
+            tempfile.gettempdir(), f"kb_bench_{args.folders}_{args.files}_{args.tags}_{args.seed}.db"
+        )
+        work_db = os.path.join(tempfile.mkdtemp(), "kb_bench.db")
+        if os.path.exists(cache_db):
+            shutil.copyfile(cache_db, work_db)
+        os.environ["DATABASE_URL"] = "sqlite:///" + work_db
+
+    if args.minio_endpoint:
+        os.environ["MINIO_ENDPOINT"] = args.minio_endpoint
+    else:
+        from benchmarks import fake_servers
+
+        s3 = fake_servers.start(fake_servers.FakeS3Handler)
+        os.environ["MINIO_ENDPOINT"] = f"127.0.0.1:{s3.server_port}"
+        os.environ["MINIO_SECURE"] = "false"
+    os.environ.setdefault("MINIO_REGION", "us-east-1")
+    os.environ.setdefault("REDIS_HOST", "127.0.0.1")
+    # 测的是查询本身：不走目录树 / 标签等缓存
+    os.environ.setdefault("CACHE_ENABLED", "false")
+
+    from app import create_app
+    from app.extensions import db
+
+    app = create_app("dev")
+    app.logger.setLevel("ERROR")
+    with app.app_context():
+        db.create_all()
+        _seed(args.folders, args.files, args.tags, args.seed)
+        if cache_db and not os.path.exists(cache_db):
+            db.engine.dispose()
+            shutil.copyfile(os.environ["DATABASE_URL"][len("sqlite:///"):], cache_db)
+        fx = _fixtures(random.Random(args.seed))
+        dialect = db.engine.dialect.name
+
+    results = {
+        "machine_info": {
+            "node": platform.node(),
+            "python_version": platform.python_version(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+            "cpu_count": os.cpu_count(),
+        },
+        "commit_info": {"id": _commit_id()},
+        "datetime": datetime.utcnow().isoformat(),
+        "params": {"dialect": dialect, "folders": args.folders, "files": args.files, "tags": args.tags},
+        "benchmarks": [],
+    }
+
+    results["benchmarks"] = run_benchmarks(app, fx, args.rounds, args.warmup, args.only)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {args.save}")
+
+    if args.compare:
+        regressions = _compare(results, args.compare, args.max_regression)
+        if regressions:
+            print(f"\n{len(regressions)} 项性能回退：{', '.join(regressions)}")
+            sys.exit(1)
+        print("\n没有超过阈值的性能回退")
+
+
+if __name__ == "__main__":
+    main()
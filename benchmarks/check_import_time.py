@@ -0,0 +1,121 @@
+# benchmarks/check_import_time.py
+"""
+应用启动（导入 + create_app）耗时检查：用 python -X importtime 解析各模块导入耗时，超过预算以非 0 退出
+
+    python -m benchmarks.check_import_time                      # 默认预算 1500ms，跑 3 次取最快
+    python -m benchmarks.check_import_time --budget-ms 800 --top 30
+
+- 总耗时：子进程里 `from app import create_app; create_app(...)` 的墙钟时间（不含解释器自身启动）
+- 导入耗时：-X importtime 输出里顶层模块的 cumulative 之和
+- 启动阶段不应该导入的重依赖（pandas / numpy / PIL / xlsxwriter / requests / minio）一旦出现直接失败，
+  并打印是谁导入了它们；这一项与机器快慢无关，最能防止回退
+create_app 不会连接数据库 / Redis / MinIO，不需要任何外部服务。
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+
+HEAVY_MODULES = ("pandas", "numpy", "PIL", "xlsxwriter", "requests", "minio")
+DEFAULT_BUDGET_MS = 1500
+
+SNIPPET = """
+import time
+start = time.perf_counter()
+from app import create_app
+create_app({config!r})
+print("STARTUP_MS", (time.perf_counter() - start) * 1000)
+"""
+
+
+def _run_once(config: str) -> tuple[float, list]:
+    env = dict(os.environ)
+    # 内存 SQLite 用 StaticPool，不接受连接池参数；给一个文件路径（create_app 不会真的去连）
+    env.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "import_time.db"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", SNIPPET.format(config=config)],
+        capture_output=True, text=True, env=env,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"启动失败（退出码 {proc.returncode}）")
+
+    startup_ms = next(
+        float(line.split()[1]) for line in proc.stdout.splitlines() if line.startswith("STARTUP_MS")
+    )
+
+    # import time:       self [us] |  cumulative | imported package
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, raw_name = line[len("import time:"):].split("|")
+        name = raw_name.strip()
+        # 包名前有 1 个空格，之后每深一层多 2 个
+        depth = (len(raw_name) - len(raw_name.lstrip(" ")) - 1) // 2
+        entries.append((name, depth, int(self_us), int(cumulative_us)))
+    return startup_ms, entries
+
+
+def _importers(entries: list, module: str) -> list:
+    """-X importtime 按导入完成顺序输出，子模块在父模块之前、缩进更深；往后找第一个更浅的就是导入者"""
+    chains = []
+    for i, (name, depth, _, _) in enumerate(entries):
+        if name != module and not name.startswith(module + "."):
+            continue
+        chain, want = [], depth
+        for later, later_depth, _, _ in entries[i + 1:]:
+            if later_depth < want:
+                chain.append(later)
+                want = later_depth
+                if later_depth == 0:
+                    break
+        chains.append(" <- ".join([name] + chain))
+        break
+    return chains
+
+
+def measure_startup(config: str, repeat: int = 3) -> tuple[float, list, list]:
+    """跑 repeat 次取最快的一次，返回 (启动毫秒, importtime 条目, 启动阶段导入了的重依赖)"""
+    runs = [_run_once(config) for _ in range(max(1, repeat))]
+    startup_ms, entries = min(runs, key=lambda r: r[0])
+    loaded = {e[0] for e in entries}
+    return startup_ms, entries, [m for m in HEAVY_MODULES if m in loaded]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", default="prod", help="create_app 的配置名")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="启动耗时预算（毫秒）")
+    parser.add_argument("--repeat", type=int, default=3, help="跑几次取最快的一次")
+    parser.add_argument("--top", type=int, default=20, help="打印最慢的前 N 个顶层模块")
+    args = parser.parse_args()
+
+    startup_ms, entries, heavy = measure_startup(args.config, args.repeat)
+
+    top_level = [e for e in entries if e[1] == 0]
+    import_ms = sum(e[3] for e in top_level) / 1000
+    print(f"{'module':<48} {'cumulative ms':>14}")
+    for name, _, _, cumulative in sorted(top_level, key=lambda e: e[3], reverse=True)[:args.top]:
+        print(f"{name:<48} {cumulative / 1000:>14.1f}")
+
+    print(f"\n启动耗时 {startup_ms:.0f}ms（导入 {import_ms:.0f}ms），预算 {args.budget_ms:.0f}ms")
+
+    failed = False
+    if heavy:
+        failed = True
+        print(f"\n启动阶段导入了重依赖：{', '.join(heavy)}（应推迟到用到的函数里）")
+        for module in heavy:
+            for chain in _importers(entries, module):
+                print(f"    {chain}")
+    if startup_ms > args.budget_ms:
+        failed = True
+        print(f"\n启动耗时超出预算 {startup_ms - args.budget_ms:.0f}ms")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
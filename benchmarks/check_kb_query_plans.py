@@ -0,0 +1,184 @@
+# benchmarks/check_kb_query_plans.py
+"""
+知识库查询执行计划检查：对 kb_service 实际使用的查询执行 EXPLAIN，出现全表扫描就以非 0 退出
+
+    DATABASE_URL=mysql+pymysql://... python -m benchmarks.check_kb_query_plans
+    python -m benchmarks.check_kb_query_plans            # 不传 DATABASE_URL 时用临时 SQLite
+
+- MySQL：EXPLAIN 里知识库表的 type = ALL 视为全表扫描
+- SQLite：EXPLAIN QUERY PLAN 里 “SCAN <表>” 且没有走索引视为全表扫描
+- 文件表为空时先造 --seed-files 行数据（MySQL 造完执行 ANALYZE TABLE），优化器才会按真实规模选计划
+- 文件名 %关键字% 模糊搜索本身无法走 B-tree 索引，列为允许扫描
+会对目标库执行 create_all 并写入测试数据，不要指向生产库。
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+if not os.environ.get("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "kb_plans.db")
+
+from sqlalchemy import func, insert, select, update  # noqa: E402
+
+from app import create_app  # noqa: E402
+from app.extensions import db  # noqa: E402
+from app.models.kb_models import KbFile, KbFileTag, KbFolder, KbTag  # noqa: E402
+from app.services import kb_service  # noqa: E402
+
+KB_TABLES = {"t_kb_folder", "t_kb_file", "t_kb_tag", "t_kb_file_tag"}
+
+
+def _seed(files: int, folders: int, tags: int) -> None:
+    if db.session.execute(select(func.count(KbFile.id))).scalar():
+        return
+
+    rng = random.Random(7)
+    now = datetime.utcnow()
+
+    # 先插目录再挂父子关系（id 由数据库分配）
+    marker = f"plan-{now:%Y%m%d%H%M%S}"
+    db.session.execute(insert(KbFolder).values([
+        {"name": f"{marker}-{i}", "sort_order": (i + 1) * 1024, "is_deleted": i % 25 == 0}
+        for i in range(folders)
+    ]))
+    folder_ids = db.session.execute(
+        select(KbFolder.id).where(KbFolder.name.like(f"{marker}-%")).order_by(KbFolder.id)
+    ).scalars().all()
+    db.session.execute(update(KbFolder), [
+        {"id": fid, "parent_id": rng.choice(folder_ids[:i])}
+        for i, fid in enumerate(folder_ids) if i >= 20
+    ])
+
+    existing_tags = set(db.session.execute(select(KbTag.name)).scalars())
+    new_tags = [f"plan标签{i}" for i in range(tags) if f"plan标签{i}" not in existing_tags]
+    if new_tags:
+        db.session.execute(insert(KbTag).values([{"name": n} for n in new_tags]))
+    tag_ids = db.session.execute(select(KbTag.id)).scalars().all()
+
+    types = ["pdf", "docx", "xlsx", "dwg", "png"]
+    for start in range(0, files, 5000):
+        batch = min(5000, files - start)
+        db.session.execute(insert(KbFile).values([
+            {
+                "folder_id": rng.choice(folder_ids),
+                "name": f"文件{start + i}.{types[i % 5]}",
+                "document_id": start + i + 1,
+                "file_type": types[i % 5],
+                "version": 1,
+                "is_deleted": rng.random() < 0.1,
+                "updated_at": now - timedelta(minutes=rng.randint(0, 500000)),
+            }
+            for i in range(batch)
+        ]))
+    file_ids = db.session.execute(select(KbFile.id)).scalars().all()
+    links = list({(fid, rng.choice(tag_ids)) for fid in rng.sample(file_ids, min(len(file_ids), files // 2))})
+    for start in range(0, len(links), 5000):
+        chunk = links[start:start + 5000]
+        db.session.execute(insert(KbFileTag).values([{"file_id": f, "tag_id": t} for f, t in chunk]))
+    db.session.commit()
+
+    if db.engine.dialect.name == "mysql":
+        with db.engine.connect() as conn:
+            conn.exec_driver_sql("ANALYZE TABLE " + ", ".join(sorted(KB_TABLES)))
+
+
+def _queries(app):
+    """(名称, 语句, 是否允许全表扫描)"""
+    folder_id = db.session.execute(
+        select(KbFile.folder_id).group_by(KbFile.folder_id).order_by(func.count().desc()).limit(1)
+    ).scalar() or 1
+
+    result = [("folder_tree", kb_service.build_folder_tree_statement(), False)]
+
+    for field in ("updated_at", "name", "file_type"):
+        for order in ("asc", "desc"):
+            with app.test_request_context(query_string={"sort_field": field, "sort_order": order}):
+                result.append((f"folder_files[{field} {order}]", kb_service.build_folder_files_statement(folder_id), False))
+
+    with app.test_request_context():
+        result.append(("search[all]", kb_service.build_search_statement(), False))
+    with app.test_request_context(query_string={"tags": "plan标签1,plan标签2"}):
+        result.append(("search[tags]", kb_service.build_search_statement(), False))
+    with app.test_request_context(query_string={"q": "文件1"}):
+        result.append(("search[q]", kb_service.build_search_statement(), True))
+
+    result += [
+        ("folder_siblings", select(func.max(KbFolder.sort_order)).where(
+            KbFolder.parent_id == folder_id, KbFolder.is_deleted == False), False),
+        ("files_by_document", select(KbFile.folder_id).where(
+            KbFile.document_id == 1, KbFile.is_deleted == False), False),
+        ("recycle_purge", select(KbFile.id).where(
+            KbFile.is_deleted == True, KbFile.updated_at < datetime.utcnow() - timedelta(days=30)
+        ).order_by(KbFile.updated_at).limit(1000), False),
+    ]
+    return result
+
+
+def _explain(conn, stmt) -> tuple[list[str], list[str]]:
+    """返回 (全表扫描的表, 计划描述)"""
+    dialect = db.engine.dialect
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[k] for k in compiled.positiontup)
+
+    scans, lines = [], []
+    if dialect.name == "mysql":
+        for row in conn.exec_driver_sql("EXPLAIN " + str(compiled), params).mappings():
+            lines.append(f"{row['table']}: type={row['type']} key={row['key']} extra={row['Extra']}")
+            if row["type"] == "ALL" and row["table"] in KB_TABLES:
+                scans.append(row["table"])
+    elif dialect.name == "sqlite":
+        for row in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + str(compiled), params):
+            detail = row[-1]
+            lines.append(detail)
+            words = detail.split()
+            if words[:1] == ["SCAN"] and len(words) > 1 and words[1] in KB_TABLES and "INDEX" not in detail:
+                scans.append(words[1])
+    else:
+        raise SystemExit(f"不支持的数据库：{dialect.name}")
+    return scans, lines
+
+
+def check_plans(app) -> list[tuple[str, list[str], list[str], bool]]:
+    """对每条查询执行 EXPLAIN，返回 [(名称, 全表扫描的表, 计划描述, 是否允许全表扫描)]；需在应用上下文里调用"""
+    with db.engine.connect() as conn:
+        return [(name, *_explain(conn, stmt), allow_scan) for name, stmt, allow_scan in _queries(app)]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seed-files", type=int, default=20000)
+    parser.add_argument("--seed-folders", type=int, default=500)
+    parser.add_argument("--seed-tags", type=int, default=100)
+    parser.add_argument("-v", "--verbose", action="store_true", help="打印每条查询的完整计划")
+    args = parser.parse_args()
+
+    app = create_app("dev")
+    failed = []
+    with app.app_context():
+        db.create_all()
+        _seed(args.seed_files, args.seed_folders, args.seed_tags)
+
+        for name, scans, lines, allow_scan in check_plans(app):
+            if scans and not allow_scan:
+                status = "FAIL"
+                failed.append(name)
+            else:
+                status = "ok  " if not scans else "skip"
+            print(f"[{status}] {name}" + (f"  全表扫描: {', '.join(scans)}" if scans else ""))
+            if args.verbose or (scans and not allow_scan):
+                for line in lines:
+                    print(f"         {line}")
+
+    if failed:
+        print(f"\n{len(failed)} 条查询出现全表扫描：{', '.join(failed)}")
+        sys.exit(1)
+    print("\n所有知识库查询都走了索引")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,374 @@
+# benchmarks/fake_servers.py
+"""
+本地假的 OnlyOffice Document Server 和 S3（MinIO），用于在没有真实服务的环境里测试 / 压测
+回调保存、代理下载、缩略图、命令服务这几条 I/O 链路。只用标准库。
+
+启动假服务（前台运行，Ctrl+C 退出）：
+    python -m benchmarks.fake_servers serve --s3-port 9100 --ds-port 8100
+
+然后让后端指向它们：
+    MINIO_ENDPOINT=127.0.0.1:9100 \\
+    ONLYOFFICE_CONVERT_URL=http://127.0.0.1:8100/ConvertService.ashx \\
+    DOCUMENT_SERVER_COMMAND_URL=http://127.0.0.1:8100/coauthoring/CommandService.ashx \\
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+模拟 OnlyOffice 并发保存（每个回调都让后端从假 Document Server 下载 --size 字节再写进假 S3）：
+    python -m benchmarks.fake_servers saves --app-url http://127.0.0.1:5000 --doc-id 1 \\
+        --ds-url http://127.0.0.1:8100 -n 200 -c 100 --size 20000000
+
+假 Document Server：
+  GET  /cache/files/<name>?size=N&delay=毫秒&chunked=1   N 字节的文件（按块慢慢吐，可模拟慢网络）
+  GET  /cache/files/thumb.png                           1x1 PNG
+  POST /ConvertService.ashx                             直接返回转换完成，fileUrl 指向 thumb.png
+  POST /coauthoring/CommandService.ashx                 info / forcesave / drop，支持 key 为数组；
+                                                        open_keys 不为 None 时只有其中的 key 算“正在编辑”（其余返回 error 1），
+                                                        command_delay 秒后才回复
+假 S3：bucket 存在性 / location、PUT / GET / HEAD / DELETE 对象、分片上传，数据放内存里。
+"""
+import argparse
+import base64
+import http.client
+import json
+import sys
+import threading
+import time
+import uuid
+from email.utils import formatdate
+from hashlib import md5
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+# 1x1 透明 PNG
+PNG_1X1 = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+)
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            parts = []
+            while True:
+                size = int(self.rfile.readline().split(b";")[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                parts.append(self.rfile.read(size))
+                self.rfile.readline()
+            return b"".join(parts)
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "application/xml", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+
+
+# ================= 假 S3 =================
+
+class FakeS3Handler(_QuietHandler):
+    objects: dict = {}
+    uploads: dict = {}
+    lock = threading.Lock()
+
+    def _split(self):
+        url = urlsplit(self.path)
+        parts = unquote(url.path).lstrip("/").split("/", 1)
+        bucket = parts[0]
+        key = parts[1] if len(parts) > 1 else ""
+        return bucket, key, parse_qs(url.query, keep_blank_values=True)
+
+    def _error(self, status: int, code: str, bucket: str, key: str = ""):
+        body = (
+            f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Error><Code>{code}</Code><Message>{code}</Message>"
+            f"<BucketName>{bucket}</BucketName><Key>{key}</Key><Resource>/{bucket}/{key}</Resource>"
+            f"<RequestId>fake</RequestId><HostId>fake</HostId></Error>"
+        ).encode()
+        self._send(status, body)
+
+    def do_HEAD(self):
+        bucket, key, _ = self._split()
+        if not key:
+            return self._send(200)
+        obj = self.objects.get((bucket, key))
+        if obj is None:
+            return self._error(404, "NoSuchKey", bucket, key)
+        data, content_type, etag, mtime = obj
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", f'"{etag}"')
+        self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+        self.end_headers()
+
+    def do_GET(self):
+        bucket, key, query = self._split()
+        if not key:
+            if "location" in query:
+                return self._send(200, b'<?xml version="1.0" encoding="UTF-8"?>'
+                                       b'<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/">'
+                                       b'</LocationConstraint>')
+            return self._send(200, b'<?xml version="1.0" encoding="UTF-8"?><ListBucketResult></ListBucketResult>')
+        obj = self.objects.get((bucket, key))
+        if obj is None:
+            return self._error(404, "NoSuchKey", bucket, key)
+        data, content_type, etag, mtime = obj
+        self._send(200, data, content_type, {"ETag": f'"{etag}"', "Last-Modified": formatdate(mtime, usegmt=True)})
+
+    def do_PUT(self):
+        bucket, key, query = self._split()
+        body = self._read_body()
+        if not key:
+            return self._send(200)
+        etag = md5(body).hexdigest()
+        if "uploadId" in query:
+            upload_id = query["uploadId"][0]
+            with self.lock:
+                parts = self.uploads.get(upload_id)
+                if parts is None:
+                    return self._error(404, "NoSuchUpload", bucket, key)
+                parts[int(query["partNumber"][0])] = body
+        else:
+            content_type = self.headers.get("Content-Type") or "application/octet-stream"
+            with self.lock:
+                self.objects[(bucket, key)] = (body, content_type, etag, time.time())
+        self._send(200, headers={"ETag": f'"{etag}"'})
+
+    def do_POST(self):
+        bucket, key, query = self._split()
+        self._read_body()
+        if "uploads" in query:
+            upload_id = uuid.uuid4().hex
+            with self.lock:
+                self.uploads[upload_id] = {"content_type": self.headers.get("Content-Type")}
+            body = (
+                f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><InitiateMultipartUploadResult>"
+                f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                f"</InitiateMultipartUploadResult>"
+            ).encode()
+            return self._send(200, body)
+        if "uploadId" in query:
+            with self.lock:
+                parts = self.uploads.pop(query["uploadId"][0], None)
+            if parts is None:
+                return self._error(404, "NoSuchUpload", bucket, key)
+            content_type = parts.pop("content_type") or "application/octet-stream"
+            data = b"".join(parts[n] for n in sorted(parts))
+            etag = md5(data).hexdigest() + f"-{len(parts)}"
+            with self.lock:
+                self.objects[(bucket, key)] = (data, content_type, etag, time.time())
+            body = (
+                f"<?xml version=\"1.0\" encoding=\"UTF-8\"?><CompleteMultipartUploadResult>"
+                f"<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>\"{etag}\"</ETag>"
+                f"</CompleteMultipartUploadResult>"
+            ).encode()
+            return self._send(200, body)
+        self._error(400, "InvalidRequest", bucket, key)
+
+    def do_DELETE(self):
+        bucket, key, query = self._split()
+        with self.lock:
+            if "uploadId" in query:
+                self.uploads.pop(query["uploadId"][0], None)
+            else:
+                self.objects.pop((bucket, key), None)
+        self._send(204)
+
+
+# ================= 假 Document Server =================
+
+class FakeDocumentServerHandler(_QuietHandler):
+    # 命令服务收到的请求，测试里可以检查
+    commands: list = []
+    # 正在编辑的 key；None 表示任何 key 都在编辑中
+    open_keys = None
+    # 命令服务每个请求先停顿这么多秒再回复（测试请求超时）
+    command_delay = 0.0
+    lock = threading.Lock()
+
+    def _command_error(self, key) -> int:
+        return 0 if self.open_keys is None or key in self.open_keys else 1
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/cache/files/thumb.png":
+            return self._send(200, PNG_1X1, "image/png")
+        if not url.path.startswith("/cache/files/"):
+            return self._send(404, b"not found", "text/plain")
+
+        query = parse_qs(url.query)
+        size = int(query.get("size", ["1048576"])[0])
+        delay = float(query.get("delay", ["0"])[0]) / 1000
+        chunked = query.get("chunked", ["0"])[0] == "1"
+        chunk = b"x" * 65536
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/octet-stream")
+        if chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            self.send_header("Content-Length", str(size))
+        self.end_headers()
+
+        remaining = size
+        while remaining > 0:
+            piece = chunk[:min(remaining, len(chunk))]
+            if chunked:
+                self.wfile.write(f"{len(piece):x}\r\n".encode() + piece + b"\r\n")
+            else:
+                self.wfile.write(piece)
+            remaining -= len(piece)
+            if delay:
+                time.sleep(delay)
+        if chunked:
+            self.wfile.write(b"0\r\n\r\n")
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        try:
+            payload = json.loads(self._read_body() or b"{}")
+        except ValueError:
+            payload = {}
+
+        if url.path.endswith("/ConvertService.ashx"):
+            host = self.headers.get("Host") or f"127.0.0.1:{self.server.server_port}"
+            body = {"endConvert": True, "percent": 100, "fileUrl": f"http://{host}/cache/files/thumb.png"}
+            return self._send(200, json.dumps(body).encode(), "application/json")
+
+        if url.path.endswith("/CommandService.ashx"):
+            with self.lock:
+                self.commands.append(payload)
+            if self.command_delay:
+                time.sleep(self.command_delay)
+            keys = payload.get("key")
+            if isinstance(keys, list):
+                body = {"error": 0, "keys": [{"key": k, "error": self._command_error(k)} for k in keys]}
+            else:
+                body = {"error": self._command_error(keys), "key": keys}
+                if payload.get("c") == "info":
+                    body["users"] = []
+            return self._send(200, json.dumps(body).encode(), "application/json")
+
+        self._send(404, b"not found", "text/plain")
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 客户端超时先断开属于预期情况，不打印堆栈
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def start(handler, port: int = 0) -> ThreadingHTTPServer:
+    """后台线程启动一个假服务，port=0 时随机端口（server.server_port 取实际端口）"""
+    server = _Server(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# ================= 并发保存模拟 =================
+
+def simulate_saves(app_url: str, doc_id: int, ds_url: str, total: int, concurrency: int,
+                   size: int, delay_ms: float = 0) -> dict:
+    """像 OnlyOffice 一样并发 POST 回调（status=2），统计耗时和失败数"""
+    target = urlsplit(app_url.rstrip("/") + f"/api/onlyoffice/callback/{doc_id}")
+    download_url = f"{ds_url.rstrip('/')}/cache/files/doc.bin?size={size}&delay={delay_ms}"
+    body = json.dumps({"key": f"{doc_id}-fake", "status": 2, "url": download_url, "users": []}).encode()
+
+    latencies, errors = [], [0]
+    counter = iter(range(total))
+    lock = threading.Lock()
+
+    def worker():
+        conn = http.client.HTTPConnection(target.hostname, target.port, timeout=300)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            start_at = time.perf_counter()
+            try:
+                conn.request("POST", target.path, body=body, headers={"Content-Type": "application/json"})
+                resp = conn.getresponse()
+                result = json.loads(resp.read() or b"{}")
+                ok = resp.status == 200 and result.get("error") == 0
+            except (OSError, http.client.HTTPException, ValueError):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(target.hostname, target.port, timeout=300)
+            with lock:
+                if ok:
+                    latencies.append(time.perf_counter() - start_at)
+                else:
+                    errors[0] += 1
+        conn.close()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "saves": len(latencies),
+        "errors": errors[0],
+        "seconds": round(elapsed, 2),
+        "saves_per_sec": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "mb_per_sec": round(len(latencies) * size / elapsed / 1e6, 1) if elapsed else None,
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 1) if latencies else None,
+        "max_ms": round(latencies[-1] * 1000, 1) if latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    serve = sub.add_parser("serve", help="启动假 S3 + 假 Document Server")
+    serve.add_argument("--s3-port", type=int, default=9100)
+    serve.add_argument("--ds-port", type=int, default=8100)
+
+    saves = sub.add_parser("saves", help="模拟 OnlyOffice 并发保存回调")
+    saves.add_argument("--app-url", default="http://127.0.0.1:5000")
+    saves.add_argument("--ds-url", default="http://127.0.0.1:8100")
+    saves.add_argument("--doc-id", type=int, required=True)
+    saves.add_argument("-n", "--total", type=int, default=100)
+    saves.add_argument("-c", "--concurrency", type=int, default=50)
+    saves.add_argument("--size", type=int, default=5_000_000, help="每次保存的文件字节数")
+    saves.add_argument("--delay-ms", type=float, default=0, help="假 Document Server 每 64KB 停顿毫秒数")
+
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        s3 = start(FakeS3Handler, args.s3_port)
+        ds = start(FakeDocumentServerHandler, args.ds_port)
+        print(f"fake S3:              http://127.0.0.1:{s3.server_port}")
+        print(f"fake Document Server: http://127.0.0.1:{ds.server_port}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+    else:
+        print(json.dumps(simulate_saves(
+            args.app_url, args.doc_id, args.ds_url, args.total, args.concurrency, args.size, args.delay_ms
+        ), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/load_test.py
+"""
+简单压测：多线程 keep-alive 连接，统计 requests/sec 和延迟分位数
+
+    gunicorn -c gunicorn.conf.py wsgi:app &
+    python -m benchmarks.load_test --base-url http://127.0.0.1:5000 --folder-id 1 -c 64 -d 20
+
+默认压两个接口：/healthz（框架 + worker 本身的开销）、/api/kb/files?folder_id=N（带 DB 查询）。
+只用标准库，压测机上不需要装项目依赖。
+"""
+import argparse
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def _worker(base, path, headers, deadline, latencies, errors, lock):
+    conn = None
+    local_lat, local_err = [], 0
+    while time.perf_counter() < deadline:
+        if conn is None:
+            cls = http.client.HTTPSConnection if base.scheme == "https" else http.client.HTTPConnection
+            conn = cls(base.hostname, base.port, timeout=30)
+        start = time.perf_counter()
+        try:
+            conn.request("GET", path, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            if resp.status >= 400:
+                local_err += 1
+            else:
+                local_lat.append(time.perf_counter() - start)
+            if resp.getheader("Connection", "").lower() == "close":
+                conn.close()
+                conn = None
+        except (OSError, http.client.HTTPException):
+            local_err += 1
+            if conn is not None:
+                conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+    with lock:
+        latencies.extend(local_lat)
+        errors[0] += local_err
+
+
+def run(base_url: str, path: str, concurrency: int, duration: float, headers: dict) -> dict:
+    base = urlsplit(base_url)
+    prefix = base.path.rstrip("/")
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    threads = [
+        threading.Thread(target=_worker, args=(base, prefix + path, headers, deadline, latencies, errors, lock))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    result = {"path": path, "requests": len(latencies), "errors": errors[0], "rps": len(latencies) / elapsed}
+    if latencies:
+        q = statistics.quantiles(latencies, n=100)
+        result.update(p50=q[49] * 1000, p95=q[94] * 1000, p99=q[98] * 1000)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base-url", default="http://127.0.0.1:5000")
+    parser.add_argument("--folder-id", type=int, default=1)
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="每个接口压测秒数")
+    parser.add_argument("--cookie", default="", help="需要登录的接口带上的 Cookie 头")
+    parser.add_argument("--path", action="append", help="自定义接口（可多次），默认 healthz + 知识库文件列表")
+    args = parser.parse_args()
+
+    headers = {"Connection": "keep-alive"}
+    if args.cookie:
+        headers["Cookie"] = args.cookie
+    paths = args.path or ["/healthz", f"/api/kb/files?folder_id={args.folder_id}"]
+
+    print(f"{'path':<40} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for path in paths:
+        r = run(args.base_url, path, args.concurrency, args.duration, headers)
+        print(f"{r['path']:<40} {r['rps']:>10.1f} {r.get('p50', 0):>8.1f} "
+              f"{r.get('p95', 0):>8.1f} {r.get('p99', 0):>8.1f} {r['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,8 @@
 # create_super_admin.py
 from app import create_app
 from app.extensions import db
-from app.models import User
+from app.models import User, Role, UserRole
+from app.models.role import SUPER_ADMIN_ROLE
 
 """
 使用方式：
@@ -24,9 +25,19 @@ def main():
         password = "admin123"          # 你可以改成更安全的
         email = "admin@example.com"
 
+        # 超级管理员角色：可以看到全部菜单
+        role = Role.query.filter_by(code=SUPER_ADMIN_ROLE).first()
+        if not role:
+            role = Role(code=SUPER_ADMIN_ROLE, name="超级管理员")
+            db.session.add(role)
+            db.session.commit()
+
         # 已存在就不重复创建
         user = User.query.filter_by(username=username).first()
         if user:
+            if not UserRole.query.filter_by(user_id=user.id, role_id=role.id).first():
+                db.session.add(UserRole(user_id=user.id, role_id=role.id))
+                db.session.commit()
             print(f"用户 {username} 已存在，跳过创建。")
             print(f"可以用账号：{username}，原来的密码登录（如果记得的话）。")
             return
@@ -39,6 +50,8 @@ def main():
         )
         user.set_password(password)
         db.session.add(user)
+        db.session.flush()
+        db.session.add(UserRole(user_id=user.id, role_id=role.id))
         db.session.commit()
 
         print("超级管理员创建成功！")
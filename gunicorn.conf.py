@@ -0,0 +1,86 @@
+# backend/gunicorn.conf.py
+"""
+生产启动：gunicorn -c gunicorn.conf.py wsgi:app
+
+worker 数 / 线程数等都从环境变量读取：
+  WEB_CONCURRENCY         worker 进程数，默认 CPU 核数 * 2 + 1（gevent 下默认 CPU 核数）
+  GUNICORN_WORKER_CLASS   gthread（默认）/ gevent
+  GUNICORN_THREADS        gthread 每个 worker 的线程数，默认 8
+  GUNICORN_CONNECTIONS    gevent 每个 worker 的最大并发连接数，默认 1000
+                          （代理流并发上限 PROXY_STREAM_MAX_CONCURRENCY 默认按这两项推算，见 app/config.py）
+  GUNICORN_BIND           默认 0.0.0.0:5000
+  GUNICORN_TIMEOUT        默认 120（OnlyOffice 回调 / 大文件代理可能比较慢）
+  GUNICORN_GRACEFUL_TIMEOUT  收到 TERM 后等待在途请求的秒数，默认 30
+  GUNICORN_MAX_REQUESTS   每个 worker 处理多少请求后重启（防内存缓慢增长），默认 0 不重启
+
+preload_app：master 里只导入一次应用（省内存、启动快），worker fork 后在 post_fork
+里丢弃继承来的 DB / Redis / MinIO 连接；worker 退出前等后台任务跑完再关连接池。
+
+gevent：OnlyOffice 回调 / 文件代理这类长时间等 I/O 的请求多时使用。requests、minio（urllib3）、
+pymysql、redis-py 都是纯 Python socket，打补丁后等待网络时自动让出，
+几个 worker 就能同时挂住上千个下载 / 保存。因为 preload_app 会在 master 里导入应用，
+必须在这里（导入应用之前）就打补丁。
+
+/metrics：多 worker 时每个 worker 只有自己的计数，设置 PROMETHEUS_MULTIPROC_DIR（空目录）后
+prometheus_client 把各 worker 的数据写到该目录下汇总输出；master 启动时清空目录。
+"""
+import multiprocessing
+import os
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+if worker_class == "gevent":
+    from gevent import monkey
+
+    monkey.patch_all()
+
+_cpus = multiprocessing.cpu_count()
+workers = int(os.environ.get("WEB_CONCURRENCY", _cpus if worker_class == "gevent" else _cpus * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+worker_connections = int(os.environ.get("GUNICORN_CONNECTIONS", 1000))
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+backlog = 2048
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+preload_app = True
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    from wsgi import app
+    from app.extensions import reset_after_fork
+
+    reset_after_fork(app)
+    server.log.info("worker %s: connections reset after fork", worker.pid)
+
+
+def worker_exit(server, worker):
+    from wsgi import app
+    from app.extensions import shutdown_extensions
+
+    shutdown_extensions(app)
+    server.log.info("worker %s: background tasks drained, pools closed", worker.pid)
+
+
+def on_starting(server):
+    multiproc_dir = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            if name.endswith(".db"):
+                os.remove(os.path.join(multiproc_dir, name))
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,4 @@
+-- 用户列表：状态过滤 + keyset 分页、姓名前缀搜索
+-- 新库用 init_db.py（db.create_all）会自动建好，这里给已有库手动执行
+CREATE INDEX ix_t_user_status_id ON t_user (status, id);
+CREATE INDEX ix_t_user_fullname ON t_user (user_fullname);
@@ -0,0 +1,6 @@
+-- 目录统计（含子孙目录）：文件数、总字节数、最近文件时间
+-- 新库用 init_db.py（db.create_all）会自动建好，这里给已有库手动执行；
+-- 执行后运行一次 flask --app manage.py kb-recompute-stats 填充历史数据
+ALTER TABLE t_kb_folder ADD COLUMN file_count BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE t_kb_folder ADD COLUMN total_bytes BIGINT NOT NULL DEFAULT 0;
+ALTER TABLE t_kb_folder ADD COLUMN last_file_at DATETIME NULL;
@@ -0,0 +1,17 @@
+-- 知识库查询的复合索引（is_deleted 紧跟等值条件列，排序列放最后，避免 filesort）
+-- 新库用 init_db.py（db.create_all）会自动建好，这里给已有库手动执行；
+-- 执行后可用 python -m benchmarks.check_kb_query_plans 检查执行计划
+CREATE INDEX ix_t_kb_folder_deleted_sort ON t_kb_folder (is_deleted, sort_order, id);
+CREATE INDEX ix_t_kb_folder_parent_deleted_sort ON t_kb_folder (parent_id, is_deleted, sort_order, id);
+
+CREATE INDEX ix_t_kb_file_folder_deleted_updated ON t_kb_file (folder_id, is_deleted, updated_at, id);
+CREATE INDEX ix_t_kb_file_folder_deleted_name ON t_kb_file (folder_id, is_deleted, name, id);
+CREATE INDEX ix_t_kb_file_folder_deleted_type ON t_kb_file (folder_id, is_deleted, file_type, id);
+CREATE INDEX ix_t_kb_file_deleted_updated ON t_kb_file (is_deleted, updated_at, id);
+CREATE INDEX ix_t_kb_file_document_deleted ON t_kb_file (document_id, is_deleted);
+
+CREATE INDEX ix_t_kb_file_tag_tag_file ON t_kb_file_tag (tag_id, file_id);
+
+-- folder_id / parent_id 上原有的外键单列索引被上面的复合索引覆盖，确认后可删除：
+-- ALTER TABLE t_kb_file DROP INDEX folder_id;
+-- ALTER TABLE t_kb_folder DROP INDEX parent_id;
@@ -0,0 +1,3 @@
+-- t_documents 按 object key 反查的索引（清单导入按 bucket + object_key 去重，没有索引时每批都全表扫描）
+-- 新库用 init_db.py（db.create_all）会自动建好，这里给已有库手动执行
+CREATE INDEX ix_t_documents_bucket_object_key ON t_documents (bucket, object_key);
@@ -0,0 +1,254 @@
+# tests/conftest.py
+"""
+测试环境：临时 SQLite 库、不连 Redis / MinIO / OnlyOffice。
+配置在导入 app 时从环境变量读取，所以要在这里（收集测试模块之前）先设置好。
+"""
+import fnmatch
+import os
+import tempfile
+import time
+
+import pytest
+
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["REDIS_HOST"] = "127.0.0.1"
+os.environ["REDIS_PORT"] = "1"
+os.environ["CACHE_PUBSUB_ENABLED"] = "false"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["MINIO_REGION"] = "us-east-1"
+os.environ.pop("DATABASE_REPLICA_URL", None)
+
+BUCKET = "files"
+
+
+@pytest.fixture(scope="session")
+def app():
+    from app import create_app
+
+    app = create_app("dev")
+    app.config["TESTING"] = True
+    app.logger.setLevel("ERROR")
+    return app
+
+
+@pytest.fixture
+def app_context(app, monkeypatch):
+    """
+    每个测试一个干净的库和应用上下文。
+    默认没有 Redis（get_redis() 返回 None，走各处的降级逻辑）；需要 Redis 的测试自己换成桩
+    """
+    from app import extensions
+    from app.extensions import db
+    from app.utils import cache, redis_pool
+
+    monkeypatch.setattr(extensions, "redis_client", None)
+    redis_pool.breaker.reset()
+    cache.clear_local()
+    cache._pending_tags.clear()
+    cache._pending_keys.clear()
+    monkeypatch.setattr(cache, "_pending_all", False)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture(scope="session")
+def s3_server():
+    from benchmarks import fake_servers
+
+    server = fake_servers.start(fake_servers.FakeS3Handler)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def storage(app_context, s3_server, monkeypatch):
+    """MinIO 指向进程内的假 S3，每个测试清空对象"""
+    from app.utils import minio_storage
+    from benchmarks import fake_servers
+
+    monkeypatch.setitem(app_context.config, "MINIO_ENDPOINT", f"127.0.0.1:{s3_server.server_port}")
+    monkeypatch.setitem(app_context.config, "MINIO_SECURE", False)
+    monkeypatch.setitem(app_context.config, "MINIO_BUCKET", BUCKET)
+    monkeypatch.setitem(app_context.config, "MINIO_INTERNAL_ENDPOINT", "")
+    fake_servers.FakeS3Handler.objects.clear()
+    fake_servers.FakeS3Handler.uploads.clear()
+    minio_storage.reset_minio_client()
+    yield
+    minio_storage.reset_minio_client()
+
+
+class FakeRedis:
+    """
+    够缓存 / 限流 / 吊销列表用的内存版 Redis（decode_responses 风格，字符串进字符串出）；
+    down = True 时每个命令都抛 ConnectionError，模拟 Redis 挂掉。
+    Lua 脚本不执行：register_script 返回的对象按 script_responses 依次返回
+    """
+
+    def __init__(self):
+        self.data: dict = {}
+        self.expires: dict = {}
+        self.published: list = []
+        self.scripts: list = []
+        self.script_calls: list = []
+        self.script_responses: list = []
+        self.down = False
+
+    def _check(self):
+        if self.down:
+            from redis.exceptions import ConnectionError
+
+            raise ConnectionError("fake redis is down")
+
+    def _alive(self, key):
+        at = self.expires.get(key)
+        if at is not None and at <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def get(self, key):
+        self._check()
+        return self.data.get(key) if self._alive(key) else None
+
+    def mget(self, *keys):
+        return [self.get(k) for k in keys]
+
+    def incr(self, key, amount=1):
+        self._check()
+        value = int(self.data[key]) + amount if self._alive(key) else amount
+        self.data[key] = str(value)
+        return value
+
+    def set(self, key, value, ex=None, px=None, nx=False):
+        self._check()
+        if nx and self._alive(key):
+            return None
+        self.data[key] = value
+        self.expires.pop(key, None)
+        if ex or px:
+            self.expire(key, ex if ex else px / 1000)
+        return True
+
+    def delete(self, *keys):
+        self._check()
+        removed = sum(1 for k in keys if self._alive(k))
+        for k in keys:
+            self.data.pop(k, None)
+            self.expires.pop(k, None)
+        return removed
+
+    def expire(self, key, seconds):
+        self._check()
+        if not self._alive(key):
+            return False
+        self.expires[key] = time.monotonic() + seconds
+        return True
+
+    def sadd(self, key, *members):
+        self._check()
+        if not self._alive(key):
+            self.data[key] = set()
+        current = self.data[key]
+        before = len(current)
+        current.update(members)
+        return len(current) - before
+
+    def smembers(self, key):
+        self._check()
+        return set(self.data[key]) if self._alive(key) else set()
+
+    def setex(self, key, seconds, value):
+        return self.set(key, str(value), ex=seconds)
+
+    def exists(self, *keys):
+        self._check()
+        return sum(1 for k in keys if self._alive(k))
+
+    # ---- 流：只实现吊销列表用到的 XADD（MINID 裁剪）/ XRANGE / XREAD ----
+
+    def xadd(self, name, fields, minid=None, approximate=True):
+        self._check()
+        entries = self.data.setdefault(name, [])
+        ms = int(time.time() * 1000)
+        last_ms, last_seq = map(int, entries[-1][0].split("-")) if entries else (0, -1)
+        entry_id = f"{ms}-0" if ms > last_ms else f"{last_ms}-{last_seq + 1}"
+        entries.append((entry_id, {k: str(v) for k, v in fields.items()}))
+        if minid is not None:
+            floor = tuple(map(int, minid.split("-")))
+            entries[:] = [e for e in entries if tuple(map(int, e[0].split("-"))) >= floor]
+        return entry_id
+
+    def xrange(self, name):
+        self._check()
+        return list(self.data.get(name, []))
+
+    def xread(self, streams, count=None):
+        self._check()
+        result = []
+        for name, after in streams.items():
+            after = tuple(map(int, after.split("-")))
+            entries = [e for e in self.data.get(name, []) if tuple(map(int, e[0].split("-"))) > after]
+            if entries:
+                result.append((name, entries[:count]))
+        return result
+
+    def register_script(self, source):
+        self.scripts.append(source)
+        return FakeScript(self)
+
+    def publish(self, channel, message):
+        self._check()
+        self.published.append((channel, message))
+        return 0
+
+    def scan_iter(self, match="*", count=None):
+        self._check()
+        return iter([k for k in list(self.data) if self._alive(k) and fnmatch.fnmatchcase(k, match)])
+
+    def pipeline(self, transaction=True):
+        return _FakePipeline(self)
+
+
+class FakeScript:
+    """register_script 的桩：不执行 Lua，记录调用并按 client.script_responses 返回"""
+
+    def __init__(self, client):
+        self.client = client
+
+    def __call__(self, keys=(), args=(), client=None):
+        (client or self.client)._check()
+        self.client.script_calls.append((list(keys), list(args)))
+        response = self.client.script_responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+class _FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        self.client._check()
+        calls, self.calls = self.calls, []
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in calls]
+
+
+@pytest.fixture
+def fake_redis(app_context, monkeypatch):
+    """把 extensions.redis_client 换成内存桩"""
+    from app import extensions
+
+    client = FakeRedis()
+    monkeypatch.setattr(extensions, "redis_client", client)
+    return client
@@ -0,0 +1,16 @@
+# tests/test_bench_suite.py
+"""基准套件冒烟：小规模数据上每个基准项跑一轮，保证套件随代码改动仍能跑通（计时和基线对比仍由命令行负责）"""
+import random
+
+from benchmarks import bench_suite
+
+
+def test_every_benchmark_runs(storage, app_context):
+    bench_suite._seed(folders=60, files=1000, tags=10, seed=42)
+    fx = bench_suite._fixtures(random.Random(42))
+
+    results = bench_suite.run_benchmarks(app_context, fx, rounds=1, warmup=0)
+
+    names = [name for name, _, _, _ in bench_suite._benchmarks(app_context, fx)]
+    assert [b["name"] for b in results] == names
+    assert all(b["stats"]["rounds"] == 1 for b in results)
@@ -0,0 +1,39 @@
+# tests/test_blueprints.py
+"""register_blueprints(only=...) 按名字注册：只导入、只注册指定模块的蓝图"""
+import sys
+
+from flask import Flask
+
+from app.api import BLUEPRINTS, register_blueprints
+
+
+def _rules(app):
+    return {rule.rule for rule in app.url_map.iter_rules() if rule.endpoint != "static"}
+
+
+def test_only_registers_named_blueprints():
+    app = Flask(__name__)
+    register_blueprints(app, only={"menu"})
+
+    assert set(app.blueprints) == {"menu"}
+    rules = _rules(app)
+    assert rules
+    assert all(rule.startswith("/api/menus") for rule in rules)
+
+
+def test_only_does_not_import_other_modules():
+    others = [name for name, _ in BLUEPRINTS if name != "menu"]
+    for name in others:
+        sys.modules.pop(f"app.api.{name}", None)
+
+    register_blueprints(Flask(__name__), only={"menu"})
+
+    for name in others:
+        assert f"app.api.{name}" not in sys.modules
+
+
+def test_unknown_name_registers_nothing():
+    app = Flask(__name__)
+    register_blueprints(app, only={"no_such_module"})
+
+    assert app.blueprints == {}
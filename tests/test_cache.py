@@ -0,0 +1,119 @@
+# tests/test_cache.py
+"""两级缓存：本地 / Redis 命中、按标签失效，以及 Redis 不可用期间的失效在恢复后补做"""
+import json
+
+import pytest
+
+from app.utils import cache, redis_pool
+
+calls = []
+
+
+@cache.cached("test:profile", ttl=300, tags=lambda user_id: [f"user:{user_id}"])
+def load_profile(user_id):
+    calls.append(user_id)
+    return {"id": user_id, "version": len(calls)}
+
+
+@pytest.fixture(autouse=True)
+def _reset_calls():
+    calls.clear()
+
+
+def test_without_redis_uses_local_tier(app_context):
+    assert load_profile(1) == {"id": 1, "version": 1}
+    assert load_profile(1) == {"id": 1, "version": 1}
+    assert calls == [1]
+
+    cache.invalidate_tags("user:1")
+    assert load_profile(1) == {"id": 1, "version": 2}
+
+
+def test_redis_tier_is_shared_and_tagged(fake_redis):
+    load_profile(1)
+    assert "cache:test:profile:1" in fake_redis.data
+    assert fake_redis.smembers("cache:tag:user:1") == {"cache:test:profile:1"}
+
+    # 相当于另一个 worker：本地没有，从 Redis 读
+    cache.clear_local()
+    assert load_profile(1) == {"id": 1, "version": 1}
+    assert calls == [1]
+
+
+def test_invalidate_tags_deletes_redis_copies_and_publishes(fake_redis):
+    load_profile(1)
+    load_profile(2)
+
+    cache.invalidate_tags("user:1")
+
+    assert "cache:test:profile:1" not in fake_redis.data
+    assert "cache:test:profile:2" in fake_redis.data
+    assert json.loads(fake_redis.published[-1][1])["tags"] == ["user:1"]
+    assert load_profile(1)["version"] == 3
+
+
+def test_invalidate_after_commit_waits_for_commit(fake_redis):
+    from app.extensions import db
+
+    load_profile(1)
+    cache.invalidate_after_commit("user:1")
+    db.session.rollback()
+    assert "cache:test:profile:1" in fake_redis.data
+
+    cache.invalidate_after_commit("user:1")
+    db.session.commit()
+    assert "cache:test:profile:1" not in fake_redis.data
+
+
+def test_invalidation_while_breaker_open_is_replayed(fake_redis):
+    load_profile(1)
+
+    # 熔断期间改了资料：只清得了本地
+    for _ in range(redis_pool.breaker.failure_threshold):
+        redis_pool.breaker.record_failure()
+    cache.invalidate_tags("user:1")
+    assert "cache:test:profile:1" in fake_redis.data
+
+    # 恢复后第一次读：先补删 Redis 里的旧副本，不会读回 version 1
+    redis_pool.breaker.reset()
+    assert load_profile(1) == {"id": 1, "version": 2}
+    assert json.loads(fake_redis.published[0][1])["tags"] == ["user:1"]
+
+
+def test_invalidation_while_redis_errors_is_replayed(fake_redis):
+    load_profile(1)
+
+    fake_redis.down = True
+    cache.invalidate_tags("user:1")
+    fake_redis.down = False
+
+    cache.clear_local()
+    assert load_profile(1)["version"] == 2
+
+
+def test_per_key_invalidation_is_replayed(fake_redis):
+    load_profile(1)
+
+    fake_redis.down = True
+    load_profile.invalidate(1)
+    fake_redis.down = False
+
+    cache.invalidate_tags("unrelated")
+    assert "cache:test:profile:1" not in fake_redis.data
+
+
+def test_too_many_pending_invalidations_clear_everything(app_context, fake_redis, monkeypatch):
+    monkeypatch.setitem(app_context.config, "CACHE_PENDING_MAX", 2)
+    load_profile(1)
+    load_profile(2)
+
+    fake_redis.down = True
+    cache.invalidate_tags("a", "b", "c")
+    fake_redis.down = False
+
+    cache.clear_local()
+    load_profile(9)
+    assert not any(k.startswith("cache:test:profile:1") for k in fake_redis.data)
+    assert not any(k.startswith("cache:test:profile:2") for k in fake_redis.data)
+    assert json.loads(fake_redis.published[0][1])["clear"] is True
+
@@ -0,0 +1,181 @@
+# tests/test_fake_servers.py
+"""用进程内的假 S3 / 假 Document Server 测 MinIO 读写、OnlyOffice 回调保存和命令服务"""
+import io
+import os
+
+import jwt as pyjwt
+import pytest
+import requests
+
+from app.exceptions.exceptions import CustomAPIException
+from app.extensions import db
+from app.models.document import Document, DocumentStatus
+from app.services import onlyoffice_service
+from app.utils import minio_storage
+from benchmarks import fake_servers
+
+# 与 conftest 里 storage 夹具设置的 MINIO_BUCKET 一致
+BUCKET = "files"
+
+
+@pytest.fixture(scope="module")
+def ds_server():
+    server = fake_servers.start(fake_servers.FakeDocumentServerHandler)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def document_server(app_context, ds_server, monkeypatch):
+    """命令服务指向假 Document Server，每个测试清空命令记录"""
+    base = f"http://127.0.0.1:{ds_server.server_port}"
+    monkeypatch.setitem(app_context.config, "DOCUMENT_SERVER_COMMAND_URL", f"{base}/coauthoring/CommandService.ashx")
+    monkeypatch.setitem(app_context.config, "ONLYOFFICE_VERIFY_INBOX", False)
+    handler = fake_servers.FakeDocumentServerHandler
+    handler.commands.clear()
+    monkeypatch.setattr(handler, "open_keys", None)
+    monkeypatch.setattr(handler, "command_delay", 0.0)
+    return base
+
+
+def _document(size=3, key="docs/报告.docx") -> Document:
+    doc = Document(
+        file_name="报告.docx", bucket=BUCKET, object_key=key, size=size,
+        content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+        status=DocumentStatus.COMPLETED,
+    )
+    db.session.add(doc)
+    db.session.commit()
+    return doc
+
+
+# ========== MinIO ==========
+
+def test_presigned_upload_and_download(storage):
+    key = "a/方案 v1.pdf"
+    upload_url = minio_storage.generate_presigned_upload_url(BUCKET, key, 60, None)
+    assert "X-Amz-Signature=" in upload_url
+
+    resp = requests.put(upload_url, data=b"hello", headers={"Content-Type": "application/pdf"}, timeout=5)
+    assert resp.status_code == 200
+
+    stat = minio_storage.stat_object(BUCKET, key)
+    assert stat.size == 5
+    assert stat.content_type == "application/pdf"
+
+    download_url = minio_storage.generate_presigned_download_url(BUCKET, key, 60, "方案.pdf", None)
+    assert "response-content-disposition=" in download_url
+    assert requests.get(download_url, timeout=5).content == b"hello"
+
+
+def test_stat_missing_object_returns_none(storage):
+    assert minio_storage.stat_object(BUCKET, "missing.pdf") is None
+
+
+def test_upload_stream_unknown_length_uses_multipart(storage):
+    data = os.urandom(6 * 1024 * 1024)
+    minio_storage.upload_stream(BUCKET, "big.bin", io.BytesIO(data), length=-1, part_size=5 * 1024 * 1024)
+
+    stat = minio_storage.stat_object(BUCKET, "big.bin")
+    assert stat.size == len(data)
+    assert stat.etag.endswith("-2")
+    assert b"".join(minio_storage.iter_object(BUCKET, "big.bin", chunk_size=1 << 20)) == data
+
+
+def test_get_object_bytes_respects_max_bytes(storage):
+    minio_storage.upload_stream(BUCKET, "small.bin", io.BytesIO(b"x" * 100), length=100)
+    assert minio_storage.get_object_bytes(BUCKET, "small.bin", max_bytes=100) == b"x" * 100
+    with pytest.raises(RuntimeError):
+        minio_storage.get_object_bytes(BUCKET, "small.bin", max_bytes=99)
+
+
+# ========== 回调保存 ==========
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_callback_streams_saved_file_into_storage(app_context, storage, document_server, chunked):
+    doc = _document()
+    url = f"{document_server}/cache/files/doc.bin?size=300000&chunked={int(chunked)}"
+
+    resp = app_context.test_client().post(
+        f"/api/onlyoffice/callback/{doc.id}", json={"key": "k", "status": 2, "url": url, "users": []}
+    )
+
+    assert resp.status_code == 200
+    assert resp.get_json() == {"error": 0}
+    assert minio_storage.stat_object(BUCKET, doc.object_key).size == 300000
+    db.session.refresh(doc)
+    assert doc.size == 300000
+
+
+def test_callback_download_failure_keeps_document(app_context, storage, document_server):
+    doc = _document(size=3)
+    minio_storage.upload_stream(BUCKET, doc.object_key, io.BytesIO(b"old"), length=3)
+
+    resp = app_context.test_client().post(
+        f"/api/onlyoffice/callback/{doc.id}", json={"key": "k", "status": 2, "url": f"{document_server}/missing"}
+    )
+
+    assert resp.get_json()["error"] == 1
+    assert minio_storage.get_object_bytes(BUCKET, doc.object_key) == b"old"
+    db.session.refresh(doc)
+    assert doc.size == 3
+
+
+def test_callback_without_save_status_does_nothing(app_context, storage, document_server):
+    doc = _document()
+    resp = app_context.test_client().post(f"/api/onlyoffice/callback/{doc.id}", json={"key": "k", "status": 1})
+    assert resp.get_json() == {"error": 0}
+    assert minio_storage.stat_object(BUCKET, doc.object_key) is None
+
+
+# ========== 命令服务 ==========
+
+def test_run_commands_fans_out_one_signed_request_per_key(app_context, document_server, monkeypatch):
+    monkeypatch.setattr(fake_servers.FakeDocumentServerHandler, "open_keys", {"k1"})
+
+    results = onlyoffice_service.run_commands("forcesave", ["k1", "k2", "k3"], userdata="7")
+
+    assert {k: r["error"] for k, r in results.items()} == {"k1": 0, "k2": 1, "k3": 1}
+    commands = fake_servers.FakeDocumentServerHandler.commands
+    assert sorted(c["key"] for c in commands) == ["k1", "k2", "k3"]
+    secret = app_context.config["ONLYOFFICE_JWT_SECRET"]
+    for command in commands:
+        claims = pyjwt.decode(command["token"], secret, algorithms=["HS256"])
+        assert claims == {"c": "forcesave", "key": command["key"], "userdata": "7"}
+
+
+def test_run_commands_timeout_marks_key_failed(app_context, document_server, monkeypatch):
+    monkeypatch.setattr(fake_servers.FakeDocumentServerHandler, "command_delay", 1.0)
+    monkeypatch.setitem(app_context.config, "ONLYOFFICE_COMMAND_TIMEOUT", 0.2)
+
+    results = onlyoffice_service.run_commands("info", ["k1", "k2"])
+
+    assert all(r["error"] == -1 for r in results.values())
+    assert all("命令服务请求失败" in r["message"] for r in results.values())
+
+
+def test_run_commands_http_error_marks_key_failed(app_context, document_server, monkeypatch):
+    monkeypatch.setitem(app_context.config, "DOCUMENT_SERVER_COMMAND_URL", f"{document_server}/nope")
+    assert onlyoffice_service.run_commands("info", ["k1"])["k1"]["error"] == -1
+
+
+def test_run_commands_without_url_is_503(app_context, document_server, monkeypatch):
+    monkeypatch.setitem(app_context.config, "DOCUMENT_SERVER_COMMAND_URL", "")
+    with pytest.raises(CustomAPIException) as exc:
+        onlyoffice_service.run_commands("info", ["k1"])
+    assert exc.value.status_code == 503
+
+
+def test_command_targets_resolve_document_ids(document_server):
+    doc = _document()
+    targets = onlyoffice_service._command_targets({"document_ids": [doc.id, str(doc.id)], "keys": ["raw"]})
+    assert targets == [(None, "raw"), (doc.id, onlyoffice_service._doc_key(doc))]
+
+
+@pytest.mark.parametrize("document_ids", [["abc"], [True], [1.5], [999]])
+def test_command_targets_reject_invalid_document_ids(document_server, document_ids):
+    _document()
+    with pytest.raises(CustomAPIException) as exc:
+        onlyoffice_service._command_targets({"document_ids": document_ids})
+    assert exc.value.status_code == 400
+
@@ -0,0 +1,10 @@
+# tests/test_import_time.py
+"""应用启动预算：子进程里导入 app 并 create_app，不能带上重依赖，也不能超出 benchmarks/check_import_time 的默认预算"""
+from benchmarks import check_import_time
+
+
+def test_startup_within_budget():
+    startup_ms, _, heavy = check_import_time.measure_startup("prod", repeat=3)
+
+    assert heavy == [], f"启动阶段导入了重依赖：{heavy}"
+    assert startup_ms <= check_import_time.DEFAULT_BUDGET_MS
@@ -0,0 +1,19 @@
+# tests/test_kb_query_plans.py
+"""知识库查询不出现全表扫描：在小规模 SQLite 数据上跑 benchmarks/check_kb_query_plans 的检查"""
+import pytest
+
+from benchmarks import check_kb_query_plans
+
+
+@pytest.fixture
+def seeded(app_context):
+    check_kb_query_plans._seed(files=2000, folders=60, tags=10)
+    return app_context
+
+
+def test_kb_queries_use_indexes(seeded):
+    plans = check_kb_query_plans.check_plans(seeded)
+
+    assert plans
+    failed = {name: lines for name, scans, lines, allow_scan in plans if scans and not allow_scan}
+    assert failed == {}
@@ -0,0 +1,71 @@
+# tests/test_login_errors.py
+"""登录路径的降级：哈希超时 / 进程池损坏返回 503，Redis 出错时登录限流只记一次日志"""
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from app.exceptions.exceptions import TooManyRequestsException
+from app.services import login_throttle_service
+from app.utils import password_hasher
+
+
+class _Pool:
+    """submit 返回一个已经带着异常的 Future"""
+
+    def __init__(self, error):
+        self.error = error
+        self.shut_down = False
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_exception(self.error)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def pool(app_context, monkeypatch):
+    def install(error):
+        fake = _Pool(error)
+        monkeypatch.setattr(password_hasher, "_pool", fake)
+        monkeypatch.setattr(password_hasher, "_get_pool", lambda: (password_hasher._pool, threading.BoundedSemaphore(1)))
+        return fake
+    return install
+
+
+@pytest.mark.parametrize("error", [TimeoutError(), BrokenProcessPool("worker died")])
+def test_hash_failures_become_503(pool, error):
+    pool(error)
+    with pytest.raises(TooManyRequestsException) as exc:
+        password_hasher.verify_password("scrypt:32768:8:1$salt$hash", "secret")
+    assert exc.value.status_code == 503
+
+
+def test_broken_pool_is_discarded(pool):
+    broken = pool(BrokenProcessPool("worker died"))
+    with pytest.raises(TooManyRequestsException):
+        password_hasher.hash_password("secret")
+    assert broken.shut_down
+    assert password_hasher._pool is None
+
+
+def test_throttle_logs_redis_errors_once(fake_redis, caplog, monkeypatch):
+    monkeypatch.setattr(login_throttle_service, "_redis_failing", False)
+    caplog.set_level("WARNING", logger="app")
+    fake_redis.down = True
+    for _ in range(3):
+        login_throttle_service.check_login_allowed("alice", "10.0.0.1")
+        login_throttle_service.record_login_failure("alice", "10.0.0.1")
+
+    warnings = [r for r in caplog.records if r.name == "app" and "LoginThrottle" in r.getMessage()]
+    assert len(warnings) == 1
+    assert warnings[0].exc_info
+
+    fake_redis.down = False
+    login_throttle_service.check_login_allowed("alice", "10.0.0.1")
+    assert "resumed" in caplog.records[-1].getMessage()
+    assert login_throttle_service._redis_failing is False
@@ -0,0 +1,143 @@
+# tests/test_rate_limit.py
+"""令牌桶限流（Redis Lua / 进程内退化）和代理流并发上限"""
+import pytest
+
+from app.exceptions.exceptions import TooManyRequestsException
+from app.utils import rate_limit
+from app.utils.rate_limit import _LocalBuckets
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def limits(app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, "RATE_LIMITS", {"test.limit": (2, 3)})
+    monkeypatch.setitem(app_context.config, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(rate_limit, "_script", None)
+    monkeypatch.setattr(rate_limit, "_local_buckets", _LocalBuckets())
+    return app_context
+
+
+# ========== 进程内令牌桶 ==========
+
+def test_local_bucket_allows_burst_then_reports_wait(clock):
+    buckets = _LocalBuckets()
+    assert [buckets.take("k", rate=2, burst=3) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("k", rate=2, burst=3) == pytest.approx(0.5)
+
+
+def test_local_bucket_refills_over_time_up_to_burst(clock):
+    buckets = _LocalBuckets()
+    for _ in range(3):
+        buckets.take("k", rate=2, burst=3)
+
+    clock.now += 0.5
+    assert buckets.take("k", rate=2, burst=3) == 0
+    assert buckets.take("k", rate=2, burst=3) > 0
+
+    clock.now += 60
+    assert [buckets.take("k", rate=2, burst=3) for _ in range(3)] == [0, 0, 0]
+    assert buckets.take("k", rate=2, burst=3) > 0
+
+
+def test_local_bucket_keeps_only_recent_keys(clock):
+    buckets = _LocalBuckets(max_size=2)
+    buckets.take("a", rate=1, burst=1)
+    buckets.take("b", rate=1, burst=1)
+    buckets.take("c", rate=1, burst=1)
+    # a 被淘汰，重新从满桶开始
+    assert buckets.take("a", rate=1, burst=1) == 0
+    assert buckets.take("c", rate=1, burst=1) > 0
+
+
+# ========== Redis 令牌桶（Lua 脚本用桩代替） ==========
+
+def test_redis_bucket_passes_key_and_limits_to_script(limits, fake_redis):
+    fake_redis.script_responses = [[1, "0"], [1, "0"]]
+    rate_limit.check_rate("test.limit", "user:7")
+    rate_limit.check_rate("test.limit", "user:7")
+
+    assert fake_redis.scripts == [rate_limit._TOKEN_BUCKET_LUA]
+    assert fake_redis.script_calls == [(["ratelimit:test.limit:user:7"], [2.0, 3.0, 1])] * 2
+
+
+def test_redis_bucket_rejection_sets_retry_after(limits, fake_redis):
+    fake_redis.script_responses = [[0, "1.25"]]
+    with pytest.raises(TooManyRequestsException) as exc:
+        rate_limit.check_rate("test.limit", "user:7")
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after == 2
+
+
+def test_redis_error_falls_back_to_local_bucket(limits, fake_redis, clock):
+    from redis.exceptions import ConnectionError
+
+    fake_redis.script_responses = [ConnectionError("down")] * 4
+    for _ in range(3):
+        rate_limit.check_rate("test.limit", "user:7")
+    with pytest.raises(TooManyRequestsException):
+        rate_limit.check_rate("test.limit", "user:7")
+
+
+def test_without_redis_uses_local_bucket(limits, clock):
+    for _ in range(3):
+        rate_limit.check_rate("test.limit", "ip:1.2.3.4")
+    with pytest.raises(TooManyRequestsException):
+        rate_limit.check_rate("test.limit", "ip:1.2.3.4")
+    # 别的维度不受影响
+    rate_limit.check_rate("test.limit", "ip:5.6.7.8")
+
+
+def test_unconfigured_or_disabled_limits_pass(limits, monkeypatch):
+    for _ in range(10):
+        rate_limit.check_rate("no.such.limit", "k")
+    monkeypatch.setitem(limits.config, "RATE_LIMIT_ENABLED", False)
+    for _ in range(10):
+        rate_limit.check_rate("test.limit", "k")
+
+
+# ========== 并发上限 ==========
+
+def test_concurrency_limit_holds_slot_until_response_closes(app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, "CONCURRENCY_LIMITS", {"test.stream": 1})
+    monkeypatch.setattr(rate_limit, "_semaphores", {})
+
+    @rate_limit.concurrency_limit("test.stream")
+    def stream():
+        return "body"
+
+    with app_context.test_request_context():
+        first = stream()
+        with pytest.raises(TooManyRequestsException) as exc:
+            stream()
+        assert exc.value.status_code == 503
+
+        first.close()
+        stream().close()
+
+
+def test_concurrency_limit_releases_slot_when_view_fails(app_context, monkeypatch):
+    monkeypatch.setitem(app_context.config, "CONCURRENCY_LIMITS", {"test.stream": 1})
+    monkeypatch.setattr(rate_limit, "_semaphores", {})
+
+    @rate_limit.concurrency_limit("test.stream")
+    def broken():
+        raise RuntimeError("boom")
+
+    with app_context.test_request_context():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                broken()
@@ -0,0 +1,122 @@
+# tests/test_redis_pool.py
+"""Redis 熔断器：closed -> open -> 半开探测 -> closed / open，以及熔断时 get_redis() 返回 None"""
+import pytest
+
+from app.utils import redis_pool
+from app.utils.redis_pool import CircuitBreaker
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(redis_pool, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=3, reset_timeout=10)
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure()
+
+
+def test_opens_after_consecutive_failures(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.is_open
+    assert not breaker.allow()
+
+
+def test_success_resets_failure_count(breaker):
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open
+
+
+def test_half_open_allows_one_probe_per_cooldown(breaker, clock):
+    _open(breaker)
+    clock.now += 9.9
+    assert not breaker.allow()
+
+    clock.now += 0.2
+    assert breaker.allow()
+    # 探测还没有结果：同一个冷却周期内其他请求继续被挡住
+    assert not breaker.allow()
+    assert breaker.is_open
+
+
+def test_successful_probe_closes(breaker, clock):
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow()
+
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow()
+    assert breaker.allow()
+
+
+def test_failed_probe_restarts_cooldown(breaker, clock):
+    _open(breaker)
+    clock.now += 10
+    assert breaker.allow()
+
+    breaker.record_failure()
+    assert breaker.is_open
+    clock.now += 9
+    assert not breaker.allow()
+    clock.now += 1
+    assert breaker.allow()
+
+
+def test_reset_closes(breaker):
+    _open(breaker)
+    breaker.reset()
+    assert not breaker.is_open
+    assert breaker.allow()
+
+
+def test_get_redis_returns_none_while_open(fake_redis, clock):
+    from app.extensions import get_redis
+
+    breaker = redis_pool.breaker
+    assert get_redis() is fake_redis
+    _open(breaker)
+    assert get_redis() is None
+
+    clock.now += breaker.reset_timeout
+    assert get_redis() is fake_redis
+    breaker.record_success()
+    assert get_redis() is fake_redis
+
+
+def test_connection_failures_open_the_breaker(app_context, monkeypatch):
+    from redis.exceptions import ConnectionError
+
+    # create_client 会改全局熔断器的参数，测试结束后还原
+    monkeypatch.setattr(redis_pool.breaker, "failure_threshold", redis_pool.breaker.failure_threshold)
+    monkeypatch.setattr(redis_pool.breaker, "reset_timeout", redis_pool.breaker.reset_timeout)
+    # 127.0.0.1:1 直接拒绝连接，每次 PING 记一次失败
+    client = redis_pool.create_client({**app_context.config, "REDIS_RETRIES": 0, "REDIS_BREAKER_THRESHOLD": 2})
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            client.ping()
+    assert redis_pool.breaker.is_open
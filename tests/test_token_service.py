@@ -0,0 +1,160 @@
+# tests/test_token_service.py
+"""JWT 吊销：布隆过滤器、Redis 流同步（全量 / 增量）和用户截止时间"""
+import time
+import uuid
+
+import pytest
+
+from app.services import token_service
+from app.services.token_service import BloomFilter, _RevocationState
+
+
+@pytest.fixture(autouse=True)
+def state(app_context, monkeypatch):
+    """每个测试一份新的进程内状态，并且每次校验都允许同步"""
+    monkeypatch.setattr(token_service, "_state", _RevocationState())
+    monkeypatch.setitem(app_context.config, "JWT_BLOCKLIST_SYNC_INTERVAL", 0)
+    return token_service._state
+
+
+def _payload(uid=1, jti=None, issued_at=None):
+    issued_at = time.time() if issued_at is None else issued_at
+    return {"sub": str(uid), "jti": jti or uuid.uuid4().hex, "iat": int(issued_at),
+            "iat_us": int(issued_at * 1_000_000)}
+
+
+def _other_process(monkeypatch):
+    """模拟另一个 worker：本地状态为空，只能从 Redis 流里同步"""
+    fresh = _RevocationState()
+    monkeypatch.setattr(token_service, "_state", fresh)
+    return fresh
+
+
+# ========== 布隆过滤器 ==========
+
+def test_bloom_has_no_false_negatives_and_few_false_positives():
+    bloom = BloomFilter(num_bits=1 << 16, num_hashes=7)
+    added = [uuid.uuid4().hex for _ in range(2000)]
+    for value in added:
+        bloom.add(value)
+
+    assert all(value in bloom for value in added)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+    assert false_positives < 100
+
+
+# ========== 单个 token ==========
+
+def test_revoked_token_is_rejected_and_others_pass(fake_redis):
+    token = _payload()
+    token_service.revoke_token(token["jti"], time.time() + 600)
+
+    assert token_service.is_token_revoked(token)
+    assert not token_service.is_token_revoked(_payload())
+    assert fake_redis.exists("jwt:revoked:" + token["jti"])
+
+
+def test_other_worker_learns_revocation_from_stream(fake_redis, monkeypatch):
+    token = _payload()
+    token_service.revoke_token(token["jti"], time.time() + 600)
+
+    state = _other_process(monkeypatch)
+    assert token_service.is_token_revoked(token)
+    assert token["jti"] in state.bloom
+    assert state.last_id is not None
+
+
+def test_incremental_sync_picks_up_new_entries(fake_redis, state):
+    assert not token_service.is_token_revoked(_payload())
+    synced_to = state.last_id
+
+    token = _payload()
+    # 另一个 worker 吊销：只写 Redis，不动本进程的布隆过滤器
+    fake_redis.setex("jwt:revoked:" + token["jti"], 600, 1)
+    fake_redis.xadd("jwt:revocations", {"t": "jti", "v": token["jti"], "exp": int(time.time() + 600)})
+
+    assert token_service.is_token_revoked(token)
+    assert state.last_id != synced_to
+
+
+def test_bloom_false_positive_is_confirmed_in_redis(fake_redis, state):
+    token_service.is_token_revoked(_payload())
+    token = _payload()
+    state.bloom.add(token["jti"])
+
+    assert not token_service.is_token_revoked(token)
+
+
+def test_bloom_hit_without_redis_is_treated_as_revoked(fake_redis, state, monkeypatch):
+    token_service.is_token_revoked(_payload())
+    token = _payload()
+    state.bloom.add(token["jti"])
+
+    from app import extensions
+
+    monkeypatch.setattr(extensions, "redis_client", None)
+    assert token_service.is_token_revoked(token)
+
+
+def test_expired_stream_entries_are_not_loaded(fake_redis, monkeypatch):
+    old = uuid.uuid4().hex
+    fake_redis.xadd("jwt:revocations", {"t": "jti", "v": old, "exp": int(time.time() - 1)})
+
+    state = _other_process(monkeypatch)
+    token_service.is_token_revoked(_payload())
+    assert old not in state.bloom
+
+
+def test_unsynced_worker_checks_redis_directly(fake_redis, monkeypatch):
+    token = _payload()
+    fake_redis.setex("jwt:revoked:" + token["jti"], 600, 1)
+    # 流读取失败：本地状态还没同步过，直接查 Redis 里的 key
+    def broken_xrange(name):
+        raise ConnectionError("stream unavailable")
+
+    monkeypatch.setattr(fake_redis, "xrange", broken_xrange)
+
+    state = _other_process(monkeypatch)
+    assert token_service.is_token_revoked(token)
+    assert state.last_id is None
+
+
+# ========== 用户截止时间 ==========
+
+def test_user_cutoff_revokes_only_earlier_tokens(fake_redis):
+    before = _payload(uid=7)
+    time.sleep(0.001)
+    token_service.revoke_user_tokens(7)
+    time.sleep(0.001)
+    after = _payload(uid=7)
+
+    assert token_service.is_token_revoked(before)
+    assert not token_service.is_token_revoked(after)
+    assert not token_service.is_token_revoked(_payload(uid=8, issued_at=before["iat_us"] / 1_000_000))
+
+
+def test_user_cutoff_uses_microseconds_within_the_same_second(fake_redis, state):
+    token_service.revoke_user_tokens(7)
+    cutoff = state.user_cutoffs["7"][0]
+
+    same_second_before = _payload(uid=7, issued_at=cutoff - 0.0005)
+    same_second_after = _payload(uid=7, issued_at=cutoff + 0.0005)
+    assert token_service.is_token_revoked(same_second_before)
+    assert not token_service.is_token_revoked(same_second_after)
+
+
+def test_user_cutoff_reaches_other_workers(fake_redis, monkeypatch):
+    token = _payload(uid=7)
+    time.sleep(0.001)
+    token_service.revoke_user_tokens(7)
+
+    state = _other_process(monkeypatch)
+    assert token_service.is_token_revoked(token)
+    assert "7" in state.user_cutoffs
+
+
+def test_user_cutoff_without_redis_applies_locally(app_context):
+    token = _payload(uid=7)
+    time.sleep(0.001)
+    token_service.revoke_user_tokens(7)
+    assert token_service.is_token_revoked(token)
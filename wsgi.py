@@ -1,12 +1,21 @@
 # backend/wsgi.py
+"""
+生产：gunicorn -c gunicorn.conf.py wsgi:app
+本地：APP_CONFIG=dev python wsgi.py
+配置名取环境变量 APP_CONFIG（dev / prod），默认 prod。
+"""
+import os
+
 from app import create_app
 
-app = create_app("dev")
+app = create_app(os.environ.get("APP_CONFIG", "prod"))
 
 
 @app.get("/healthz")
 def healthz():
     return {"ok": True}, 200
+
+
 if __name__ == "__main__":
     # 本地开发可以直接跑这个
-    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
+    app.run(host="0.0.0.0", port=5000, debug=app.debug, use_reloader=False)